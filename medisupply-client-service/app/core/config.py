@@ -37,6 +37,16 @@ class Settings(BaseSettings):
         "http://medisupply-user-service:8000"  # Para docker-compose local
     )
     
+    # Pool HTTP compartido para llamadas a otros servicios (keep-alive)
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    HTTP_KEEPALIVE_EXPIRY: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+    HTTP_DEFAULT_TIMEOUT: float = float(os.getenv("HTTP_DEFAULT_TIMEOUT", "10"))
+    USER_SERVICE_TIMEOUT: float = float(os.getenv("USER_SERVICE_TIMEOUT", "30"))
+    # La consulta de roles tiene fallback local: no debe esperar tanto como el registro
+    USER_SERVICE_ROLES_TIMEOUT: float = float(os.getenv("USER_SERVICE_ROLES_TIMEOUT", "10"))
+    NIT_VALIDATION_TIMEOUT: float = float(os.getenv("NIT_VALIDATION_TIMEOUT", "10"))
+    
     # Logging
     LOG_LEVEL: str = "INFO"
     
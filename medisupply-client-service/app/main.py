@@ -3,6 +3,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from app.api.v1 import client_routes
 from app.core.database import create_tables
 from app.core.config import settings
+from app.core.http_client import close_http_clients, init_http_clients
 import logging
 
 # Configure logging
@@ -103,6 +104,7 @@ def root():
 async def startup_event():
     logger.info(f"{settings.PROJECT_NAME} v{settings.VERSION} starting up...")
     logger.info(f"Environment: {'Development' if settings.DEBUG else 'Production'}")
+    init_http_clients()
     
     # Ejecutar seeds en background después de 5 segundos
     import asyncio
@@ -125,6 +127,7 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info(f"{settings.PROJECT_NAME} shutting down...")
+    await close_http_clients()
 
 
 if __name__ == "__main__":
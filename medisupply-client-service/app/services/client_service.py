@@ -6,6 +6,7 @@ from fastapi import HTTPException, status
 from typing import Optional, List, Dict, Any
 import httpx
 from app.core.config import settings
+from app.core.http_client import get_async_http_client
 import logging
 import secrets
 import string
@@ -38,30 +39,30 @@ class ClientService:
             user_service_url = settings.USER_SERVICE_URL
             roles_endpoint = f"{user_service_url}/api/v1/roles"
             
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(roles_endpoint)
+            client = get_async_http_client()
+            response = await client.get(roles_endpoint, timeout=settings.USER_SERVICE_ROLES_TIMEOUT)
+            
+            if response.status_code == 200:
+                roles = response.json()
+                for role in roles:
+                    if role.get("name") == ClientService.CLIENTE_ROLE_NAME:
+                        role_id = role.get("id")
+                        logger.info(f"Role ID para '{ClientService.CLIENTE_ROLE_NAME}' obtenido dinámicamente: {role_id}")
+                        return role_id
+                
+                # Si no se encuentra el rol por nombre, usar fallback
+                logger.warning(
+                    f"Rol '{ClientService.CLIENTE_ROLE_NAME}' no encontrado en user-service. "
+                    f"Usando fallback ID={ClientService.CLIENTE_ROLE_ID_FALLBACK}"
+                )
+                return ClientService.CLIENTE_ROLE_ID_FALLBACK
+            else:
+                logger.warning(
+                    f"No se pudo obtener roles desde user-service (status {response.status_code}). "
+                    f"Usando fallback ID={ClientService.CLIENTE_ROLE_ID_FALLBACK}"
+                )
+                return ClientService.CLIENTE_ROLE_ID_FALLBACK
                 
-                if response.status_code == 200:
-                    roles = response.json()
-                    for role in roles:
-                        if role.get("name") == ClientService.CLIENTE_ROLE_NAME:
-                            role_id = role.get("id")
-                            logger.info(f"Role ID para '{ClientService.CLIENTE_ROLE_NAME}' obtenido dinámicamente: {role_id}")
-                            return role_id
-                    
-                    # Si no se encuentra el rol por nombre, usar fallback
-                    logger.warning(
-                        f"Rol '{ClientService.CLIENTE_ROLE_NAME}' no encontrado en user-service. "
-                        f"Usando fallback ID={ClientService.CLIENTE_ROLE_ID_FALLBACK}"
-                    )
-                    return ClientService.CLIENTE_ROLE_ID_FALLBACK
-                else:
-                    logger.warning(
-                        f"No se pudo obtener roles desde user-service (status {response.status_code}). "
-                        f"Usando fallback ID={ClientService.CLIENTE_ROLE_ID_FALLBACK}"
-                    )
-                    return ClientService.CLIENTE_ROLE_ID_FALLBACK
-                    
         except Exception as e:
             logger.warning(
                 f"Error obteniendo role ID desde user-service: {str(e)}. "
@@ -132,28 +133,28 @@ class ClientService:
             
             logger.info(f"Creando usuario en user-service: {email}")
             
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(register_endpoint, json=payload)
+            client = get_async_http_client()
+            response = await client.post(register_endpoint, json=payload, timeout=settings.USER_SERVICE_TIMEOUT)
+            
+            if response.status_code == 201:
+                user_data = response.json()
+                logger.info(f"Usuario creado exitosamente en user-service: ID={user_data.get('id')}, email={email}")
+                return user_data
+            elif response.status_code == 400:
+                # El usuario ya existe
+                error_detail = response.json().get("detail", "Error desconocido")
+                logger.warning(f"Error creando usuario: {error_detail}")
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail=f"No se pudo crear el usuario: {error_detail}"
+                )
+            else:
+                logger.error(f"Error inesperado del user-service: {response.status_code} - {response.text}")
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="El servicio de usuarios no está disponible temporalmente"
+                )
                 
-                if response.status_code == 201:
-                    user_data = response.json()
-                    logger.info(f"Usuario creado exitosamente en user-service: ID={user_data.get('id')}, email={email}")
-                    return user_data
-                elif response.status_code == 400:
-                    # El usuario ya existe
-                    error_detail = response.json().get("detail", "Error desconocido")
-                    logger.warning(f"Error creando usuario: {error_detail}")
-                    raise HTTPException(
-                        status_code=status.HTTP_409_CONFLICT,
-                        detail=f"No se pudo crear el usuario: {error_detail}"
-                    )
-                else:
-                    logger.error(f"Error inesperado del user-service: {response.status_code} - {response.text}")
-                    raise HTTPException(
-                        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                        detail="El servicio de usuarios no está disponible temporalmente"
-                    )
-                    
         except httpx.RequestError as e:
             logger.error(f"Error de conexión con user-service: {str(e)}")
             raise HTTPException(
@@ -183,22 +184,22 @@ class ClientService:
             # Example: Colombian DIAN API, Chilean SII API, etc.
             
             if settings.NIT_VALIDATION_SERVICE_URL:
-                async with httpx.AsyncClient() as client:
-                    response = await client.get(
-                        f"{settings.NIT_VALIDATION_SERVICE_URL}/validate/{nit}",
-                        timeout=10.0
+                client = get_async_http_client()
+                response = await client.get(
+                    f"{settings.NIT_VALIDATION_SERVICE_URL}/validate/{nit}",
+                    timeout=settings.NIT_VALIDATION_TIMEOUT
+                )
+                
+                if response.status_code == 200:
+                    data = response.json()
+                    return NITValidationResponse(
+                        nit=nit,
+                        is_valid=data.get("is_valid", False),
+                        company_name=data.get("company_name"),
+                        company_status=data.get("status"),
+                        message=data.get("message", "NIT validado exitosamente")
                     )
-                    
-                    if response.status_code == 200:
-                        data = response.json()
-                        return NITValidationResponse(
-                            nit=nit,
-                            is_valid=data.get("is_valid", False),
-                            company_name=data.get("company_name"),
-                            company_status=data.get("status"),
-                            message=data.get("message", "NIT validado exitosamente")
-                        )
-            
+
             # Respuesta mock para desarrollo
             
             return NITValidationResponse(
@@ -88,7 +88,7 @@ class TestClientService:
                 pass
             get = mock_get
         
-        monkeypatch.setattr('httpx.AsyncClient', MockAsyncClient)
+        monkeypatch.setattr('app.services.client_service.get_async_http_client', lambda: MockAsyncClient())
         
         role_id = await ClientService._get_cliente_role_id()
         assert role_id == 2
@@ -108,7 +108,7 @@ class TestClientService:
                 pass
             get = mock_get
         
-        monkeypatch.setattr('httpx.AsyncClient', MockAsyncClient)
+        monkeypatch.setattr('app.services.client_service.get_async_http_client', lambda: MockAsyncClient())
         
         role_id = await ClientService._get_cliente_role_id()
         assert role_id == ClientService.CLIENTE_ROLE_ID_FALLBACK
@@ -130,7 +130,7 @@ class TestClientService:
                 pass
             get = mock_get
         
-        monkeypatch.setattr('httpx.AsyncClient', MockAsyncClient)
+        monkeypatch.setattr('app.services.client_service.get_async_http_client', lambda: MockAsyncClient())
         
         role_id = await ClientService._get_cliente_role_id()
         assert role_id == ClientService.CLIENTE_ROLE_ID_FALLBACK
@@ -156,7 +156,7 @@ class TestClientService:
                 pass
             get = mock_get
         
-        monkeypatch.setattr('httpx.AsyncClient', MockAsyncClient)
+        monkeypatch.setattr('app.services.client_service.get_async_http_client', lambda: MockAsyncClient())
         
         role_id = await ClientService._get_cliente_role_id()
         assert role_id == ClientService.CLIENTE_ROLE_ID_FALLBACK
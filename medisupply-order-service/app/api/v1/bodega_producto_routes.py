@@ -23,18 +23,24 @@ def listar_bodega_productos(
     lote: str = None,
     latitud: float = None,
     longitud: float = None,
+    ordenar_por: str = None,
     db: Session = Depends(get_db)
 ):
+    """ordenar_por=pronostico_entrega (requiere latitud y longitud) lista primero el inventario que llega antes"""
     service = BodegaProductoService(db)
-    return service.listar_bodega_productos(
-        skip=skip, 
-        limit=limit,
-        id_bodega=id_bodega,
-        id_producto=id_producto,
-        lote=lote,
-        latitud=latitud,
-        longitud=longitud
-    )
+    try:
+        return service.listar_bodega_productos(
+            skip=skip, 
+            limit=limit,
+            id_bodega=id_bodega,
+            id_producto=id_producto,
+            lote=lote,
+            latitud=latitud,
+            longitud=longitud,
+            ordenar_por=ordenar_por
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get("/bodega/{bodega_id}", response_model=List[BodegaProductoResponse])
@@ -23,13 +23,13 @@ def listar_bodegas(
     db: Session = Depends(get_db)
 ):
     service = BodegaService(db)
-    return service.listar_bodegas(skip=skip, limit=limit, id_pais=id_pais, id_producto=id_producto)
+    return service.listar_bodegas_response(skip=skip, limit=limit, id_pais=id_pais, id_producto=id_producto)
 
 
 @router.get("/{bodega_id}", response_model=BodegaResponse)
 def obtener_bodega(bodega_id: int, db: Session = Depends(get_db)):
     service = BodegaService(db)
-    bodega = service.obtener_bodega(bodega_id)
+    bodega = service.obtener_bodega_response(bodega_id)
     if not bodega:
         raise HTTPException(status_code=404, detail="Bodega no encontrada")
     return bodega
@@ -1,18 +1,30 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from datetime import datetime
+from datetime import date, datetime
+import json
+import logging
+from app.core import database
 from app.core.database import get_db
 from app.schemas.orden_schema import OrdenResponse
 from app.services.orden_service import OrdenService
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/internal/v1/ordenes", tags=["Internal"])
 
+# Claves de la última línea de /export (ver `exportar_ordenes_interno`)
+EXPORT_TRAILER_KEY = "_fin"
+EXPORT_ERROR_KEY = "_error"
+
 
 @router.get("/", response_model=List[OrdenResponse])
 def listar_ordenes_interno(
+    response: Response,
     skip: int = 0, 
     limit: int = 1000, 
+    cursor: Optional[str] = None,
     estado: Optional[str] = None,
     id_cliente: Optional[int] = None,
     id_vendedor: Optional[int] = None,
@@ -25,13 +37,73 @@ def listar_ordenes_interno(
     NO requiere autenticación JWT pero SÍ requiere header X-Internal-Service-Key.
     """
     service = OrdenService(db)
-    ordenes = service.listar_ordenes(
-        skip=skip,
-        limit=limit,
-        estado=estado,
-        id_cliente=id_cliente,
-        id_vendedor=id_vendedor,
-        fecha_desde=fecha_desde,
-        fecha_hasta=fecha_hasta
-    )
-    return [service._orden_to_response(orden) for orden in ordenes]
+    try:
+        ordenes = service.listar_ordenes(
+            skip=skip,
+            limit=limit,
+            estado=estado,
+            id_cliente=id_cliente,
+            id_vendedor=id_vendedor,
+            fecha_desde=fecha_desde,
+            fecha_hasta=fecha_hasta,
+            cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # Cursor de la siguiente página (keyset); el cuerpo sigue siendo la lista de órdenes
+    next_cursor = service.siguiente_cursor(ordenes, limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return service._ordenes_to_response(ordenes)
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+@router.get("/export")
+def exportar_ordenes_interno(
+    estado: Optional[str] = None,
+    id_cliente: Optional[int] = None,
+    id_vendedor: Optional[int] = None,
+    fecha_desde: Optional[datetime] = None,
+    fecha_hasta: Optional[datetime] = None
+):
+    """
+    Exportación completa de órdenes en NDJSON (una orden JSON por línea).
+    Sin límite de página: las filas se leen con un cursor del servidor y se
+    envían a medida que se generan, así que la memoria no crece con el volumen.
+    Requiere header X-Internal-Service-Key.
+
+    El status 200 se envía antes de leer las filas, así que un fallo a mitad
+    del stream no se puede reportar con el código HTTP. Por eso la última
+    línea es siempre un trailer: `{"_fin": {"total": N}}` si la exportación
+    terminó, o `{"_error": "..."}` si falló. Un stream sin trailer está
+    truncado y el consumidor debe descartarlo.
+    """
+    def generar():
+        # La sesión vive lo que dura el stream, no lo que dura el handler
+        db = database.SessionLocal()
+        total = 0
+        try:
+            ordenes = OrdenService(db).exportar_ordenes(
+                estado=estado,
+                id_cliente=id_cliente,
+                id_vendedor=id_vendedor,
+                fecha_desde=fecha_desde,
+                fecha_hasta=fecha_hasta
+            )
+            for orden in ordenes:
+                yield json.dumps(orden, default=_json_default) + "\n"
+                total += 1
+        except Exception as e:
+            logger.error(f"Order export failed after {total} rows: {e}")
+            yield json.dumps({EXPORT_ERROR_KEY: str(e)}) + "\n"
+            return
+        finally:
+            db.close()
+        yield json.dumps({EXPORT_TRAILER_KEY: {"total": total}}) + "\n"
+
+    return StreamingResponse(generar(), media_type="application/x-ndjson")
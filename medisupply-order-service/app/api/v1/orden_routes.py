@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
 from app.core.database import get_db
-from app.schemas.orden_schema import OrdenCreate, OrdenUpdate, OrdenResponse
+from app.schemas.orden_schema import (
+    OrdenCreate, OrdenUpdate, OrdenResponse, OrdenBulkCreate, OrdenBulkResponse
+)
 from app.services.orden_service import OrdenService
 
 router = APIRouter(prefix="/api/v1/ordenes", tags=["Ordenes"])
@@ -16,10 +18,26 @@ def crear_orden(payload: OrdenCreate, db: Session = Depends(get_db)):
     return service._orden_to_response(orden)
 
 
+@router.post("/bulk", response_model=OrdenBulkResponse)
+def crear_ordenes_bulk(payload: OrdenBulkCreate, db: Session = Depends(get_db)):
+    """Create many ordenes in a single request and transaction.
+
+    Returns one result per orden: invalid ones (unknown vehiculo, repeated
+    producto) are reported without preventing the rest from being created.
+    """
+    service = OrdenService(db)
+    try:
+        return service.crear_ordenes_bulk(payload.ordenes)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.get("/", response_model=List[OrdenResponse])
 def listar_ordenes(
+    response: Response,
     skip: int = 0, 
     limit: int = 100, 
+    cursor: Optional[str] = None,
     estado: Optional[str] = None,
     id_cliente: Optional[int] = None,
     id_vendedor: Optional[int] = None,
@@ -28,25 +46,33 @@ def listar_ordenes(
     db: Session = Depends(get_db)
 ):
     service = OrdenService(db)
-    ordenes = service.listar_ordenes(
-        skip=skip, 
-        limit=limit, 
-        estado=estado, 
-        id_cliente=id_cliente,
-        id_vendedor=id_vendedor,
-        fecha_desde=fecha_desde,
-        fecha_hasta=fecha_hasta
-    )
-    return [service._orden_to_response(orden) for orden in ordenes]
+    try:
+        ordenes = service.listar_ordenes(
+            skip=skip, 
+            limit=limit, 
+            estado=estado, 
+            id_cliente=id_cliente,
+            id_vendedor=id_vendedor,
+            fecha_desde=fecha_desde,
+            fecha_hasta=fecha_hasta,
+            cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # Cursor de la siguiente página (keyset); el cuerpo sigue siendo la lista de órdenes
+    next_cursor = service.siguiente_cursor(ordenes, limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return service._ordenes_to_response(ordenes)
 
 
 @router.get("/{orden_id}", response_model=OrdenResponse)
 def obtener_orden(orden_id: int, db: Session = Depends(get_db)):
     service = OrdenService(db)
-    orden = service.obtener_orden(orden_id)
+    orden = service.obtener_orden_response(orden_id)
     if not orden:
         raise HTTPException(status_code=404, detail="Orden no encontrada")
-    return service._orden_to_response(orden)
+    return orden
 
 
 @router.put("/{orden_id}", response_model=OrdenResponse)
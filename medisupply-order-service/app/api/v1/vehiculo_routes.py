@@ -1,9 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from datetime import datetime
+from typing import List, Optional, Union
+from app.core.config import settings
 from app.core.database import get_db
-from app.schemas.vehiculo_schema import VehiculoCreate, VehiculoUpdate, VehiculoResponse
+from app.models.vehiculo import TipoVehiculo
+from app.schemas.vehiculo_schema import (
+    VehiculoCreate, VehiculoUpdate, VehiculoResponse,
+    PosicionVehiculoCreate, PosicionVehiculoResponse, PosicionesIngestaResponse,
+    VehiculoCercanoResponse, TrayectoriaResponse
+)
 from app.services.vehiculo_service import VehiculoService
+from app.core.live_positions import live_positions
 
 router = APIRouter(prefix="/api/v1/vehiculos", tags=["Vehiculos"])
 
@@ -17,19 +27,115 @@ def crear_vehiculo(payload: VehiculoCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.post("/posiciones", response_model=PosicionesIngestaResponse, status_code=status.HTTP_202_ACCEPTED)
+def registrar_posiciones(
+    payload: Union[PosicionVehiculoCreate, List[PosicionVehiculoCreate]],
+    db: Session = Depends(get_db)
+):
+    """Ingesta de posiciones GPS (un fix o una lista de fixes).
+
+    Responde 202: las posiciones quedan disponibles al instante en
+    GET /vehiculos/{id}/posicion y se escriben en la base en segundo plano.
+    """
+    service = VehiculoService(db)
+    fixes = payload if isinstance(payload, list) else [payload]
+    try:
+        return service.registrar_posiciones(fixes)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.get("/", response_model=List[VehiculoResponse])
 def listar_vehiculos(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
     service = VehiculoService(db)
-    return service.listar_vehiculos(skip=skip, limit=limit)
+    # Cuerpos ya serializados desde la caché: sin ORM ni pydantic por vehículo
+    return Response(content=service.listar_vehiculos_json(skip=skip, limit=limit), media_type="application/json")
+
+
+@router.get("/cercanos", response_model=List[VehiculoCercanoResponse])
+def buscar_cercanos(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radio_km: float = Query(10, gt=0, le=settings.GPS_CERCANOS_MAX_RADIO_KM),
+    tipo: Optional[TipoVehiculo] = None,
+    k: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    """Vehículos más cercanos a un punto, ordenados por distancia (km).
+
+    Se resuelve con el índice espacial de posiciones actuales, sin consultar
+    la tabla vehiculos.
+    """
+    service = VehiculoService(db)
+    return service.buscar_cercanos(lat, lon, radio_km, k=k, tipo=tipo.value if tipo else None)
+
+
+@router.get("/stream")
+async def stream_vehiculos(
+    request: Request,
+    ids: Optional[str] = Query(None, description="Ids separados por comas"),
+    bbox: Optional[str] = Query(None, description="lat_min,lon_min,lat_max,lon_max"),
+):
+    """Posiciones y cambios de vehículos en vivo (Server-Sent Events).
+
+    Eventos `posiciones` y `vehiculos`, con una lista del último estado de cada
+    vehículo que cambió desde el envío anterior. Sin filtros se recibe toda la flota.
+    """
+    try:
+        lista_ids = [int(i) for i in ids.split(",") if i.strip()] if ids else None
+        recuadro = tuple(float(v) for v in bbox.split(",")) if bbox else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids o bbox con formato inválido")
+    if recuadro is not None and (len(recuadro) != 4 or recuadro[0] > recuadro[2] or recuadro[1] > recuadro[3]):
+        raise HTTPException(status_code=400, detail="bbox debe ser lat_min,lon_min,lat_max,lon_max")
+    if lista_ids is not None and len(lista_ids) > settings.LIVE_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"Se permiten como máximo {settings.LIVE_MAX_IDS} ids")
+
+    suscripcion = live_positions.subscribe(lista_ids, recuadro)
+    inicial = await run_in_threadpool(VehiculoService.posiciones_actuales, lista_ids) if lista_ids else None
+    return StreamingResponse(
+        live_positions.stream(suscripcion, request, inicial),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.get("/{vehiculo_id}", response_model=VehiculoResponse)
-def obtener_vehiculo(vehiculo_id: int, db: Session = Depends(get_db)):
+def obtener_vehiculo(vehiculo_id: int, request: Request, db: Session = Depends(get_db)):
     service = VehiculoService(db)
-    vehiculo = service.obtener_vehiculo(vehiculo_id)
+    vehiculo = service.obtener_vehiculo_response(vehiculo_id)
     if not vehiculo:
         raise HTTPException(status_code=404, detail="Vehiculo no encontrado")
-    return vehiculo
+    # Cuerpo cacheado tal cual, con ETag/Last-Modified (304 si el cliente ya lo tiene)
+    return vehiculo.to_response(request)
+
+
+@router.get("/{vehiculo_id}/posicion", response_model=PosicionVehiculoResponse)
+def obtener_posicion(vehiculo_id: int, db: Session = Depends(get_db)):
+    service = VehiculoService(db)
+    posicion = service.obtener_posicion(vehiculo_id)
+    if not posicion:
+        raise HTTPException(status_code=404, detail="Posición no disponible")
+    return posicion
+
+
+@router.get("/{vehiculo_id}/trayectoria", response_model=TrayectoriaResponse)
+def obtener_trayectoria(
+    vehiculo_id: int,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    resolucion: Optional[int] = Query(None, ge=1, description="Segundos entre puntos"),
+    db: Session = Depends(get_db)
+):
+    """Recorrido del vehículo como polilínea submuestreada (por defecto, las últimas 24 horas)"""
+    service = VehiculoService(db)
+    try:
+        trayectoria = service.obtener_trayectoria(vehiculo_id, desde, hasta, resolucion)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not trayectoria:
+        raise HTTPException(status_code=404, detail="Vehículo no encontrado")
+    return trayectoria
 
 
 @router.put("/{vehiculo_id}", response_model=VehiculoResponse)
@@ -1,7 +1,12 @@
-import requests
+import httpx
+from jose import JWTError, jwt
 from fastapi import HTTPException, status
+from starlette.concurrency import run_in_threadpool
 from starlette.requests import Request
 from app.core.config import settings
+from app.core.http_client import get_async_http_client, get_http_client
+from app.core.jwks import jwks_cache
+from app.core.token_cache import token_cache
 
 
 EXEMPT_PATHS = [
@@ -20,8 +25,8 @@ def verify_token_with_user_service(token: str) -> dict | None:
     url = settings.USER_SERVICE_URL.rstrip('/') + '/api/v1/users/me'
     headers = {'Authorization': f'Bearer {token}'}
     try:
-        resp = requests.get(url, headers=headers, timeout=3)
-    except requests.RequestException:
+        resp = get_http_client().get(url, headers=headers, timeout=settings.AUTH_TIMEOUT)
+    except httpx.HTTPError:
         return None
 
     if resp.status_code == 200:
@@ -29,7 +34,120 @@ def verify_token_with_user_service(token: str) -> dict | None:
     return None
 
 
-def require_auth(request: Request) -> dict:
+async def verify_token_with_user_service_async(token: str) -> dict | None:
+    """Igual que `verify_token_with_user_service` pero sin bloquear el event loop."""
+    if not token:
+        return None
+
+    url = settings.USER_SERVICE_URL.rstrip('/') + '/api/v1/users/me'
+    headers = {'Authorization': f'Bearer {token}'}
+    try:
+        resp = await get_async_http_client().get(url, headers=headers, timeout=settings.AUTH_TIMEOUT)
+    except httpx.HTTPError:
+        return None
+
+    if resp.status_code == 200:
+        return resp.json()
+    return None
+
+
+# Resultado de la validación local (ver `_verify_locally`)
+LOCAL_VALID = 'valid'
+LOCAL_INVALID = 'invalid'
+LOCAL_LEGACY = 'legacy'
+LOCAL_UNKNOWN_KEY = 'unknown_key'
+
+
+def _verify_locally(token: str, refresh_keys: bool = True) -> tuple[str, dict | None]:
+    """Valida el token en proceso e indica por qué no se pudo resolver.
+
+    - `LOCAL_VALID`: firma, expiración y claims correctos; se devuelve el usuario.
+    - `LOCAL_INVALID`: firma incorrecta, token expirado o malformado. No tiene
+      sentido consultar al user-service: también lo rechazaría.
+    - `LOCAL_LEGACY`: token válido emitido antes del claim `uid`; solo el
+      user-service puede resolver el usuario.
+    - `LOCAL_UNKNOWN_KEY`: `kid` desconocido sin refrescar el JWKS
+      (`refresh_keys=False`); el llamador decide si refrescar.
+    """
+    if not token:
+        return LOCAL_INVALID, None
+
+    try:
+        if settings.JWT_ALGORITHM.startswith('HS'):
+            key = settings.JWT_SECRET_KEY
+        else:
+            key = jwks_cache.get_key(jwt.get_unverified_header(token).get('kid'), refresh=refresh_keys)
+            if key is None:
+                return (LOCAL_INVALID if refresh_keys else LOCAL_UNKNOWN_KEY), None
+        payload = jwt.decode(token, key, algorithms=[settings.JWT_ALGORITHM])
+    except JWTError:
+        return LOCAL_INVALID, None
+
+    email = payload.get('sub')
+    user_id = payload.get('uid')
+    if email is None or user_id is None:
+        return LOCAL_LEGACY, None
+
+    return LOCAL_VALID, {
+        'id': user_id,
+        'email': email,
+        'name': payload.get('name'),
+        'is_active': True,
+        'role_id': payload.get('role_id'),
+        'role': payload.get('role'),
+    }
+
+
+def verify_token_locally(token: str, refresh_keys: bool = True) -> dict | None:
+    """Valida firma, expiración y claims del token sin contactar al user-service.
+
+    Devuelve un dict con la misma forma que `/api/v1/users/me`, o None si el
+    token no se puede resolver localmente (inválido, expirado o sin `uid`).
+    """
+    return _verify_locally(token, refresh_keys)[1]
+
+
+def _verify_remote(token: str) -> dict | None:
+    if settings.TOKEN_CACHE_ENABLED and token:
+        return token_cache.get_or_load(token, verify_token_with_user_service)
+    return verify_token_with_user_service(token)
+
+
+async def _verify_remote_async(token: str) -> dict | None:
+    if settings.TOKEN_CACHE_ENABLED and token:
+        return await token_cache.get_or_load_async(token, verify_token_with_user_service_async)
+    return await verify_token_with_user_service_async(token)
+
+
+def verify_token(token: str) -> dict | None:
+    """Resuelve el usuario del token según `AUTH_MODE`.
+
+    En modo `local` se valida el JWT en proceso. Solo los tokens legados (sin
+    el claim `uid`) se consultan al user-service; los inválidos o expirados se
+    rechazan sin llamada remota. Las consultas remotas pasan por `token_cache`
+    si está habilitado.
+    """
+    if settings.AUTH_MODE == 'local':
+        result, user = _verify_locally(token)
+        if result != LOCAL_LEGACY:
+            return user
+    return _verify_remote(token)
+
+
+async def verify_token_async(token: str) -> dict | None:
+    """Variante async de `verify_token` para el middleware de autenticación."""
+    if settings.AUTH_MODE == 'local':
+        result, user = _verify_locally(token, refresh_keys=False)
+        if result == LOCAL_UNKNOWN_KEY:
+            # kid desconocido: el refresco del JWKS es bloqueante, se hace en el threadpool
+            result, user = await run_in_threadpool(_verify_locally, token)
+        if result != LOCAL_LEGACY:
+            return user
+    return await _verify_remote_async(token)
+
+
+def _bearer_token(request: Request) -> str | None:
+    """Extrae el token Bearer; None si la ruta es pública. Lanza 401 si falta."""
     path = request.url.path
     if path in EXEMPT_PATHS or path.startswith('/order-docs') or path.startswith('/order-openapi'):
         return None
@@ -38,8 +156,28 @@ def require_auth(request: Request) -> dict:
     if not auth or not auth.lower().startswith('bearer '):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Missing Authorization header')
 
-    token = auth.split(' ', 1)[1].strip()
-    user_json = verify_token_with_user_service(token)
+    return auth.split(' ', 1)[1].strip()
+
+
+def require_auth(request: Request) -> dict:
+    token = _bearer_token(request)
+    if token is None:
+        return None
+
+    user_json = verify_token(token)
+    if user_json is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Invalid or expired token')
+
+    return user_json
+
+
+async def require_auth_async(request: Request) -> dict:
+    """Como `require_auth` pero sin bloquear el event loop (usado por el middleware)."""
+    token = _bearer_token(request)
+    if token is None:
+        return None
+
+    user_json = await verify_token_async(token)
     if user_json is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Invalid or expired token')
 
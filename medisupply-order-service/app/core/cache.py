@@ -0,0 +1,649 @@
+"""
+Caché de lecturas en dos niveles para el order-service.
+
+- L1: LRU en proceso acotado por `CACHE_L1_MAX_ENTRIES`, con un TTL corto
+  (`CACHE_L1_TTL`). Un acierto en L1 no cuesta ninguna llamada de red.
+- L2: Redis compartido entre réplicas, con TTL propio por namespace.
+
+Cada namespace (`orden`, `bodega`, `bodegas`, ...) se registra con su TTL y,
+opcionalmente, con el schema pydantic de los valores: lo que se guarda es el
+`model_dump(mode='json')` y lo que se devuelve son instancias del schema. Los
+valores devueltos desde L1 son compartidos entre peticiones: no modificarlos.
+
+Con `as_response=True` el namespace guarda el cuerpo JSON ya serializado por
+el schema y devuelve un `CachedResponse`: un acierto se responde tal cual, con
+ETag y Last-Modified, sin instanciar modelos ORM ni validar con pydantic.
+
+Los listados usan `get_many`: los ids salen de una consulta al índice y las
+entidades se piden juntas (L1, luego un solo `MGET` a Redis); solo las que
+faltan se cargan de la base, en una consulta, y se guardan con un pipeline.
+
+Los resultados vacíos (None) también se cachean, con `CACHE_NEGATIVE_TTL`,
+para que las consultas repetidas a ids inexistentes no lleguen a la base.
+
+Protección contra estampidas: dentro de un proceso las peticiones concurrentes
+por la misma clave comparten una sola carga (single-flight); entre réplicas,
+quien carga toma un lock en Redis (`SET NX`) y las demás esperan hasta
+`CACHE_LOCK_TTL` segundos a que aparezca el valor antes de cargarlo ellas.
+
+Invalidación: los cambios de la sesión de SQLAlchemy sobre los modelos
+registrados con `track` se anotan en `after_flush` y se aplican en
+`after_commit` (se descartan si la transacción se revierte). Las escrituras con
+sentencias `insert`/`update`/`delete` no pasan por la unidad de trabajo: los
+servicios las anotan con `invalidate_on_commit`. Al aplicar una invalidación se
+borra la clave en Redis y se publica en `CACHE_INVALIDATION_CHANNEL` para que
+las demás réplicas la quiten de su L1. Sin Redis la invalidación solo es local
+y el L1 de las otras réplicas puede quedar desactualizado hasta `CACHE_L1_TTL`.
+Cuando Redis vuelve tras una caída se vacía el L1 (se pudieron perder
+invalidaciones) y se renueva la suscripción.
+"""
+import email.utils
+import functools
+import hashlib
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from fastapi import Request, Response
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.redis import RedisClient
+
+logger = logging.getLogger(__name__)
+
+# Valor guardado en Redis para un resultado negativo (el recurso no existe)
+_NEGATIVE = "__none__"
+_PENDING_KEY = "cache_pending_invalidations"
+
+
+class Namespace:
+    """Configuración de un grupo de claves cacheadas."""
+
+    def __init__(self, name: str, ttl: int, schema=None, negative_ttl: Optional[int] = None, grouped: bool = False):
+        self.name = name
+        self.ttl = ttl
+        self.schema = schema
+        self.negative_ttl = negative_ttl
+        # Con grouped=True se lleva en Redis un índice de las claves para
+        # poder invalidar el namespace completo (listados con filtros)
+        self.grouped = grouped
+
+    def to_cache(self, value) -> Any:
+        if value is None or self.schema is None:
+            return value
+        if isinstance(value, list):
+            return [self.schema.model_validate(v).model_dump(mode='json') for v in value]
+        return self.schema.model_validate(value).model_dump(mode='json')
+
+    def from_cache(self, data) -> Any:
+        if data is None or self.schema is None:
+            return data
+        if isinstance(data, list):
+            return [self.schema.model_validate(v) for v in data]
+        return self.schema.model_validate(data)
+
+    def dumps(self, data) -> str:
+        return json.dumps(data, default=str)
+
+    def loads(self, payload: str) -> Any:
+        return json.loads(payload)
+
+
+class CachedResponse:
+    """Cuerpo JSON ya serializado de un recurso, con sus validadores HTTP."""
+
+    __slots__ = ('body', 'etag', 'last_modified')
+
+    def __init__(self, body: bytes, etag: str, last_modified: int):
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+
+    def _not_modified(self, request: Request) -> bool:
+        if_none_match = request.headers.get('if-none-match')
+        if if_none_match is not None:
+            return self.etag in (tag.strip() for tag in if_none_match.split(',')) or if_none_match.strip() == '*'
+        if_modified_since = request.headers.get('if-modified-since')
+        if if_modified_since:
+            try:
+                return email.utils.parsedate_to_datetime(if_modified_since).timestamp() >= self.last_modified
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def to_response(self, request: Request) -> Response:
+        """Respuesta 200 con el cuerpo cacheado, o 304 si el cliente ya tiene esta versión"""
+        headers = {
+            'ETag': self.etag,
+            'Last-Modified': email.utils.formatdate(self.last_modified, usegmt=True),
+            # Datos detrás de autenticación: solo el cliente los guarda y los revalida siempre
+            'Cache-Control': 'private, no-cache',
+        }
+        if self._not_modified(request):
+            return Response(status_code=304, headers=headers)
+        return Response(content=self.body, media_type='application/json', headers=headers)
+
+
+class ResponseNamespace(Namespace):
+    """Namespace cuyos valores son cuerpos de respuesta ya serializados.
+
+    En Redis se guarda `"<last_modified>|<etag>|<cuerpo>"`: un acierto cuesta
+    un GET y una copia del cuerpo, sin parsear JSON.
+    """
+
+    def to_cache(self, value) -> Optional[str]:
+        if value is None:
+            return None
+        body = self.schema.model_validate(value).model_dump_json()
+        etag = '"' + hashlib.blake2b(body.encode(), digest_size=8).hexdigest() + '"'
+        return f"{int(time.time())}|{etag}|{body}"
+
+    def from_cache(self, data: Optional[str]) -> Optional[CachedResponse]:
+        if data is None:
+            return None
+        last_modified, etag, body = data.split('|', 2)
+        return CachedResponse(body.encode(), etag, int(last_modified))
+
+    def dumps(self, data: str) -> str:
+        return data
+
+    def loads(self, payload: str) -> str:
+        return payload
+
+
+class _InFlight:
+    """Carga en curso compartida por las peticiones con la misma clave."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        # Una invalidación durante la carga impide guardar el resultado en L1
+        self.stale = False
+
+
+class TwoTierCache:
+    """Caché L1 (LRU en proceso) + L2 (Redis) con invalidación por pub/sub."""
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        l1_ttl: int = 30,
+        negative_ttl: int = 30,
+        lock_ttl: float = 5.0,
+        channel: str = 'cache:invalidate',
+        use_redis: bool = True,
+        prefix: str = 'cache',
+    ):
+        self.max_entries = max_entries
+        self.l1_ttl = l1_ttl
+        self.negative_ttl = negative_ttl
+        self.lock_ttl = lock_ttl
+        self.channel = channel
+        self.use_redis = use_redis
+        self.prefix = prefix
+        self.instance_id = uuid.uuid4().hex
+        self._namespaces: Dict[str, Namespace] = {}
+        self._trackers: Dict[type, Callable[[Any], Iterable[Tuple[str, Optional[Any]]]]] = {}
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._in_flight: Dict[str, _InFlight] = {}
+        self._lock = threading.Lock()
+        self._listener = None
+        self._listener_wanted = False
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.invalidations = 0
+        # Aciertos por endpoint: {endpoint: {"hits", "redis_hits", "misses"}}
+        self._endpoint_stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {"hits": 0, "redis_hits": 0, "misses": 0})
+        # Cambia con cada invalidación; las cargas por lotes lo comparan para no guardar datos viejos
+        self._invalidation_seq = 0
+
+    # -------------------------
+    # Registro
+    # -------------------------
+    def namespace(
+        self,
+        name: str,
+        ttl: int,
+        schema=None,
+        negative_ttl: Optional[int] = None,
+        grouped: bool = False,
+        as_response: bool = False,
+    ) -> Namespace:
+        cls = ResponseNamespace if as_response else Namespace
+        ns = cls(name, ttl, schema=schema, negative_ttl=negative_ttl, grouped=grouped)
+        self._namespaces[name] = ns
+        return ns
+
+    def track(self, model: type, keys: Callable[[Any], Iterable[Tuple[str, Optional[Any]]]]) -> None:
+        """Invalidar al confirmar cualquier cambio de `model` en la sesión.
+
+        `keys(obj)` devuelve los pares (namespace, clave) afectados; una clave
+        None invalida el namespace completo.
+        """
+        self._trackers[model] = keys
+
+    def cached(self, namespace: str, key: Callable[..., Any], endpoint: Optional[str] = None):
+        """Decorador: cachear el resultado de la función en `namespace`.
+
+        `key` recibe los mismos argumentos que la función decorada y devuelve
+        la clave dentro del namespace. `endpoint` agrupa las métricas de aciertos.
+        """
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                return self.get_or_load(
+                    namespace, key(*args, **kwargs), lambda: func(*args, **kwargs), endpoint=endpoint
+                )
+            return wrapper
+        return decorator
+
+    # -------------------------
+    # Lectura
+    # -------------------------
+    def _full_key(self, namespace: str, key: Any) -> str:
+        return f"{self.prefix}:{namespace}:{key}"
+
+    def _redis(self):
+        return RedisClient.get_client() if self.use_redis else None
+
+    def _record(self, endpoint: str, hits: int = 0, redis_hits: int = 0, misses: int = 0) -> None:
+        with self._lock:
+            stats = self._endpoint_stats[endpoint]
+            stats["hits"] += hits
+            stats["redis_hits"] += redis_hits
+            stats["misses"] += misses
+
+    def get_or_load(self, namespace: str, key: Any, loader: Callable[[], Any], endpoint: Optional[str] = None) -> Any:
+        ns = self._namespaces[namespace]
+        endpoint = endpoint or namespace
+        full_key = self._full_key(namespace, key)
+        leader = False
+        with self._lock:
+            found, value = self._lookup_locked(full_key)
+            if found:
+                self._endpoint_stats[endpoint]["hits"] += 1
+                return value
+
+            call = self._in_flight.get(full_key)
+            if call is None:
+                call = _InFlight()
+                self._in_flight[full_key] = call
+                leader = True
+            else:
+                self.coalesced += 1
+                # Un seguidor no llega a la base: cuenta como acierto
+                self._endpoint_stats[endpoint]["hits"] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._load(ns, full_key, loader, call, endpoint)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(full_key, None)
+            call.done.set()
+        return call.result
+
+    def _lookup_locked(self, full_key: str) -> Tuple[bool, Any]:
+        entry = self._entries.get(full_key)
+        if entry is not None:
+            value, expires_at = entry
+            if expires_at > time.time():
+                self._entries.move_to_end(full_key)
+                self.hits += 1
+                return True, value
+            del self._entries[full_key]
+        self.misses += 1
+        return False, None
+
+    def _load(self, ns: Namespace, full_key: str, loader: Callable[[], Any], call: _InFlight, endpoint: str) -> Any:
+        redis = self._redis()
+        lock_key = None
+        if redis is not None:
+            try:
+                cached = redis.get(full_key)
+                if cached is None:
+                    # Solo una réplica carga; las demás esperan el valor que deje en Redis
+                    lock_key = f"{full_key}:lock"
+                    if not redis.set(lock_key, self.instance_id, nx=True, px=int(self.lock_ttl * 1000)):
+                        lock_key = None
+                        cached = self._wait_for_value(redis, full_key)
+                if cached is not None:
+                    self.redis_hits += 1
+                    self._record(endpoint, redis_hits=1)
+                    value = None if cached == _NEGATIVE else ns.from_cache(ns.loads(cached))
+                    self._store_l1(ns, full_key, value, call)
+                    return value
+            except Exception as e:
+                logger.warning(f"Error leyendo caché {full_key}: {e}")
+
+        self._record(endpoint, misses=1)
+        try:
+            data = ns.to_cache(loader())
+            value = ns.from_cache(data)
+            # Lo leído antes de una invalidación concurrente no se publica en Redis
+            if redis is not None and not call.stale:
+                self._store_redis(redis, ns, full_key, data)
+            self._store_l1(ns, full_key, value, call)
+            return value
+        finally:
+            if lock_key is not None:
+                try:
+                    redis.delete(lock_key)
+                except Exception:
+                    pass
+
+    def get_many(
+        self,
+        namespace: str,
+        keys: List[Any],
+        loader: Callable[[List[Any]], Dict[Any, Any]],
+        endpoint: Optional[str] = None,
+    ) -> Dict[Any, Any]:
+        """Obtener varias claves con un `MGET` y cargar solo las que falten.
+
+        `loader(claves)` recibe las claves que no estaban en caché y devuelve
+        un dict clave -> valor en una sola consulta; las claves que no
+        devuelva se cachean como negativas. Las cargas por lotes no pasan por
+        el single-flight por clave.
+        """
+        ns = self._namespaces[namespace]
+        endpoint = endpoint or namespace
+        result: Dict[Any, Any] = {}
+        pending: List[Any] = []
+        with self._lock:
+            seq = self._invalidation_seq
+            for key in keys:
+                found, value = self._lookup_locked(self._full_key(namespace, key))
+                if found:
+                    result[key] = value
+                else:
+                    pending.append(key)
+        hits = len(result)
+
+        redis = self._redis() if pending else None
+        if redis is not None:
+            try:
+                cached_values = redis.mget([self._full_key(namespace, key) for key in pending])
+                missing = []
+                for key, cached in zip(pending, cached_values):
+                    if cached is None:
+                        missing.append(key)
+                        continue
+                    value = None if cached == _NEGATIVE else ns.from_cache(ns.loads(cached))
+                    result[key] = value
+                    self._store_l1(ns, self._full_key(namespace, key), value)
+                self.redis_hits += len(pending) - len(missing)
+                pending = missing
+            except Exception as e:
+                logger.warning(f"Error leyendo caché {namespace} (mget): {e}")
+
+        redis_hits = len(result) - hits
+        self._record(endpoint, hits=hits, redis_hits=redis_hits, misses=len(pending))
+        if not pending:
+            return result
+
+        loaded = loader(pending)
+        to_store: Dict[str, Any] = {}
+        for key in pending:
+            data = ns.to_cache(loaded.get(key))
+            result[key] = ns.from_cache(data)
+            to_store[self._full_key(namespace, key)] = data
+        with self._lock:
+            # Una invalidación durante la carga puede afectar a cualquiera de las claves
+            fresh = seq == self._invalidation_seq
+        if fresh:
+            if redis is not None:
+                self._store_redis_many(redis, ns, to_store)
+            for key in pending:
+                self._store_l1(ns, self._full_key(namespace, key), result[key])
+        return result
+
+    def _wait_for_value(self, redis, full_key: str) -> Optional[str]:
+        deadline = time.monotonic() + self.lock_ttl
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            cached = redis.get(full_key)
+            if cached is not None:
+                return cached
+        return None
+
+    def _store_redis(self, redis, ns: Namespace, full_key: str, data: Any) -> None:
+        self._store_redis_many(redis, ns, {full_key: data})
+
+    def _store_redis_many(self, redis, ns: Namespace, items: Dict[str, Any]) -> None:
+        """Guardar varias claves en Redis en un solo viaje (pipeline)"""
+        try:
+            pipe = redis.pipeline(transaction=False)
+            for full_key, data in items.items():
+                if data is None:
+                    pipe.setex(full_key, ns.negative_ttl or self.negative_ttl, _NEGATIVE)
+                else:
+                    pipe.setex(full_key, ns.ttl, ns.dumps(data))
+            if ns.grouped:
+                index_key = self._full_key(ns.name, '__keys__')
+                pipe.sadd(index_key, *items.keys())
+                pipe.expire(index_key, ns.ttl)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Error guardando en caché {ns.name}: {e}")
+
+    def _store_l1(self, ns: Namespace, full_key: str, value: Any, call: Optional[_InFlight] = None) -> None:
+        if self.max_entries <= 0:
+            return
+        ttl = (ns.negative_ttl or self.negative_ttl) if value is None else ns.ttl
+        expires_at = time.time() + min(self.l1_ttl, ttl)
+        with self._lock:
+            if call is not None and call.stale:
+                return
+            self._entries[full_key] = (value, expires_at)
+            self._entries.move_to_end(full_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    # -------------------------
+    # Invalidación
+    # -------------------------
+    def _evict_l1(self, namespace: str, key: Optional[Any]) -> None:
+        with self._lock:
+            self._invalidation_seq += 1
+            if key is None:
+                prefix = self._full_key(namespace, '')
+                affected = [k for k in self._entries if k.startswith(prefix)]
+                affected_in_flight = [c for k, c in self._in_flight.items() if k.startswith(prefix)]
+            else:
+                full_key = self._full_key(namespace, key)
+                affected = [full_key] if full_key in self._entries else []
+                affected_in_flight = [self._in_flight[full_key]] if full_key in self._in_flight else []
+            for k in affected:
+                del self._entries[k]
+            for call in affected_in_flight:
+                call.stale = True
+
+    def invalidate(self, namespace: str, key: Optional[Any] = None) -> None:
+        """Descartar una clave (o el namespace completo si key es None) en L1, Redis y las demás réplicas."""
+        self.invalidations += 1
+        self._evict_l1(namespace, key)
+        redis = self._redis()
+        if redis is None:
+            return
+        try:
+            if key is None:
+                index_key = self._full_key(namespace, '__keys__')
+                keys = list(redis.smembers(index_key))
+                redis.delete(index_key, *keys)
+            else:
+                redis.delete(self._full_key(namespace, key))
+            redis.publish(self.channel, json.dumps({
+                "origin": self.instance_id,
+                "namespace": namespace,
+                "key": None if key is None else str(key),
+            }))
+        except Exception as e:
+            logger.warning(f"Error invalidando caché {namespace}:{key}: {e}")
+
+    def invalidate_many(self, namespace: str, keys: List[Any]) -> None:
+        """Descartar varias claves con un solo DEL y un solo mensaje a las demás réplicas."""
+        if not keys:
+            return
+        self.invalidations += len(keys)
+        for key in keys:
+            self._evict_l1(namespace, key)
+        redis = self._redis()
+        if redis is None:
+            return
+        try:
+            pipe = redis.pipeline(transaction=False)
+            pipe.delete(*[self._full_key(namespace, key) for key in keys])
+            pipe.publish(self.channel, json.dumps({
+                "origin": self.instance_id,
+                "namespace": namespace,
+                "keys": [str(key) for key in keys],
+            }))
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Error invalidando caché {namespace} ({len(keys)} claves): {e}")
+
+    def _on_message(self, message) -> None:
+        try:
+            data = json.loads(message['data'])
+        except (TypeError, ValueError):
+            return
+        if data.get('origin') == self.instance_id:
+            return
+        if 'keys' in data:
+            for key in data['keys']:
+                self._evict_l1(data['namespace'], key)
+        else:
+            self._evict_l1(data['namespace'], data.get('key'))
+
+    def start_listener(self) -> bool:
+        """Suscribirse a las invalidaciones de las demás réplicas (hilo en segundo plano)."""
+        self._listener_wanted = True
+        if self._listener is not None:
+            return True
+        redis = self._redis()
+        if redis is None:
+            logger.warning("Caché sin Redis: las invalidaciones no llegan a las demás réplicas")
+            return False
+        try:
+            pubsub = redis.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(**{self.channel: self._on_message})
+
+            def on_error(exc, pubsub, thread):
+                logger.warning(f"Error en la suscripción de invalidaciones: {exc}")
+                time.sleep(1)
+
+            self._listener = pubsub.run_in_thread(sleep_time=1.0, daemon=True, exception_handler=on_error)
+            return True
+        except Exception as e:
+            logger.warning(f"No se pudo suscribir a {self.channel}: {e}")
+            return False
+
+    def on_redis_reconnect(self) -> None:
+        # Las invalidaciones publicadas durante la caída no llegaron: se descarta el L1
+        self.clear()
+        if self._listener_wanted:
+            self._stop_listener_thread()
+            self.start_listener()
+
+    def stop_listener(self) -> None:
+        self._listener_wanted = False
+        self._stop_listener_thread()
+
+    def _stop_listener_thread(self) -> None:
+        if self._listener is not None:
+            try:
+                self._listener.stop()
+            except Exception:
+                pass
+            self._listener = None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = len(self._entries)
+            endpoints = {}
+            for endpoint, counts in self._endpoint_stats.items():
+                total = counts["hits"] + counts["redis_hits"] + counts["misses"]
+                endpoints[endpoint] = {
+                    **counts,
+                    "hit_ratio": round((counts["hits"] + counts["redis_hits"]) / total, 4) if total else None,
+                }
+        return {
+            "size": size,
+            "hits": self.hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "endpoints": endpoints,
+        }
+
+
+cache = TwoTierCache(
+    max_entries=settings.CACHE_L1_MAX_ENTRIES,
+    l1_ttl=settings.CACHE_L1_TTL,
+    negative_ttl=settings.CACHE_NEGATIVE_TTL,
+    lock_ttl=settings.CACHE_LOCK_TTL,
+    channel=settings.CACHE_INVALIDATION_CHANNEL,
+)
+RedisClient.add_reconnect_listener(cache.on_redis_reconnect)
+
+
+def invalidate_on_commit(session: Session, namespace: str, key: Optional[Any] = None) -> None:
+    """Anotar una invalidación que se aplica cuando la sesión confirma la transacción."""
+    session.info.setdefault(_PENDING_KEY, set()).add((namespace, key))
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_invalidations(session, flush_context) -> None:
+    if not cache._trackers:
+        return
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        keys = cache._trackers.get(type(obj))
+        if keys is not None:
+            for namespace, key in keys(obj):
+                invalidate_on_commit(session, namespace, key)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_invalidations(session) -> None:
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    # Invalidar el namespace completo hace innecesarias sus claves sueltas
+    completos = {namespace for namespace, key in pending if key is None}
+    for namespace, key in pending:
+        if key is None or namespace not in completos:
+            cache.invalidate(namespace, key)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_invalidations(session, previous_transaction) -> None:
+    # Revertir un savepoint no descarta los cambios anteriores de la transacción
+    if previous_transaction.nested:
+        return
+    session.info.pop(_PENDING_KEY, None)
@@ -9,6 +9,32 @@ class Settings(BaseSettings):
     SECRET_KEY: str = os.getenv('SECRET_KEY', 'replace_with_secure_secret')
     INTERNAL_SERVICE_KEY: str = os.getenv('INTERNAL_SERVICE_KEY', 'medisupply-internal-secret-key-2024')
     USER_SERVICE_URL: str = os.getenv('USER_SERVICE_URL', 'http://user-service.medisupply.svc.cluster.local:8000')
+    # Validación de tokens: 'remote' consulta /api/v1/users/me, 'local' valida el JWT en proceso
+    AUTH_MODE: str = os.getenv('AUTH_MODE', 'remote').lower()
+    # Debe coincidir con la SECRET_KEY/ALGORITHM del user-service para validar localmente
+    JWT_SECRET_KEY: str = os.getenv('JWT_SECRET_KEY', os.getenv('SECRET_KEY', 'replace_with_secure_secret'))
+    JWT_ALGORITHM: str = os.getenv('JWT_ALGORITHM', 'HS256')
+    # Con RS256/ES256 las claves públicas se obtienen del JWKS del user-service
+    JWKS_URL: str = os.getenv('JWKS_URL', USER_SERVICE_URL.rstrip('/') + '/.well-known/jwks.json')
+    JWKS_REFRESH_SECONDS: int = int(os.getenv('JWKS_REFRESH_SECONDS', '300'))
+    JWKS_MIN_REFRESH_SECONDS: int = int(os.getenv('JWKS_MIN_REFRESH_SECONDS', '30'))
+    # Caché en proceso de la validación remota (/users/me); el TTL se acota además al `exp` del token
+    TOKEN_CACHE_ENABLED: bool = os.getenv('TOKEN_CACHE_ENABLED', 'True').lower() == 'true'
+    TOKEN_CACHE_MAX_ENTRIES: int = int(os.getenv('TOKEN_CACHE_MAX_ENTRIES', '10000'))
+    TOKEN_CACHE_TTL_SECONDS: int = int(os.getenv('TOKEN_CACHE_TTL_SECONDS', '60'))
+    # Pool HTTP compartido para llamadas entre servicios (keep-alive)
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv('HTTP_MAX_CONNECTIONS', '100'))
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv('HTTP_MAX_KEEPALIVE_CONNECTIONS', '20'))
+    HTTP_KEEPALIVE_EXPIRY: float = float(os.getenv('HTTP_KEEPALIVE_EXPIRY', '30'))
+    HTTP_DEFAULT_TIMEOUT: float = float(os.getenv('HTTP_DEFAULT_TIMEOUT', '10'))
+    # Timeouts por upstream (segundos)
+    AUTH_TIMEOUT: float = float(os.getenv('AUTH_TIMEOUT', '3'))
+    # Crear al arrancar los índices de los modelos que falten (CONCURRENTLY en PostgreSQL).
+    # Apagado por defecto: en producción los índices los crea la migración; en una
+    # tabla grande la construcción alarga el arranque y compite con cada réplica.
+    ENSURE_INDEXES_ON_STARTUP: bool = os.getenv('ENSURE_INDEXES_ON_STARTUP', 'False').lower() == 'true'
+    # Tamaño máximo de POST /api/v1/ordenes/bulk
+    BULK_ORDENES_MAX: int = int(os.getenv('BULK_ORDENES_MAX', '1000'))
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv('ACCESS_TOKEN_EXPIRE_MINUTES', '30'))
     PROJECT_NAME: str = "medisupply-order-service"
     VERSION: str = "0.1.0"
@@ -20,7 +46,52 @@ class Settings(BaseSettings):
     # Redis configuration
     REDIS_URL: str = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
     REDIS_ENABLED: bool = os.getenv('REDIS_ENABLED', 'True').lower() == 'true'
+    # Pool y timeouts del cliente Redis (segundos)
+    REDIS_MAX_CONNECTIONS: int = int(os.getenv('REDIS_MAX_CONNECTIONS', '50'))
+    REDIS_POOL_TIMEOUT: float = float(os.getenv('REDIS_POOL_TIMEOUT', '0.5'))
+    REDIS_SOCKET_CONNECT_TIMEOUT: float = float(os.getenv('REDIS_SOCKET_CONNECT_TIMEOUT', '1'))
+    REDIS_SOCKET_TIMEOUT: float = float(os.getenv('REDIS_SOCKET_TIMEOUT', '1'))
+    # Circuit breaker: fallos seguidos para abrirlo y backoff de la sonda de reconexión
+    REDIS_BREAKER_THRESHOLD: int = int(os.getenv('REDIS_BREAKER_THRESHOLD', '3'))
+    REDIS_PROBE_INITIAL_DELAY: float = float(os.getenv('REDIS_PROBE_INITIAL_DELAY', '1'))
+    REDIS_PROBE_MAX_DELAY: float = float(os.getenv('REDIS_PROBE_MAX_DELAY', '30'))
     CACHE_TTL: int = int(os.getenv('CACHE_TTL', '300'))  # 5 minutos por defecto
+    # Caché de lecturas en dos niveles (app/core/cache.py)
+    CACHE_L1_MAX_ENTRIES: int = int(os.getenv('CACHE_L1_MAX_ENTRIES', '10000'))
+    CACHE_L1_TTL: int = int(os.getenv('CACHE_L1_TTL', '30'))
+    CACHE_NEGATIVE_TTL: int = int(os.getenv('CACHE_NEGATIVE_TTL', '30'))
+    CACHE_LOCK_TTL: float = float(os.getenv('CACHE_LOCK_TTL', '5'))
+    CACHE_INVALIDATION_CHANNEL: str = os.getenv('CACHE_INVALIDATION_CHANNEL', 'cache:invalidate')
+    # Ingesta de posiciones GPS con escritura diferida (app/core/position_buffer.py)
+    GPS_FLUSH_INTERVAL: float = float(os.getenv('GPS_FLUSH_INTERVAL', '2'))
+    GPS_FLUSH_BATCH_SIZE: int = int(os.getenv('GPS_FLUSH_BATCH_SIZE', '1000'))
+    GPS_REDIS_KEY: str = os.getenv('GPS_REDIS_KEY', 'gps:posiciones')
+    # Tamaño máximo de un lote de POST /api/v1/vehiculos/posiciones
+    GPS_INGEST_MAX: int = int(os.getenv('GPS_INGEST_MAX', '5000'))
+    # Índice espacial de GET /api/v1/vehiculos/cercanos (app/core/geo_index.py)
+    GPS_GEO_KEY: str = os.getenv('GPS_GEO_KEY', 'gps:geo')
+    GPS_GRID_CELL_DEG: float = float(os.getenv('GPS_GRID_CELL_DEG', '0.05'))
+    GPS_CERCANOS_MAX_RADIO_KM: float = float(os.getenv('GPS_CERCANOS_MAX_RADIO_KM', '100'))
+    # Historial de posiciones (app/core/position_history.py): días de fixes crudos,
+    # resolución (s) y días de los rollups a los que se compactan
+    GPS_HISTORIAL_ENABLED: bool = os.getenv('GPS_HISTORIAL_ENABLED', 'True').lower() == 'true'
+    GPS_HISTORIAL_DIAS: int = int(os.getenv('GPS_HISTORIAL_DIAS', '7'))
+    GPS_ROLLUP_RESOLUCION: int = int(os.getenv('GPS_ROLLUP_RESOLUCION', '300'))
+    GPS_ROLLUP_DIAS: int = int(os.getenv('GPS_ROLLUP_DIAS', '365'))
+    GPS_COMPACTACION_INTERVALO: float = float(os.getenv('GPS_COMPACTACION_INTERVALO', '3600'))
+    # Fixes en memoria pendientes de insertar si la base no responde; se descartan los más viejos
+    GPS_HISTORIAL_MAX_PENDIENTES: int = int(os.getenv('GPS_HISTORIAL_MAX_PENDIENTES', '200000'))
+    GPS_TRAYECTORIA_MAX_PUNTOS: int = int(os.getenv('GPS_TRAYECTORIA_MAX_PUNTOS', '2000'))
+    # Posiciones en vivo por SSE (app/core/live_positions.py)
+    LIVE_CHANNEL: str = os.getenv('LIVE_CHANNEL', 'gps:live')
+    LIVE_PUSH_INTERVAL: float = float(os.getenv('LIVE_PUSH_INTERVAL', '1'))
+    LIVE_KEEPALIVE: float = float(os.getenv('LIVE_KEEPALIVE', '15'))
+    LIVE_MAX_DURATION: float = float(os.getenv('LIVE_MAX_DURATION', '300'))
+    LIVE_RETRY_MS: int = int(os.getenv('LIVE_RETRY_MS', '3000'))
+    LIVE_MAX_IDS: int = int(os.getenv('LIVE_MAX_IDS', '500'))
+    # TTL en Redis por entidad
+    CACHE_TTL_ORDEN: int = int(os.getenv('CACHE_TTL_ORDEN', '120'))
+    CACHE_TTL_BODEGA: int = int(os.getenv('CACHE_TTL_BODEGA', '600'))
 
     class Config:
         env_file = '.env'
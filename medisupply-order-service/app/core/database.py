@@ -25,9 +25,19 @@ def create_tables():
     # Import models so they are registered in metadata
     from app.models import (
         Orden, Vehiculo, OrdenProducto, 
-        Bodega, BodegaProducto, NovedadOrden
+        Bodega, BodegaProducto, NovedadOrden,
+        PosicionHistorial, PosicionRollup
     )
     try:
-        _Base.metadata.create_all(bind=engine)
+        if engine.dialect.name == 'postgresql':
+            # create_all crearía vehiculo_posiciones sin particionar
+            from app.core.position_history import TABLA, ensure_history_table
+            _Base.metadata.create_all(
+                bind=engine,
+                tables=[t for t in _Base.metadata.sorted_tables if t.name != TABLA],
+            )
+            ensure_history_table(engine)
+        else:
+            _Base.metadata.create_all(bind=engine)
     except Exception:
         raise
@@ -2,7 +2,7 @@ import os
 from typing import Optional
 from fastapi import HTTPException, Request, status, Security
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from app.core.auth import verify_token_with_user_service
+from app.core.auth import verify_token
 
 _bearer_scheme = HTTPBearer(auto_error=False)
 
@@ -31,21 +31,28 @@ def get_current_user(request: Request, credentials: Optional[HTTPAuthorizationCr
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid Authorization header format")
         token = parts[1]
 
-    user = verify_token_with_user_service(token)
-    if not user:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired token")
-    return user
+    return _resolve_user(request, token)
 
 
-def require_auth_security(credentials: Optional[HTTPAuthorizationCredentials] = Security(HTTPBearer(auto_error=False))) -> dict:
+def require_auth_security(request: Request, credentials: Optional[HTTPAuthorizationCredentials] = Security(HTTPBearer(auto_error=False))) -> dict:
     if os.getenv("AUTH_DISABLED", "false").lower() == "true":
         return {"id": 0, "email": "test@local", "name": "test-user", "is_active": True}
 
+    # El middleware ya resolvió la identidad de esta petición
+    user: Optional[dict] = getattr(request.state, "user", None)
+    if user:
+        return user
+
     if not credentials or not credentials.scheme or credentials.scheme.lower() != 'bearer':
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or missing credentials")
 
-    token = credentials.credentials
-    user = verify_token_with_user_service(token)
+    return _resolve_user(request, credentials.credentials)
+
+
+def _resolve_user(request: Request, token: str) -> dict:
+    """Valida el token una sola vez y guarda el usuario en `request.state.user`."""
+    user = verify_token(token)
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired token")
+    request.state.user = user
     return user
@@ -0,0 +1,294 @@
+"""
+Índice espacial de la posición actual de cada vehículo.
+
+Sirve `GET /api/v1/vehiculos/cercanos` sin recorrer la tabla vehiculos:
+
+- Con Redis, cada posición se guarda con GEOADD en `GPS_GEO_KEY` (todos los
+  vehículos) y en `GPS_GEO_KEY:<tipo>`. La búsqueda es un único
+  `GEOSEARCH ... BYRADIUS ... ASC COUNT k`, que ve los fixes recibidos por
+  cualquier réplica.
+- Cada réplica mantiene además una rejilla en memoria de celdas de
+  `GPS_GRID_CELL_DEG` grados, que responde cuando Redis no está disponible.
+  La búsqueda recorre anillos de celdas alrededor del punto y se detiene en
+  cuanto los k mejores están más cerca que el borde ya explorado.
+
+El índice se alimenta de los fixes aceptados por el buffer de posiciones y de
+las altas, cambios y bajas de vehículos. La primera búsqueda carga una sola
+vez las posiciones guardadas en la base.
+"""
+import heapq
+import logging
+import math
+import threading
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import select
+
+from app.core import database
+from app.core.config import settings
+from app.core.position_buffer import Posicion, position_buffer
+from app.core.redis import RedisClient
+from app.models.vehiculo import Vehiculo
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+KM_POR_GRADO = math.pi * EARTH_RADIUS_KM / 180
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Distancia en km sobre la esfera entre dos puntos en grados"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class Cercano(NamedTuple):
+    id_vehiculo: int
+    distancia_km: float
+    latitud: float
+    longitud: float
+
+
+class GeoIndex:
+    """Vehículos por celda de la rejilla, con espejo en un índice GEO de Redis."""
+
+    def __init__(self, cell_deg: float = 0.05, redis_key: str = 'gps:geo', use_redis: bool = True):
+        self.cell_deg = cell_deg
+        self.redis_key = redis_key
+        self.use_redis = use_redis
+        self._lon_cells = int(round(360 / cell_deg))
+        self._cells: Dict[Tuple[int, int], Set[int]] = defaultdict(set)
+        self._points: Dict[int, Posicion] = {}
+        self._tipos: Dict[int, str] = {}
+        self._lock = threading.RLock()
+        self._loaded = False
+        self.searches = 0
+        self.redis_searches = 0
+
+    def _cell(self, latitud: float, longitud: float) -> Tuple[int, int]:
+        fila = int(math.floor(latitud / self.cell_deg))
+        columna = int(math.floor((longitud + 180) / self.cell_deg)) % self._lon_cells
+        return fila, columna
+
+    def _key(self, tipo: Optional[str] = None) -> str:
+        return f"{self.redis_key}:{tipo}" if tipo else self.redis_key
+
+    # --- mantenimiento -------------------------------------------------
+
+    def _place(self, vehiculo_id: int, posicion: Posicion) -> None:
+        """Mover el vehículo a la celda de `posicion` (con el lock tomado)"""
+        anterior = self._points.get(vehiculo_id)
+        if anterior is not None:
+            celda = self._cell(anterior.latitud, anterior.longitud)
+            self._cells[celda].discard(vehiculo_id)
+            if not self._cells[celda]:
+                del self._cells[celda]
+        self._points[vehiculo_id] = posicion
+        self._cells[self._cell(posicion.latitud, posicion.longitud)].add(vehiculo_id)
+
+    def _redis_add(self, posiciones: Dict[int, Posicion], nx: bool = False) -> None:
+        client = RedisClient.get_client() if self.use_redis else None
+        if client is None or not posiciones:
+            return
+        try:
+            pipe = client.pipeline(transaction=False)
+            por_tipo: Dict[Optional[str], list] = defaultdict(list)
+            for vehiculo_id, p in posiciones.items():
+                miembro = [p.longitud, p.latitud, str(vehiculo_id)]
+                por_tipo[None].extend(miembro)
+                tipo = self._tipos.get(vehiculo_id)
+                if tipo:
+                    por_tipo[tipo].extend(miembro)
+            for tipo, valores in por_tipo.items():
+                pipe.geoadd(self._key(tipo), valores, nx=nx)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Error actualizando el índice GEO en Redis: {e}")
+
+    def _redis_remove(self, vehiculo_id: int, tipos: Iterable[str]) -> None:
+        client = RedisClient.get_client() if self.use_redis else None
+        if client is None:
+            return
+        try:
+            pipe = client.pipeline(transaction=False)
+            for tipo in [None, *tipos]:
+                pipe.zrem(self._key(tipo), str(vehiculo_id))
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Error borrando del índice GEO en Redis: {e}")
+
+    def on_positions(self, cambios: Dict[int, Posicion]) -> None:
+        """Listener del buffer de posiciones: aplica los fixes aceptados"""
+        desconocidos = [i for i in cambios if i not in self._tipos]
+        if desconocidos:
+            # Vehículos creados en otra réplica: su tipo se lee una sola vez
+            self._tipos.update(self._leer_tipos(desconocidos))
+        with self._lock:
+            for vehiculo_id, posicion in cambios.items():
+                actual = self._points.get(vehiculo_id)
+                if actual is None or actual.timestamp is None or actual.timestamp < posicion.timestamp:
+                    self._place(vehiculo_id, posicion)
+        self._redis_add(cambios)
+
+    def upsert(self, vehiculo_id: int, tipo: str, latitud: Optional[float] = None,
+               longitud: Optional[float] = None, timestamp: Optional[datetime] = None) -> None:
+        """Alta o cambio de un vehículo hecho por la API CRUD (posición guardada en la base)"""
+        anterior = self._tipos.get(vehiculo_id)
+        self._tipos[vehiculo_id] = tipo
+        if anterior and anterior != tipo:
+            self._redis_remove(vehiculo_id, [anterior])
+        if latitud is None or longitud is None:
+            with self._lock:
+                posicion = self._points.get(vehiculo_id)
+            if posicion is not None and anterior != tipo:
+                self._redis_add({vehiculo_id: posicion})
+            return
+        posicion = Posicion(latitud, longitud, timestamp)
+        with self._lock:
+            self._place(vehiculo_id, posicion)
+        self._redis_add({vehiculo_id: posicion})
+
+    def remove(self, vehiculo_id: int) -> None:
+        with self._lock:
+            posicion = self._points.pop(vehiculo_id, None)
+            if posicion is not None:
+                celda = self._cell(posicion.latitud, posicion.longitud)
+                self._cells[celda].discard(vehiculo_id)
+                if not self._cells[celda]:
+                    del self._cells[celda]
+            tipo = self._tipos.pop(vehiculo_id, None)
+        self._redis_remove(vehiculo_id, [tipo] if tipo else [])
+
+    def _leer_tipos(self, ids: List[int]) -> Dict[int, str]:
+        db = database.SessionLocal()
+        try:
+            filas = db.execute(select(Vehiculo.id, Vehiculo.tipo).where(Vehiculo.id.in_(ids))).all()
+            return {vehiculo_id: getattr(tipo, 'value', tipo) for vehiculo_id, tipo in filas}
+        except Exception as e:
+            logger.warning(f"Error leyendo tipos de vehículo: {e}")
+            return {}
+        finally:
+            db.close()
+
+    def ensure_loaded(self) -> None:
+        """Cargar una vez las posiciones guardadas en la base (sin pisar fixes más nuevos)"""
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            db = database.SessionLocal()
+            try:
+                filas = db.execute(
+                    select(Vehiculo.id, Vehiculo.tipo, Vehiculo.latitud, Vehiculo.longitud, Vehiculo.timestamp)
+                ).all()
+            except Exception as e:
+                logger.warning(f"No se pudo cargar el índice espacial: {e}")
+                return
+            finally:
+                db.close()
+            guardadas: Dict[int, Posicion] = {}
+            for vehiculo_id, tipo, latitud, longitud, timestamp in filas:
+                self._tipos.setdefault(vehiculo_id, getattr(tipo, 'value', tipo))
+                if latitud is None or longitud is None or vehiculo_id in self._points:
+                    continue
+                guardadas[vehiculo_id] = Posicion(latitud, longitud, timestamp)
+                self._place(vehiculo_id, guardadas[vehiculo_id])
+            self._loaded = True
+        # NX: no reemplaza en Redis las posiciones más nuevas que aún no se volcaron
+        self._redis_add(guardadas, nx=True)
+        logger.info(f"Índice espacial cargado: {len(self._points)} vehículos con posición")
+
+    # --- búsqueda ------------------------------------------------------
+
+    def nearest(self, latitud: float, longitud: float, radio_km: float, k: int = 10,
+                tipo: Optional[str] = None) -> List[Cercano]:
+        """Los k vehículos más cercanos a menos de `radio_km`, del más cercano al más lejano"""
+        self.ensure_loaded()
+        self.searches += 1
+        resultado = self._nearest_redis(latitud, longitud, radio_km, k, tipo)
+        if resultado is not None:
+            self.redis_searches += 1
+            return resultado
+        return self._nearest_grid(latitud, longitud, radio_km, k, tipo)
+
+    def _nearest_redis(self, latitud, longitud, radio_km, k, tipo) -> Optional[List[Cercano]]:
+        client = RedisClient.get_client() if self.use_redis else None
+        if client is None:
+            return None
+        try:
+            filas = client.geosearch(
+                self._key(tipo), longitude=longitud, latitude=latitud, radius=radio_km, unit='km',
+                sort='ASC', count=k, withdist=True, withcoord=True,
+            )
+        except Exception as e:
+            logger.warning(f"Error buscando en el índice GEO de Redis: {e}")
+            return None
+        return [
+            Cercano(int(miembro), round(distancia, 3), coordenadas[1], coordenadas[0])
+            for miembro, distancia, coordenadas in filas
+        ]
+
+    def _ring(self, fila: int, columna: int, r: int) -> Iterable[Tuple[int, int]]:
+        """Celdas a distancia de Chebyshev exactamente `r` de (fila, columna)"""
+        if r == 0:
+            yield fila, columna
+            return
+        for df in range(-r, r + 1):
+            pasos = range(-r, r + 1) if abs(df) == r else (-r, r)
+            for dc in pasos:
+                yield fila + df, (columna + dc) % self._lon_cells
+
+    def _nearest_grid(self, latitud, longitud, radio_km, k, tipo) -> List[Cercano]:
+        fila, columna = self._cell(latitud, longitud)
+        alto_km = self.cell_deg * KM_POR_GRADO
+        max_fila = int(math.ceil(90 / self.cell_deg))
+        encontrados: List[Tuple[float, int, Posicion]] = []
+        with self._lock:
+            for r in range(self._lon_cells // 2 + 1):
+                for celda in self._ring(fila, columna, r):
+                    if abs(celda[0]) > max_fila:
+                        continue
+                    for vehiculo_id in self._cells.get(celda, ()):
+                        if tipo and self._tipos.get(vehiculo_id) != tipo:
+                            continue
+                        p = self._points[vehiculo_id]
+                        distancia = haversine_km(latitud, longitud, p.latitud, p.longitud)
+                        if distancia <= radio_km:
+                            encontrados.append((distancia, vehiculo_id, p))
+                # Todo punto a menos de `cubierto` km ya está en un anillo visitado
+                lat_extrema = min(90.0, abs(latitud) + (r + 1) * self.cell_deg)
+                ancho_km = alto_km * math.cos(math.radians(lat_extrema))
+                cubierto = r * min(alto_km, ancho_km)
+                if cubierto >= radio_km:
+                    break
+                if len(encontrados) >= k and heapq.nsmallest(k, encontrados)[-1][0] <= cubierto:
+                    break
+        return [
+            Cercano(vehiculo_id, round(distancia, 3), p.latitud, p.longitud)
+            for distancia, vehiculo_id, p in heapq.nsmallest(k, encontrados)
+        ]
+
+    def stats(self) -> dict:
+        return {
+            'vehicles': len(self._points),
+            'cells': len(self._cells),
+            'searches': self.searches,
+            'redis_searches': self.redis_searches,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cells.clear()
+            self._points.clear()
+            self._tipos.clear()
+            self._loaded = False
+
+
+geo_index = GeoIndex(cell_deg=settings.GPS_GRID_CELL_DEG, redis_key=settings.GPS_GEO_KEY)
+position_buffer.add_listener(geo_index.on_positions)
@@ -0,0 +1,59 @@
+import threading
+from typing import Optional
+
+import httpx
+
+from app.core.config import settings
+
+_client: Optional[httpx.Client] = None
+_async_client: Optional[httpx.AsyncClient] = None
+_lock = threading.Lock()
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+    )
+
+
+def get_http_client() -> httpx.Client:
+    """Cliente HTTP síncrono compartido (pool keep-alive) para llamadas entre servicios.
+
+    El timeout por defecto es conservador; cada llamada indica el de su
+    upstream (p. ej. `AUTH_TIMEOUT`).
+    """
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = httpx.Client(limits=_limits(), timeout=settings.HTTP_DEFAULT_TIMEOUT, follow_redirects=True)
+    return _client
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """Cliente HTTP async compartido (pool keep-alive) para llamadas entre servicios."""
+    global _async_client
+    if _async_client is None:
+        with _lock:
+            if _async_client is None:
+                _async_client = httpx.AsyncClient(limits=_limits(), timeout=settings.HTTP_DEFAULT_TIMEOUT, follow_redirects=True)
+    return _async_client
+
+
+def init_http_clients() -> None:
+    """Crear los clientes al arrancar la app para no pagar el setup en la primera petición."""
+    get_http_client()
+    get_async_http_client()
+
+
+async def close_http_clients() -> None:
+    """Cerrar los pools de conexiones al apagar la app."""
+    global _client, _async_client
+    if _client is not None:
+        _client.close()
+        _client = None
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
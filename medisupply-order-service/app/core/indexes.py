@@ -0,0 +1,86 @@
+"""
+Gestión de los índices declarados en los modelos.
+
+`create_all` solo crea índices junto con tablas nuevas: en una base existente
+los índices que se agreguen después a `__table_args__` nunca se construyen.
+`ensure_indexes` compara los índices declarados con los que existen y crea los
+que falten o estén INVALID. En PostgreSQL usa `CREATE INDEX CONCURRENTLY`, que no bloquea las
+escrituras sobre la tabla mientras se construye el índice.
+
+Las migraciones versionadas de `migrations/` siguen siendo la vía para
+producción; esta función cubre entornos de desarrollo y despliegues en los que
+la migración aún no se ha aplicado.
+"""
+import logging
+from typing import List, Optional, Set
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateIndex
+
+from app.core.database import Base
+
+logger = logging.getLogger(__name__)
+
+
+def invalid_indexes(engine: Engine) -> Set[str]:
+    """
+    Nombres de los índices marcados INVALID en PostgreSQL.
+
+    Un `CREATE INDEX CONCURRENTLY` interrumpido deja el índice en el catálogo
+    con `indisvalid = false`: el inspector lo lista, pero el planificador no lo
+    usa y se sigue manteniendo en cada escritura.
+    """
+    if engine.dialect.name != 'postgresql':
+        return set()
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT c.relname FROM pg_index i "
+            "JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE NOT i.indisvalid"
+        ))
+        return {row[0] for row in rows}
+
+
+def missing_indexes(engine: Engine, tables: Optional[List[str]] = None) -> list:
+    """Índices declarados en los modelos que no existen en la base o están INVALID"""
+    inspector = inspect(engine)
+    invalid = invalid_indexes(engine)
+    missing = []
+    for table in Base.metadata.sorted_tables:
+        if tables is not None and table.name not in tables:
+            continue
+        if not inspector.has_table(table.name):
+            continue
+        existing = {ix['name'] for ix in inspector.get_indexes(table.name)} - invalid
+        missing.extend(ix for ix in table.indexes if ix.name not in existing)
+    return missing
+
+
+def ensure_indexes(engine: Engine, tables: Optional[List[str]] = None) -> List[str]:
+    """
+    Crear los índices que falten. Devuelve los nombres de los índices creados.
+
+    Un fallo al crear un índice se registra y no interrumpe el arranque: la
+    consulta sigue funcionando, solo que sin el índice.
+    """
+    created = []
+    invalid = invalid_indexes(engine)
+    for index in missing_indexes(engine, tables):
+        try:
+            if engine.dialect.name == 'postgresql':
+                ddl = str(CreateIndex(index, if_not_exists=True).compile(dialect=engine.dialect))
+                ddl = ddl.replace('CREATE INDEX', 'CREATE INDEX CONCURRENTLY', 1)
+                # CONCURRENTLY no puede ejecutarse dentro de una transacción
+                with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+                    if index.name in invalid:
+                        # IF NOT EXISTS no reconstruye un índice INVALID: hay que borrarlo antes
+                        conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{index.name}"'))
+                    conn.execute(text(ddl))
+            else:
+                index.create(bind=engine, checkfirst=True)
+            created.append(index.name)
+            logger.info(f"Index {index.name} created")
+        except Exception as e:
+            logger.warning(f"Could not create index {index.name}: {e}")
+    return created
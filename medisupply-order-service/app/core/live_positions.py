@@ -0,0 +1,246 @@
+"""
+Difusión en vivo de posiciones y cambios de vehículos por Server-Sent Events.
+
+`GET /api/v1/vehiculos/stream` reemplaza el sondeo de `GET /vehiculos/{id}`:
+el cliente abre una conexión y recibe solo lo que cambia en los vehículos que
+le interesan (una lista de ids o un recuadro lat/lon).
+
+- Los fixes aceptados por el buffer de posiciones y los cambios hechos por la
+  API CRUD se entregan a las suscripciones locales y se publican en el canal
+  `LIVE_CHANNEL` de Redis; cada réplica reparte a sus propias conexiones lo
+  que publican las demás.
+- Cada suscripción acumula solo el último evento por vehículo y se vacía cada
+  `LIVE_PUSH_INTERVAL` segundos: un vehículo que reporta diez veces en ese
+  intervalo produce un único evento para el cliente.
+- Las conexiones se cierran tras `LIVE_MAX_DURATION` segundos; EventSource
+  reconecta solo, y así las conexiones se reparten entre réplicas nuevas.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+import uuid
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.core.position_buffer import Posicion, position_buffer
+from app.core.redis import RedisClient
+
+logger = logging.getLogger(__name__)
+
+EVENTO_POSICION = 'posiciones'
+EVENTO_VEHICULO = 'vehiculos'
+
+
+def _evento_sse(evento: str, datos) -> str:
+    return f"event: {evento}\ndata: {json.dumps(datos, default=str)}\n\n"
+
+
+class Suscripcion:
+    """Filtro de una conexión y sus eventos pendientes de enviar, uno por vehículo."""
+
+    def __init__(self, ids: Optional[Set[int]] = None, bbox: Optional[Tuple[float, float, float, float]] = None):
+        self.ids = ids
+        # (lat_min, lon_min, lat_max, lon_max)
+        self.bbox = bbox
+        self._pendientes: Dict[Tuple[str, int], dict] = {}
+        # Vehículos vistos dentro del recuadro: reciben también sus cambios de estado
+        self._vistos: Set[int] = set()
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def acepta(self, evento: str, vehiculo_id: int, datos: dict) -> bool:
+        if self.ids is not None and vehiculo_id not in self.ids:
+            return False
+        if self.bbox is None:
+            return True
+        if evento != EVENTO_POSICION:
+            return vehiculo_id in self._vistos
+        lat_min, lon_min, lat_max, lon_max = self.bbox
+        dentro = lat_min <= datos['latitud'] <= lat_max and lon_min <= datos['longitud'] <= lon_max
+        if dentro:
+            self._vistos.add(vehiculo_id)
+        elif vehiculo_id in self._vistos:
+            # Se envía la posición con la que sale del recuadro y se deja de seguir
+            self._vistos.discard(vehiculo_id)
+            return True
+        return dentro
+
+    def push(self, evento: str, vehiculo_id: int, datos: dict) -> bool:
+        with self._lock:
+            if not self.acepta(evento, vehiculo_id, datos):
+                return False
+            if (evento, vehiculo_id) in self._pendientes:
+                self.coalesced += 1
+            self._pendientes[(evento, vehiculo_id)] = datos
+            return True
+
+    def drain(self) -> Dict[str, List[dict]]:
+        with self._lock:
+            pendientes, self._pendientes = self._pendientes, {}
+        lotes: Dict[str, List[dict]] = {}
+        for (evento, _), datos in pendientes.items():
+            lotes.setdefault(evento, []).append(datos)
+        return lotes
+
+
+class LivePositions:
+    """Suscripciones de esta réplica y su conexión con las demás por Redis pub/sub."""
+
+    def __init__(self, channel: str = 'gps:live', use_redis: bool = True):
+        self.channel = channel
+        self.use_redis = use_redis
+        self.instance_id = uuid.uuid4().hex
+        self._suscripciones: Set[Suscripcion] = set()
+        self._lock = threading.Lock()
+        self._listener = None
+        self._listener_wanted = False
+        self.published = 0
+        self.received = 0
+        self.delivered = 0
+
+    def subscribe(self, ids: Optional[Iterable[int]] = None,
+                  bbox: Optional[Tuple[float, float, float, float]] = None) -> Suscripcion:
+        suscripcion = Suscripcion(set(ids) if ids is not None else None, bbox)
+        with self._lock:
+            self._suscripciones.add(suscripcion)
+        return suscripcion
+
+    def unsubscribe(self, suscripcion: Suscripcion) -> None:
+        with self._lock:
+            self._suscripciones.discard(suscripcion)
+
+    def _dispatch(self, eventos: List[Tuple[str, int, dict]]) -> None:
+        with self._lock:
+            suscripciones = list(self._suscripciones)
+        for suscripcion in suscripciones:
+            for evento, vehiculo_id, datos in eventos:
+                if suscripcion.push(evento, vehiculo_id, datos):
+                    self.delivered += 1
+
+    def _emit(self, eventos: List[Tuple[str, int, dict]]) -> None:
+        """Entregar a las suscripciones locales y publicar para las demás réplicas"""
+        self._dispatch(eventos)
+        client = RedisClient.get_client() if self.use_redis else None
+        if client is None:
+            return
+        try:
+            client.publish(self.channel, json.dumps(
+                {"origin": self.instance_id, "eventos": eventos}, default=str
+            ))
+            self.published += 1
+        except Exception as e:
+            logger.warning(f"Error publicando eventos en vivo: {e}")
+
+    def on_positions(self, cambios: Dict[int, Posicion]) -> None:
+        """Listener del buffer de posiciones"""
+        self._emit([
+            (EVENTO_POSICION, vehiculo_id, {
+                "id_vehiculo": vehiculo_id,
+                "latitud": p.latitud,
+                "longitud": p.longitud,
+                "timestamp": p.timestamp.isoformat(),
+            })
+            for vehiculo_id, p in cambios.items()
+        ])
+
+    def publish_vehiculo(self, vehiculo_id: int, datos: Optional[dict]) -> None:
+        """Difundir el estado de un vehículo tras un cambio; `None` si se eliminó"""
+        if datos is None:
+            datos = {"id_vehiculo": vehiculo_id, "eliminado": True}
+        self._emit([(EVENTO_VEHICULO, vehiculo_id, datos)])
+
+    def _on_message(self, message) -> None:
+        try:
+            data = json.loads(message['data'])
+        except (TypeError, ValueError):
+            return
+        if data.get('origin') == self.instance_id:
+            return
+        self.received += 1
+        self._dispatch([tuple(evento) for evento in data.get('eventos', [])])
+
+    async def stream(self, suscripcion: Suscripcion, request, inicial: Optional[List[dict]] = None):
+        """Generador SSE de una conexión; la suscripción se cierra al terminar"""
+        try:
+            yield f"retry: {settings.LIVE_RETRY_MS}\n\n"
+            if inicial:
+                yield _evento_sse(EVENTO_POSICION, inicial)
+            inicio = ultimo_envio = time.monotonic()
+            while True:
+                await asyncio.sleep(settings.LIVE_PUSH_INTERVAL)
+                if await request.is_disconnected():
+                    return
+                ahora = time.monotonic()
+                for evento, datos in suscripcion.drain().items():
+                    yield _evento_sse(evento, datos)
+                    ultimo_envio = ahora
+                if ahora - ultimo_envio >= settings.LIVE_KEEPALIVE:
+                    # Evita que proxies intermedios cierren la conexión inactiva
+                    yield ": keepalive\n\n"
+                    ultimo_envio = ahora
+                if ahora - inicio >= settings.LIVE_MAX_DURATION:
+                    return
+        finally:
+            self.unsubscribe(suscripcion)
+
+    def start_listener(self) -> bool:
+        """Recibir los eventos publicados por las demás réplicas (hilo en segundo plano)."""
+        self._listener_wanted = True
+        if self._listener is not None:
+            return True
+        client = RedisClient.get_client() if self.use_redis else None
+        if client is None:
+            logger.warning("Eventos en vivo sin Redis: solo se reciben los de esta réplica")
+            return False
+        try:
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(**{self.channel: self._on_message})
+
+            def on_error(exc, pubsub, thread):
+                logger.warning(f"Error en la suscripción de eventos en vivo: {exc}")
+                time.sleep(1)
+
+            self._listener = pubsub.run_in_thread(sleep_time=1.0, daemon=True, exception_handler=on_error)
+            return True
+        except Exception as e:
+            logger.warning(f"No se pudo suscribir a {self.channel}: {e}")
+            return False
+
+    def on_redis_reconnect(self) -> None:
+        if self._listener_wanted:
+            self._stop_listener_thread()
+            self.start_listener()
+
+    def stop_listener(self) -> None:
+        self._listener_wanted = False
+        self._stop_listener_thread()
+
+    def _stop_listener_thread(self) -> None:
+        if self._listener is not None:
+            try:
+                self._listener.stop()
+            except Exception:
+                pass
+            self._listener = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            suscripciones = list(self._suscripciones)
+        return {
+            'subscriptions': len(suscripciones),
+            'coalesced': sum(s.coalesced for s in suscripciones),
+            'delivered': self.delivered,
+            'published': self.published,
+            'received': self.received,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._suscripciones.clear()
+
+
+live_positions = LivePositions(channel=settings.LIVE_CHANNEL)
+position_buffer.add_listener(live_positions.on_positions)
+RedisClient.add_reconnect_listener(live_positions.on_redis_reconnect)
@@ -0,0 +1,290 @@
+"""
+Buffer de escritura diferida (write-behind) de las posiciones GPS de los vehículos.
+
+Cada fix recibido por `POST /api/v1/vehiculos/posiciones` se guarda en memoria
+y, si Redis está disponible, en el hash `GPS_REDIS_KEY` (un solo pipeline por
+petición). De ahí se lee la última posición de forma inmediata, también
+desde otras réplicas. Cada `GPS_FLUSH_INTERVAL` segundos un hilo en segundo
+plano vuelca a la base la última posición de cada vehículo con un UPDATE
+executemany en lotes de `GPS_FLUSH_BATCH_SIZE`. Los fixes intermedios del
+mismo vehículo dentro del intervalo se descartan: solo importa el último.
+
+El UPDATE solo aplica si el fix es más reciente que lo guardado, así que el
+orden en que vuelquen las réplicas no importa. Si el volcado falla, los fixes
+vuelven al buffer (salvo que haya llegado uno más nuevo) para el siguiente
+intento. Lo que quede en memoria se vuelca al apagar el servicio; una caída
+del proceso pierde como mucho el último intervalo, que Redis sigue sirviendo
+como posición actual.
+
+Con `history` activo, todos los fixes aceptados (no solo el último) se insertan
+además en `vehiculo_posiciones` en la misma transacción del volcado; la
+compactación de ese historial está en app/core/position_history.py.
+"""
+import json
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import bindparam, insert, or_, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.core import database
+from app.core.config import settings
+from app.core.redis import RedisClient
+from app.models.vehiculo import Vehiculo
+from app.models.posicion_historial import PosicionHistorial
+
+logger = logging.getLogger(__name__)
+
+
+class Posicion(NamedTuple):
+    latitud: float
+    longitud: float
+    # UTC sin zona horaria, como la columna vehiculos.timestamp
+    timestamp: datetime
+
+
+def normalizar_timestamp(value: Optional[datetime]) -> datetime:
+    """UTC sin tzinfo; sin valor se usa la hora de recepción"""
+    if value is None:
+        return datetime.now(timezone.utc).replace(tzinfo=None)
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class PositionBuffer:
+    """Últimas posiciones por vehículo pendientes de volcar a la base."""
+
+    def __init__(
+        self,
+        flush_interval: float = 2.0,
+        batch_size: int = 1000,
+        redis_key: str = 'gps:posiciones',
+        use_redis: bool = True,
+        history: bool = True,
+        max_history: int = 200000,
+    ):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.redis_key = redis_key
+        self.use_redis = use_redis
+        self.history = history
+        self.max_history = max_history
+        self._history: List[Tuple[int, Posicion]] = []
+        self._latest: Dict[int, Posicion] = {}
+        self._dirty: Dict[int, Posicion] = {}
+        self._lock = threading.Lock()
+        # Serializa los volcados (hilo periódico y volcado final al apagar)
+        self._flush_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._listeners: List[Callable[[Dict[int, Posicion]], None]] = []
+        self.received = 0
+        self.discarded = 0
+        self.flushed = 0
+        self.flush_errors = 0
+        self.history_written = 0
+        self.history_dropped = 0
+
+    def add(self, fixes: Iterable[tuple]) -> int:
+        """Registrar fixes `(id_vehiculo, Posicion)`. Devuelve cuántos se aceptaron.
+
+        Se descartan los fixes más viejos que la última posición conocida del
+        vehículo (llegadas fuera de orden).
+        """
+        aceptados: Dict[int, Posicion] = {}
+        total = 0
+        with self._lock:
+            for vehiculo_id, posicion in fixes:
+                self.received += 1
+                actual = self._latest.get(vehiculo_id)
+                if actual is not None and actual.timestamp >= posicion.timestamp:
+                    self.discarded += 1
+                    continue
+                self._latest[vehiculo_id] = posicion
+                self._dirty[vehiculo_id] = posicion
+                aceptados[vehiculo_id] = posicion
+                if self.history:
+                    self._history.append((vehiculo_id, posicion))
+                total += 1
+        if aceptados:
+            self._publish(aceptados)
+            for listener in self._listeners:
+                try:
+                    listener(aceptados)
+                except Exception as e:
+                    logger.warning(f"Error notificando posiciones: {e}")
+        return total
+
+    def add_listener(self, listener: Callable[[Dict[int, Posicion]], None]) -> None:
+        """Registrar una función que recibe `{id_vehiculo: Posicion}` con cada lote aceptado"""
+        self._listeners.append(listener)
+
+    def _publish(self, posiciones: Dict[int, Posicion]) -> None:
+        client = RedisClient.get_client() if self.use_redis else None
+        if client is None:
+            return
+        try:
+            client.hset(self.redis_key, mapping={
+                str(vehiculo_id): json.dumps([p.latitud, p.longitud, p.timestamp.isoformat()])
+                for vehiculo_id, p in posiciones.items()
+            })
+        except Exception as e:
+            logger.warning(f"Error publicando posiciones en Redis: {e}")
+
+    def get(self, vehiculo_id: int) -> Optional[Posicion]:
+        """Última posición conocida sin pasar por la base: Redis (todas las réplicas) o memoria"""
+        local = self._latest.get(vehiculo_id)
+        client = RedisClient.get_client() if self.use_redis else None
+        if client is not None:
+            try:
+                raw = client.hget(self.redis_key, str(vehiculo_id))
+                if raw:
+                    latitud, longitud, timestamp = json.loads(raw)
+                    remota = Posicion(latitud, longitud, datetime.fromisoformat(timestamp))
+                    if local is None or remota.timestamp > local.timestamp:
+                        return remota
+            except Exception as e:
+                logger.warning(f"Error leyendo posición de Redis: {e}")
+        return local
+
+    def discard(self, vehiculo_id: int) -> None:
+        """Olvidar la posición de un vehículo (escrita directamente en la base o vehículo borrado)"""
+        with self._lock:
+            self._latest.pop(vehiculo_id, None)
+            self._dirty.pop(vehiculo_id, None)
+        client = RedisClient.get_client() if self.use_redis else None
+        if client is not None:
+            try:
+                client.hdel(self.redis_key, str(vehiculo_id))
+            except Exception as e:
+                logger.warning(f"Error borrando posición de Redis: {e}")
+
+    def pending(self) -> int:
+        return len(self._dirty)
+
+    @staticmethod
+    def _insert_history(db):
+        """INSERT del historial que ignora fixes ya insertados (reintentos, varias réplicas)"""
+        dialecto = db.get_bind().dialect.name
+        if dialecto == 'postgresql':
+            return postgresql.insert(PosicionHistorial).on_conflict_do_nothing()
+        if dialecto == 'sqlite':
+            return sqlite.insert(PosicionHistorial).on_conflict_do_nothing()
+        return insert(PosicionHistorial)
+
+    def flush(self) -> int:
+        """Volcar a la base las posiciones pendientes. Devuelve cuántas se enviaron"""
+        with self._flush_lock:
+            with self._lock:
+                lote, self._dirty = self._dirty, {}
+                historial, self._history = self._history, []
+            if not lote and not historial:
+                return 0
+
+            tabla = Vehiculo.__table__
+            stmt = (
+                update(tabla)
+                .where(tabla.c.id == bindparam('b_id'))
+                # Un fix viejo (de otra réplica o reintentado) no pisa uno más nuevo
+                .where(or_(tabla.c.timestamp.is_(None), tabla.c.timestamp < bindparam('b_timestamp')))
+                .values(
+                    latitud=bindparam('b_latitud'),
+                    longitud=bindparam('b_longitud'),
+                    timestamp=bindparam('b_timestamp'),
+                )
+            )
+            filas = [
+                {"b_id": vehiculo_id, "b_latitud": p.latitud, "b_longitud": p.longitud, "b_timestamp": p.timestamp}
+                for vehiculo_id, p in lote.items()
+            ]
+            db = None
+            try:
+                db = database.SessionLocal()
+                for i in range(0, len(filas), self.batch_size):
+                    db.execute(stmt, filas[i:i + self.batch_size])
+                if historial:
+                    insert_historial = self._insert_history(db)
+                    for i in range(0, len(historial), self.batch_size):
+                        db.execute(insert_historial, [
+                            {"id_vehiculo": vehiculo_id, "timestamp": p.timestamp, "latitud": p.latitud, "longitud": p.longitud}
+                            for vehiculo_id, p in historial[i:i + self.batch_size]
+                        ])
+                db.commit()
+            except Exception as e:
+                if db is not None:
+                    db.rollback()
+                self.flush_errors += 1
+                logger.error(f"Error volcando {len(lote)} posiciones: {e}")
+                with self._lock:
+                    for vehiculo_id, posicion in lote.items():
+                        self._dirty.setdefault(vehiculo_id, posicion)
+                    self._history[:0] = historial
+                    # Con la base caída el historial no crece sin límite: se pierden los más viejos
+                    sobrantes = len(self._history) - self.max_history
+                    if sobrantes > 0:
+                        del self._history[:sobrantes]
+                        self.history_dropped += sobrantes
+                return 0
+            finally:
+                if db is not None:
+                    db.close()
+
+            self.flushed += len(lote)
+            self.history_written += len(historial)
+            # La posición forma parte del cuerpo cacheado de GET /vehiculos/{id}
+            from app.core.cache import cache
+            cache.invalidate_many("vehiculo", list(lote))
+            return len(lote)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='gps-flush', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        # Lo que quede en memoria se vuelca antes de salir
+        self.flush()
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error en el volcado periódico de posiciones: {e}")
+
+    def stats(self) -> dict:
+        return {
+            'vehicles': len(self._latest),
+            'pending': len(self._dirty),
+            'received': self.received,
+            'discarded': self.discarded,
+            'flushed': self.flushed,
+            'flush_errors': self.flush_errors,
+            'history_pending': len(self._history),
+            'history_written': self.history_written,
+            'history_dropped': self.history_dropped,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._latest.clear()
+            self._dirty.clear()
+            self._history.clear()
+
+
+position_buffer = PositionBuffer(
+    flush_interval=settings.GPS_FLUSH_INTERVAL,
+    batch_size=settings.GPS_FLUSH_BATCH_SIZE,
+    redis_key=settings.GPS_REDIS_KEY,
+    history=settings.GPS_HISTORIAL_ENABLED,
+    max_history=settings.GPS_HISTORIAL_MAX_PENDIENTES,
+)
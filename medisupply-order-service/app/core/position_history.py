@@ -0,0 +1,252 @@
+"""
+Compactación del historial de posiciones GPS.
+
+Los fixes crudos se insertan en `vehiculo_posiciones` desde el buffer de
+posiciones (app/core/position_buffer.py), en el mismo volcado periódico que
+actualiza la última posición de cada vehículo. Para que el almacenamiento no
+crezca sin límite, un hilo en segundo plano cada `GPS_COMPACTACION_INTERVALO`
+segundos:
+
+1. Agrega los días más viejos que `GPS_HISTORIAL_DIAS` en
+   `vehiculo_posiciones_rollup`: una posición media por vehículo cada
+   `GPS_ROLLUP_RESOLUCION` segundos. Un fix que llegue tarde a un intervalo ya
+   agregado se suma como media ponderada.
+2. Elimina esos fixes crudos. En PostgreSQL con la tabla particionada
+   (migrations/003_vehiculo_posiciones.sql) borra las particiones diarias
+   completas con DROP TABLE; en otro caso, o para lo que haya caído en la
+   partición DEFAULT, con un DELETE por rango.
+3. Borra los rollups más viejos que `GPS_ROLLUP_DIAS`.
+4. Crea las particiones de hoy y de los próximos días.
+
+En PostgreSQL `create_tables` no crea `vehiculo_posiciones` con `create_all`
+(quedaría como tabla normal y la migración 003 ya no la particionaría): la
+crea particionada `ensure_history_table`.
+
+Con varias réplicas solo una compacta a la vez (advisory lock de PostgreSQL).
+"""
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from sqlalchemy import DateTime, bindparam, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.core import database
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+TABLA = 'vehiculo_posiciones'
+TABLA_ROLLUP = 'vehiculo_posiciones_rollup'
+PARTICIONES_ADELANTE = 3
+
+_BUCKET_SQL = {
+    'postgresql': "to_timestamp(floor(extract(epoch FROM timestamp) / :resolucion) * :resolucion) AT TIME ZONE 'UTC'",
+    # Mismo formato de texto con el que SQLAlchemy guarda DateTime en SQLite
+    'sqlite': "strftime('%Y-%m-%d %H:%M:%S.000000', "
+              "(CAST(strftime('%s', timestamp) AS INTEGER) / :resolucion) * :resolucion, 'unixepoch')",
+}
+
+_ROLLUP_SQL = f"""
+    INSERT INTO {TABLA_ROLLUP} (id_vehiculo, bucket, latitud, longitud, muestras)
+    SELECT id_vehiculo, {{bucket}} AS b, AVG(latitud), AVG(longitud), COUNT(*)
+    FROM {TABLA}
+    WHERE timestamp < :corte
+    GROUP BY id_vehiculo, b
+    ON CONFLICT (id_vehiculo, bucket) DO UPDATE SET
+        latitud = ({TABLA_ROLLUP}.latitud * {TABLA_ROLLUP}.muestras + excluded.latitud * excluded.muestras)
+                  / ({TABLA_ROLLUP}.muestras + excluded.muestras),
+        longitud = ({TABLA_ROLLUP}.longitud * {TABLA_ROLLUP}.muestras + excluded.longitud * excluded.muestras)
+                   / ({TABLA_ROLLUP}.muestras + excluded.muestras),
+        muestras = {TABLA_ROLLUP}.muestras + excluded.muestras
+"""
+
+
+_DDL_TABLA_POSTGRES = f"""
+    CREATE TABLE IF NOT EXISTS {TABLA} (
+        id_vehiculo INTEGER NOT NULL,
+        timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+        latitud DOUBLE PRECISION NOT NULL,
+        longitud DOUBLE PRECISION NOT NULL,
+        PRIMARY KEY (id_vehiculo, timestamp)
+    ) PARTITION BY RANGE (timestamp)
+"""
+
+_SQL_PARTICIONADA = "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:tabla)"
+
+
+def ensure_history_table(engine: Engine) -> bool:
+    """
+    Crear `vehiculo_posiciones` particionada por día (PostgreSQL), con su
+    partición DEFAULT. Devuelve si la tabla está particionada.
+    """
+    with engine.begin() as conn:
+        conn.execute(text(_DDL_TABLA_POSTGRES))
+        particionada = conn.execute(text(_SQL_PARTICIONADA), {"tabla": TABLA}).first() is not None
+        if particionada:
+            conn.execute(text(f"CREATE TABLE IF NOT EXISTS {TABLA}_default PARTITION OF {TABLA} DEFAULT"))
+    if not particionada:
+        logger.error(
+            f"⚠️ {TABLA} existe SIN particionar: la compactación borrará los fixes viejos con DELETE "
+            f"por rango. Recrear la tabla particionada (migrations/003_vehiculo_posiciones.sql)."
+        )
+    return particionada
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _nombre_particion(dia: datetime) -> str:
+    return f"{TABLA}_p{dia:%Y%m%d}"
+
+
+class PositionHistory:
+    """Compactador periódico del historial de posiciones."""
+
+    def __init__(
+        self,
+        dias_crudos: int = 7,
+        resolucion_rollup: int = 300,
+        dias_rollup: int = 365,
+        interval: float = 3600,
+    ):
+        self.dias_crudos = dias_crudos
+        self.resolucion_rollup = resolucion_rollup
+        self.dias_rollup = dias_rollup
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.runs = 0
+        self.errors = 0
+        self.last_run: Optional[datetime] = None
+
+    def _particionada(self, db: Session) -> bool:
+        if db.get_bind().dialect.name != 'postgresql':
+            return False
+        return db.execute(text(_SQL_PARTICIONADA), {"tabla": TABLA}).first() is not None
+
+    def _particiones(self, db: Session) -> List[str]:
+        filas = db.execute(text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(:tabla)"
+        ), {"tabla": TABLA})
+        return [fila[0] for fila in filas]
+
+    def ensure_partitions(self, db: Session, hoy: datetime) -> List[str]:
+        """Crear las particiones diarias de hoy y los próximos días"""
+        creadas = []
+        existentes = set(self._particiones(db))
+        for i in range(PARTICIONES_ADELANTE):
+            dia = hoy + timedelta(days=i)
+            nombre = _nombre_particion(dia)
+            if nombre in existentes:
+                continue
+            try:
+                with db.begin_nested():
+                    db.execute(text(
+                        f"CREATE TABLE IF NOT EXISTS {nombre} PARTITION OF {TABLA} "
+                        f"FOR VALUES FROM ('{dia:%Y-%m-%d}') TO ('{dia + timedelta(days=1):%Y-%m-%d}')"
+                    ))
+                creadas.append(nombre)
+            except Exception as e:
+                # Típicamente: la partición DEFAULT ya tiene filas de ese día
+                logger.warning(f"No se pudo crear la partición {nombre}: {e}")
+        return creadas
+
+    def compact(self, ahora: Optional[datetime] = None) -> dict:
+        """Agregar y eliminar los fixes crudos viejos. Devuelve un resumen de lo hecho"""
+        ahora = ahora or _utcnow()
+        hoy = ahora.replace(hour=0, minute=0, second=0, microsecond=0)
+        corte = hoy - timedelta(days=self.dias_crudos)
+        resumen = {"corte": corte, "rollups": 0, "particiones_borradas": [], "crudos_borrados": 0,
+                   "rollups_borrados": 0, "particiones_creadas": []}
+
+        db = database.SessionLocal()
+        try:
+            dialecto = db.get_bind().dialect.name
+            if dialecto == 'postgresql' and not db.execute(
+                text("SELECT pg_try_advisory_xact_lock(hashtext(:nombre))"), {"nombre": TABLA}
+            ).scalar():
+                logger.info("Otra réplica está compactando el historial de posiciones")
+                return resumen
+
+            bucket = _BUCKET_SQL.get(dialecto)
+            if bucket is None:
+                raise RuntimeError(f"Compactación no soportada para {dialecto}")
+            resumen["rollups"] = db.execute(
+                text(_ROLLUP_SQL.format(bucket=bucket)).bindparams(bindparam("corte", type_=DateTime)),
+                {"corte": corte, "resolucion": self.resolucion_rollup},
+            ).rowcount
+
+            particionada = self._particionada(db)
+            if particionada:
+                limite = _nombre_particion(corte)
+                for nombre in sorted(self._particiones(db)):
+                    # Los nombres _pYYYYMMDD ordenan como las fechas
+                    if nombre.startswith(f"{TABLA}_p") and nombre < limite:
+                        db.execute(text(f"DROP TABLE IF EXISTS {nombre}"))
+                        resumen["particiones_borradas"].append(nombre)
+            resumen["crudos_borrados"] = db.execute(
+                text(f"DELETE FROM {TABLA} WHERE timestamp < :corte").bindparams(bindparam("corte", type_=DateTime)),
+                {"corte": corte},
+            ).rowcount
+            resumen["rollups_borrados"] = db.execute(
+                text(f"DELETE FROM {TABLA_ROLLUP} WHERE bucket < :limite").bindparams(bindparam("limite", type_=DateTime)),
+                {"limite": hoy - timedelta(days=self.dias_rollup)},
+            ).rowcount
+            if particionada:
+                resumen["particiones_creadas"] = self.ensure_partitions(db, hoy)
+            db.commit()
+        except Exception:
+            db.rollback()
+            self.errors += 1
+            raise
+        finally:
+            db.close()
+
+        self.runs += 1
+        self.last_run = ahora
+        logger.info(f"Historial de posiciones compactado: {resumen}")
+        return resumen
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='gps-compaction', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        # Primera pasada al arrancar: crea las particiones del día
+        while True:
+            try:
+                self.compact()
+            except Exception as e:
+                logger.error(f"Error compactando el historial de posiciones: {e}")
+            if self._stop_event.wait(self.interval):
+                return
+
+    def stats(self) -> dict:
+        return {
+            'runs': self.runs,
+            'errors': self.errors,
+            'last_run': self.last_run.isoformat() if self.last_run else None,
+        }
+
+
+position_history = PositionHistory(
+    dias_crudos=settings.GPS_HISTORIAL_DIAS,
+    resolucion_rollup=settings.GPS_ROLLUP_RESOLUCION,
+    dias_rollup=settings.GPS_ROLLUP_DIAS,
+    interval=settings.GPS_COMPACTACION_INTERVALO,
+)
@@ -1,48 +1,184 @@
 import redis
-from typing import Optional
+from redis.backoff import NoBackoff
+from redis.client import Pipeline
+from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
+from redis.retry import Retry
+from typing import Callable, List, Optional
 from app.core.config import settings
 import json
 import logging
+import random
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
+# Errores que indican que Redis no responde (no los de uso, como WRONGTYPE)
+_OUTAGE_ERRORS = (RedisConnectionError, RedisTimeoutError, OSError)
+
+
+class _BreakerPipeline(Pipeline):
+    """Pipeline que informa al circuit breaker del resultado de cada ejecución"""
+
+    def execute(self, raise_on_error: bool = True):
+        try:
+            result = super().execute(raise_on_error)
+        except _OUTAGE_ERRORS:
+            RedisClient.record_failure()
+            raise
+        RedisClient.record_success()
+        return result
+
+
+class _BreakerRedis(redis.Redis):
+    """Cliente Redis que informa al circuit breaker del resultado de cada comando"""
+
+    def execute_command(self, *args, **options):
+        try:
+            result = super().execute_command(*args, **options)
+        except _OUTAGE_ERRORS:
+            RedisClient.record_failure()
+            raise
+        RedisClient.record_success()
+        return result
+
+    def pipeline(self, transaction=True, shard_hint=None) -> Pipeline:
+        return _BreakerPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
 
 class RedisClient:
-    """Cliente Redis singleton para caching"""
+    """Cliente Redis singleton para caching, con circuit breaker.
+
+    - Pool de conexiones acotado (`REDIS_MAX_CONNECTIONS`); si está agotado se
+      espera como mucho `REDIS_POOL_TIMEOUT` por una conexión libre.
+    - Tras `REDIS_BREAKER_THRESHOLD` fallos seguidos de conexión o timeout el
+      circuito se abre: `get_client()` devuelve None sin tocar la red y los
+      llamadores siguen sin caché, en lugar de esperar el timeout en cada
+      petición. Sin reintentos por comando: el breaker sustituye al Retry por
+      defecto de redis-py, que multiplicaría la espera durante una caída.
+    - Con el circuito abierto un hilo en segundo plano prueba la conexión con
+      backoff exponencial (`REDIS_PROBE_INITIAL_DELAY` .. `REDIS_PROBE_MAX_DELAY`)
+      y lo cierra en cuanto Redis responde: la caché vuelve sola tras un
+      reinicio de Redis, sin reiniciar las réplicas.
+    - `REDIS_ENABLED=False` sigue desactivando Redis por completo.
+    """
     _instance: Optional[redis.Redis] = None
     _enabled: bool = settings.REDIS_ENABLED
+    # Reentrante: el ping inicial se hace con el lock tomado y su fallo pasa por record_failure
+    _lock = threading.RLock()
+    _failures: int = 0
+    _open: bool = False
+    _opened_at: Optional[float] = None
+    _probe_thread: Optional[threading.Thread] = None
+    _stop_probe = threading.Event()
+    _reconnect_listeners: List[Callable[[], None]] = []
+    
+    @classmethod
+    def _create_client(cls) -> redis.Redis:
+        pool = redis.BlockingConnectionPool.from_url(
+            settings.REDIS_URL,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            timeout=settings.REDIS_POOL_TIMEOUT,
+            decode_responses=True,
+            socket_connect_timeout=settings.REDIS_SOCKET_CONNECT_TIMEOUT,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            retry=Retry(NoBackoff(), 0),
+            health_check_interval=30
+        )
+        return _BreakerRedis(connection_pool=pool)
     
     @classmethod
     def get_client(cls) -> Optional[redis.Redis]:
-        """Obtener instancia de Redis (singleton)"""
-        if not cls._enabled:
+        """Obtener instancia de Redis (singleton); None si está deshabilitado o el circuito está abierto"""
+        if not cls._enabled or cls._open:
             return None
             
         if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None and not cls._open:
+                    client = cls._create_client()
+                    try:
+                        client.ping()
+                        cls._instance = client
+                        logger.info(f"✅ Redis conectado: {settings.REDIS_URL}")
+                    except Exception as e:
+                        logger.warning(f"⚠️ No se pudo conectar a Redis: {e}. Caché en pausa hasta que responda.")
+                        client.close()
+                        cls._trip()
+        
+        return None if cls._open else cls._instance
+    
+    @classmethod
+    def record_success(cls) -> None:
+        cls._failures = 0
+    
+    @classmethod
+    def record_failure(cls) -> None:
+        with cls._lock:
+            cls._failures += 1
+            if cls._failures >= settings.REDIS_BREAKER_THRESHOLD and not cls._open:
+                logger.warning(f"⚠️ Redis falló {cls._failures} veces seguidas: circuito abierto, caché en pausa")
+                cls._trip()
+    
+    @classmethod
+    def _trip(cls) -> None:
+        """Abrir el circuito y lanzar la sonda de reconexión (llamar con `_lock` tomado)"""
+        cls._open = True
+        cls._opened_at = time.time()
+        if cls._probe_thread is None or not cls._probe_thread.is_alive():
+            cls._stop_probe.clear()
+            cls._probe_thread = threading.Thread(target=cls._probe, name="redis-probe", daemon=True)
+            cls._probe_thread.start()
+    
+    @classmethod
+    def _probe(cls) -> None:
+        delay = settings.REDIS_PROBE_INITIAL_DELAY
+        while not cls._stop_probe.is_set():
+            # Jitter para que las réplicas no prueben todas a la vez
+            if cls._stop_probe.wait(delay * random.uniform(0.5, 1.0)):
+                return
+            probe = redis.Redis.from_url(
+                settings.REDIS_URL,
+                socket_connect_timeout=settings.REDIS_SOCKET_CONNECT_TIMEOUT,
+                socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+                retry=Retry(NoBackoff(), 0)
+            )
             try:
-                cls._instance = redis.from_url(
-                    settings.REDIS_URL,
-                    decode_responses=True,
-                    socket_connect_timeout=2,
-                    socket_timeout=2,
-                    retry_on_timeout=True,
-                    health_check_interval=30
-                )
-                # Test connection
-                cls._instance.ping()
-                logger.info(f"✅ Redis conectado: {settings.REDIS_URL}")
+                probe.ping()
             except Exception as e:
-                logger.warning(f"⚠️ No se pudo conectar a Redis: {e}. Caché deshabilitado.")
-                cls._instance = None
-                cls._enabled = False
-        
-        return cls._instance
+                logger.debug(f"Redis sigue sin responder: {e}")
+                delay = min(delay * 2, settings.REDIS_PROBE_MAX_DELAY)
+                continue
+            finally:
+                probe.close()
+            cls._close_circuit()
+            return
+    
+    @classmethod
+    def _close_circuit(cls) -> None:
+        with cls._lock:
+            # Las conexiones del pool pueden haber quedado rotas durante la caída
+            if cls._instance is not None:
+                cls._instance.connection_pool.disconnect()
+            cls._failures = 0
+            cls._open = False
+            downtime = time.time() - (cls._opened_at or time.time())
+            cls._opened_at = None
+        logger.info(f"✅ Redis disponible de nuevo tras {downtime:.0f}s: caché reactivado")
+        for listener in list(cls._reconnect_listeners):
+            try:
+                listener()
+            except Exception as e:
+                logger.warning(f"Error en listener de reconexión de Redis: {e}")
+    
+    @classmethod
+    def add_reconnect_listener(cls, listener: Callable[[], None]) -> None:
+        """Registrar una función a llamar cada vez que el circuito se cierra tras una caída"""
+        cls._reconnect_listeners.append(listener)
     
     @classmethod
     def is_available(cls) -> bool:
         """Verificar si Redis está disponible"""
-        if not cls._enabled:
-            return False
         try:
             client = cls.get_client()
             if client:
@@ -52,12 +188,23 @@ class RedisClient:
             pass
         return False
     
+    @classmethod
+    def stats(cls) -> dict:
+        return {
+            "enabled": cls._enabled,
+            "circuit": "open" if cls._open else "closed",
+            "consecutive_failures": cls._failures,
+            "open_since": cls._opened_at,
+        }
+    
     @classmethod
     def close(cls):
         """Cerrar conexión a Redis"""
+        cls._stop_probe.set()
         if cls._instance:
             try:
                 cls._instance.close()
+                cls._instance.connection_pool.disconnect()
                 logger.info("Redis conexión cerrada")
             except Exception as e:
                 logger.error(f"Error cerrando Redis: {e}")
@@ -12,8 +12,9 @@ from app.api.v1 import (
     internal_routes
 )
 from app.core.dependencies import require_auth_security
-from app.core.auth import require_auth
+from app.core.auth import require_auth_async
 from app.core.database import create_tables
+from app.core.indexes import ensure_indexes
 from app.core.config import settings
 import os
 import logging
@@ -50,6 +51,8 @@ def ensure_tables_exist():
             
             logger.info(f"Attempting to create database tables (attempt {attempt + 1}/{max_retries})...")
             create_tables()
+            if settings.ENSURE_INDEXES_ON_STARTUP:
+                ensure_indexes(engine)
             
             ordenes_table_exists = False
             try:
@@ -114,6 +117,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Los clientes web leen aquí el cursor de la siguiente página de órdenes
+    expose_headers=["X-Next-Cursor"],
 )
 
 app.include_router(orden_routes.router, dependencies=[Security(require_auth_security)])
@@ -161,7 +166,7 @@ async def auth_middleware(request: Request, call_next):
         request.state.user = {"id": 0, "email": "test@local", "name": "test-user", "is_active": True}
     else:
         try:
-            user_json = require_auth(request)
+            user_json = await require_auth_async(request)
             request.state.user = user_json
         except HTTPException as exc:
             return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail})
@@ -237,11 +242,25 @@ def order_healthz():
                     }
                 )
         
+        from app.core.token_cache import token_cache
+        from app.core.cache import cache
+        from app.core.redis import RedisClient
+        from app.core.position_buffer import position_buffer
+        from app.core.geo_index import geo_index
+        from app.core.position_history import position_history
+        from app.core.live_positions import live_positions
         return {
             "status": "healthy",
             "service": "order-service",
             "database": "connected",
-            "tables": "ready"
+            "tables": "ready",
+            "auth_cache": token_cache.stats(),
+            "cache": cache.stats(),
+            "redis": RedisClient.stats(),
+            "gps": position_buffer.stats(),
+            "geo": geo_index.stats(),
+            "gps_history": position_history.stats(),
+            "live": live_positions.stats()
         }
     except HTTPException:
         raise
@@ -284,6 +303,32 @@ async def startup_event():
     else:
         logger.warning("⚠️ Redis no disponible - funcionando sin caché")
     
+    # Invalidaciones de la caché de lecturas publicadas por las demás réplicas
+    from app.core.cache import cache
+    cache.start_listener()
+    
+    # Volcado periódico a la base de las posiciones GPS recibidas
+    from app.core.position_buffer import position_buffer
+    position_buffer.start()
+    
+    # Eventos en vivo publicados por las demás réplicas (SSE)
+    from app.core.live_positions import live_positions
+    live_positions.start_listener()
+    
+    # Compactación periódica del historial de posiciones
+    if settings.GPS_HISTORIAL_ENABLED:
+        from app.core.position_history import position_history
+        position_history.start()
+    
+    # Pool HTTP compartido para las llamadas a otros servicios
+    from app.core.http_client import init_http_clients
+    init_http_clients()
+    
+    # Refresco en segundo plano de las claves públicas del user-service
+    if settings.AUTH_MODE == 'local' and not settings.JWT_ALGORITHM.startswith('HS'):
+        from app.core.jwks import jwks_cache
+        jwks_cache.start()
+    
     import asyncio
     
     async def retry_create_tables_and_seed():
@@ -306,8 +351,24 @@ async def startup_event():
 async def shutdown_event():
     logger.info(f"{settings.PROJECT_NAME} shutting down...")
     
+    # Volcar las posiciones pendientes antes de cerrar Redis
+    from app.core.position_buffer import position_buffer
+    position_buffer.stop()
+    from app.core.position_history import position_history
+    position_history.stop()
+    
     # Cerrar conexión Redis
+    from app.core.cache import cache
+    cache.stop_listener()
+    from app.core.live_positions import live_positions
+    live_positions.stop_listener()
     from app.core.redis import RedisClient
     RedisClient.close()
     
+    from app.core.jwks import jwks_cache
+    jwks_cache.stop()
+
+    from app.core.http_client import close_http_clients
+    await close_http_clients()
+    
     logger.info("✅ Shutdown complete")
@@ -4,6 +4,7 @@ from app.models.orden_producto import OrdenProducto
 from app.models.bodega import Bodega
 from app.models.bodega_producto import BodegaProducto
 from app.models.novedad_orden import NovedadOrden, TipoNovedad
+from app.models.posicion_historial import PosicionHistorial, PosicionRollup
 
 __all__ = [
     "Orden",
@@ -14,4 +15,6 @@ __all__ = [
     "BodegaProducto",
     "NovedadOrden",
     "TipoNovedad",
+    "PosicionHistorial",
+    "PosicionRollup",
 ]
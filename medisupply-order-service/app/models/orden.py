@@ -1,8 +1,9 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
 import enum
+from datetime import datetime, timezone
 
 
 class EstadoOrden(str, enum.Enum):
@@ -16,14 +17,27 @@ class EstadoOrden(str, enum.Enum):
 
 class Orden(Base):
     __tablename__ = 'ordenes'
+    # Índices compuestos para los filtros de los listados: todos ordenan por
+    # (fecha_creacion, id), así que la paginación por cursor se resuelve con
+    # un recorrido del índice sin ordenar en memoria.
+    # En bases existentes se crean con migrations/002_ordenes_composite_indexes.sql
+    __table_args__ = (
+        Index('ix_ordenes_fecha_creacion_id', 'fecha_creacion', 'id'),
+        Index('ix_ordenes_estado_fecha_creacion', 'estado', 'fecha_creacion', 'id'),
+        Index('ix_ordenes_id_vendedor_fecha_creacion', 'id_vendedor', 'fecha_creacion', 'id'),
+        Index('ix_ordenes_id_cliente_fecha_creacion', 'id_cliente', 'fecha_creacion', 'id'),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     fecha_entrega_estimada = Column(DateTime, nullable=False)
     id_vehiculo = Column(Integer, ForeignKey('vehiculos.id'), nullable=True)
-    id_cliente = Column(Integer, nullable=False, index=True)
-    id_vendedor = Column(Integer, nullable=False, index=True)
+    # Sin índice propio: los compuestos de __table_args__ empiezan por estas columnas
+    id_cliente = Column(Integer, nullable=False)
+    id_vendedor = Column(Integer, nullable=False)
     estado = Column(Enum(EstadoOrden), nullable=False, default=EstadoOrden.ABIERTO, server_default=EstadoOrden.ABIERTO.value)
-    fecha_creacion = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    # El valor se asigna también en Python para que se guarde con el mismo formato con el que
+    # se compara en la paginación por cursor (en SQLite CURRENT_TIMESTAMP no lleva microsegundos)
+    fecha_creacion = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc), server_default=func.now())
     
     # Relationships
     vehiculo = relationship("Vehiculo", back_populates="ordenes")
@@ -1,10 +1,15 @@
-from sqlalchemy import Column, Integer, ForeignKey
+from sqlalchemy import Column, Integer, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 
 
 class OrdenProducto(Base):
     __tablename__ = 'orden_producto'
+    # La PK (id_orden, id_producto) cubre las búsquedas por orden; las búsquedas
+    # por producto necesitan su propio índice
+    __table_args__ = (
+        Index('ix_orden_producto_id_producto', 'id_producto'),
+    )
     
     id_orden = Column(Integer, ForeignKey('ordenes.id'), primary_key=True)
     id_producto = Column(Integer, primary_key=True)
@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, Float, DateTime
+from app.core.database import Base
+
+
+class PosicionHistorial(Base):
+    """Fixes GPS crudos, solo inserción. En PostgreSQL la tabla está particionada
+    por día (migrations/003_vehiculo_posiciones.sql)."""
+    __tablename__ = 'vehiculo_posiciones'
+
+    # La PK (id_vehiculo, timestamp) es el índice de las consultas de trayectoria
+    id_vehiculo = Column(Integer, primary_key=True)
+    timestamp = Column(DateTime, primary_key=True)
+    latitud = Column(Float, nullable=False)
+    longitud = Column(Float, nullable=False)
+
+
+class PosicionRollup(Base):
+    """Posición media por vehículo e intervalo de GPS_ROLLUP_RESOLUCION segundos,
+    para los días cuyos fixes crudos ya se compactaron."""
+    __tablename__ = 'vehiculo_posiciones_rollup'
+
+    id_vehiculo = Column(Integer, primary_key=True)
+    # Inicio del intervalo
+    bucket = Column(DateTime, primary_key=True)
+    latitud = Column(Float, nullable=False)
+    longitud = Column(Float, nullable=False)
+    muestras = Column(Integer, nullable=False)
@@ -30,6 +30,10 @@ class OrdenCreate(OrdenBase):
     estado: Optional[EstadoOrden] = EstadoOrden.ABIERTO
 
 
+class OrdenBulkCreate(BaseModel):
+    ordenes: List[OrdenCreate]
+
+
 class OrdenUpdate(BaseModel):
     fecha_entrega_estimada: Optional[datetime] = None
     id_vehiculo: Optional[int] = None
@@ -47,3 +51,18 @@ class OrdenResponse(OrdenBase):
 
     class Config:
         from_attributes = True
+
+
+class OrdenBulkItemResult(BaseModel):
+    # Posición de la orden en la lista enviada
+    index: int
+    success: bool
+    orden: Optional[OrdenResponse] = None
+    error: Optional[str] = None
+
+
+class OrdenBulkResponse(BaseModel):
+    total: int
+    created: int
+    failed: int
+    results: List[OrdenBulkItemResult]
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 from pydantic import BaseModel, Field
 from app.models.vehiculo import TipoVehiculo
@@ -35,3 +35,49 @@ class VehiculoResponse(VehiculoBase):
     class Config:
         from_attributes = True
         populate_by_name = True
+
+
+class PosicionVehiculoCreate(BaseModel):
+    id_vehiculo: int
+    latitud: float = Field(ge=-90, le=90)
+    longitud: float = Field(ge=-180, le=180)
+    # Hora del fix en el dispositivo; sin valor se usa la hora de recepción
+    timestamp: Optional[datetime] = None
+
+
+class PosicionVehiculoResponse(BaseModel):
+    id_vehiculo: int
+    latitud: float
+    longitud: float
+    timestamp: Optional[datetime] = None
+
+
+class PosicionesIngestaResponse(BaseModel):
+    recibidas: int
+    aceptadas: int
+    # Fixes más viejos que la última posición conocida del vehículo
+    descartadas: int
+    # Vehículos que no existen; sus fixes no se registran
+    desconocidos: List[int] = []
+
+
+class VehiculoCercanoResponse(BaseModel):
+    id_vehiculo: int
+    distancia_km: float
+    latitud: float
+    longitud: float
+
+
+class PuntoTrayectoria(BaseModel):
+    latitud: float
+    longitud: float
+    timestamp: datetime
+
+
+class TrayectoriaResponse(BaseModel):
+    id_vehiculo: int
+    desde: datetime
+    hasta: datetime
+    # Segundos entre puntos consecutivos (como mínimo); None si son los fixes crudos
+    resolucion: Optional[int] = None
+    puntos: List[PuntoTrayectoria]
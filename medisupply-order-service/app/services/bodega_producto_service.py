@@ -1,4 +1,5 @@
-from typing import List, Optional
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import case
 from sqlalchemy.orm import Session
 from app.models.bodega_producto import BodegaProducto
 from app.models.bodega import Bodega
@@ -6,6 +7,12 @@ from app.schemas.bodega_producto_schema import BodegaProductoCreate, BodegaProdu
 from datetime import datetime, timedelta
 import math
 
+# Velocidad media de transporte usada en el pronóstico de entrega
+VELOCIDAD_TRANSPORTE_KMH = 20.0
+
+# Valores aceptados por `ordenar_por` en el listado
+ORDENES_BODEGA_PRODUCTO = ("pronostico_entrega",)
+
 
 class BodegaProductoService:
     def __init__(self, db: Session):
@@ -54,7 +61,7 @@ class BodegaProductoService:
         distancia_km = self._calcular_distancia_haversine(lat_origen, lon_origen, lat_bodega, lon_bodega)
         
         # Calcular tiempo de viaje en horas (velocidad = 20 km/h)
-        tiempo_viaje_horas = distancia_km / 20.0
+        tiempo_viaje_horas = distancia_km / VELOCIDAD_TRANSPORTE_KMH
         
         # Convertir días de alistamiento a horas
         tiempo_alistamiento_horas = dias_alistamiento * 24
@@ -74,6 +81,17 @@ class BodegaProductoService:
         self.db.refresh(bodega_producto)
         return bodega_producto
 
+    def _horas_viaje_por_bodega(self, latitud: float, longitud: float, bodegas: Iterable[tuple]) -> Dict[int, float]:
+        """
+        Horas de viaje desde el origen hasta cada bodega con ubicación.
+        Se calcula una sola vez por bodega, no por cada producto/lote listado.
+        """
+        return {
+            bodega_id: self._calcular_distancia_haversine(latitud, longitud, float(lat), float(lon)) / VELOCIDAD_TRANSPORTE_KMH
+            for bodega_id, lat, lon in bodegas
+            if lat and lon
+        }
+
     def listar_bodega_productos(
         self, 
         skip: int = 0, 
@@ -82,9 +100,17 @@ class BodegaProductoService:
         id_producto: Optional[int] = None,
         lote: Optional[str] = None,
         latitud: Optional[float] = None,
-        longitud: Optional[float] = None
+        longitud: Optional[float] = None,
+        ordenar_por: Optional[str] = None
     ) -> List[dict]:
-        query = self.db.query(BodegaProducto).join(Bodega)
+        if ordenar_por is not None and ordenar_por not in ORDENES_BODEGA_PRODUCTO:
+            raise ValueError(f"ordenar_por debe ser uno de: {', '.join(ORDENES_BODEGA_PRODUCTO)}")
+        con_origen = latitud is not None and longitud is not None
+        if ordenar_por == "pronostico_entrega" and not con_origen:
+            raise ValueError("ordenar_por=pronostico_entrega requiere latitud y longitud")
+
+        # La ubicación de la bodega sale del mismo JOIN, sin una consulta por fila
+        query = self.db.query(BodegaProducto, Bodega.latitud, Bodega.longitud).join(Bodega)
         
         # Apply filters if provided
         if id_bodega:
@@ -93,13 +119,33 @@ class BodegaProductoService:
             query = query.filter(BodegaProducto.id_producto == id_producto)
         if lote:
             query = query.filter(BodegaProducto.lote == lote)
-        
-        bodega_productos = query.offset(skip).limit(limit).all()
+
+        horas_viaje: Dict[int, float] = {}
+        if ordenar_por == "pronostico_entrega":
+            # Se ordena en la base para que la paginación respete el orden: el
+            # tiempo de viaje de cada bodega entra en la consulta como un CASE
+            bodegas = self.db.query(Bodega.id, Bodega.latitud, Bodega.longitud)
+            if id_bodega:
+                bodegas = bodegas.filter(Bodega.id == id_bodega)
+            horas_viaje = self._horas_viaje_por_bodega(latitud, longitud, bodegas.all())
+            if horas_viaje:
+                horas_totales = BodegaProducto.dias_alistamiento * 24 + case(horas_viaje, value=BodegaProducto.id_bodega)
+                # Las bodegas sin ubicación (sin pronóstico) van al final
+                query = query.order_by(horas_totales.is_(None), horas_totales)
+            query = query.order_by(BodegaProducto.id_bodega, BodegaProducto.id_producto, BodegaProducto.lote)
+
+        filas = query.offset(skip).limit(limit).all()
+
+        # Calcular pronostico_entrega si se proporcionaron coordenadas y la bodega tiene ubicación
+        if con_origen and not horas_viaje:
+            horas_viaje = self._horas_viaje_por_bodega(
+                latitud, longitud, {(bp.id_bodega, lat, lon) for bp, lat, lon in filas}
+            )
+        ahora = datetime.now()
         
         # Convertir a diccionarios con pronostico_entrega calculado
         resultados = []
-        for bp in bodega_productos:
-            bodega = self.db.query(Bodega).filter(Bodega.id == bp.id_bodega).first()
+        for bp, _, _ in filas:
             resultado = {
                 "id_bodega": bp.id_bodega,
                 "id_producto": bp.id_producto,
@@ -108,15 +154,10 @@ class BodegaProductoService:
                 "dias_alistamiento": bp.dias_alistamiento,
                 "pronostico_entrega": None
             }
-            
-            # Calcular pronostico_entrega si se proporcionaron coordenadas y la bodega tiene ubicación
-            if latitud is not None and longitud is not None and bodega and bodega.latitud and bodega.longitud:
-                resultado["pronostico_entrega"] = self._calcular_pronostico_entrega(
-                    latitud, longitud,
-                    float(bodega.latitud), float(bodega.longitud),
-                    bp.dias_alistamiento
+            if con_origen and bp.id_bodega in horas_viaje:
+                resultado["pronostico_entrega"] = ahora + timedelta(
+                    hours=horas_viaje[bp.id_bodega] + bp.dias_alistamiento * 24
                 )
-            
             resultados.append(resultado)
         
         return resultados
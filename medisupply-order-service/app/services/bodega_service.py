@@ -1,8 +1,17 @@
 from typing import List, Optional
 from sqlalchemy.orm import Session
+from app.core.cache import cache
+from app.core.config import settings
 from app.models.bodega import Bodega
 from app.models.bodega_producto import BodegaProducto
-from app.schemas.bodega_schema import BodegaCreate, BodegaUpdate
+from app.schemas.bodega_schema import BodegaCreate, BodegaUpdate, BodegaResponse
+
+cache.namespace("bodega", ttl=settings.CACHE_TTL_BODEGA, schema=BodegaResponse)
+# Los listados dependen de todas las bodegas y de qué productos tiene cada una:
+# cualquier cambio invalida el namespace completo
+cache.namespace("bodegas", ttl=settings.CACHE_TTL_BODEGA, schema=BodegaResponse, grouped=True)
+cache.track(Bodega, lambda bodega: [("bodega", bodega.id), ("bodegas", None)])
+cache.track(BodegaProducto, lambda bodega_producto: [("bodegas", None)])
 
 
 class BodegaService:
@@ -35,9 +44,29 @@ class BodegaService:
         
         return query.offset(skip).limit(limit).all()
 
+    @cache.cached(
+        "bodegas",
+        key=lambda self, skip=0, limit=100, id_pais=None, id_producto=None: f"{skip}:{limit}:{id_pais}:{id_producto}",
+        endpoint="GET /api/v1/bodegas"
+    )
+    def listar_bodegas_response(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        id_pais: Optional[int] = None,
+        id_producto: Optional[int] = None
+    ) -> List[BodegaResponse]:
+        # Listado para GET /bodegas servido desde la caché de lecturas
+        return self.listar_bodegas(skip=skip, limit=limit, id_pais=id_pais, id_producto=id_producto)
+
     def obtener_bodega(self, bodega_id: int) -> Optional[Bodega]:
         return self.db.query(Bodega).filter(Bodega.id == bodega_id).first()
 
+    @cache.cached("bodega", key=lambda self, bodega_id: bodega_id, endpoint="GET /api/v1/bodegas/{id}")
+    def obtener_bodega_response(self, bodega_id: int) -> Optional[BodegaResponse]:
+        # Bodega para GET /bodegas/{id} servida desde la caché de lecturas
+        return self.obtener_bodega(bodega_id)
+
     def actualizar_bodega(self, bodega_id: int, data: BodegaUpdate) -> Optional[Bodega]:
         bodega = self.obtener_bodega(bodega_id)
         if not bodega:
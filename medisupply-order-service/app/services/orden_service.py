@@ -1,9 +1,37 @@
-from typing import List, Optional
+from collections import defaultdict
+from typing import Dict, Iterator, List, Optional, Tuple
+import base64
+import json
 from datetime import datetime
+from sqlalchemy import and_, delete, insert, or_, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from app.core.cache import cache, invalidate_on_commit
+from app.core.config import settings
 from app.models.orden import Orden, EstadoOrden
 from app.models.orden_producto import OrdenProducto
-from app.schemas.orden_schema import OrdenCreate, OrdenUpdate
+from app.models.vehiculo import Vehiculo
+from app.schemas.orden_schema import OrdenCreate, OrdenUpdate, OrdenResponse, ProductoOrden
+
+cache.namespace("orden", ttl=settings.CACHE_TTL_ORDEN, schema=OrdenResponse)
+cache.track(Orden, lambda orden: [("orden", orden.id)])
+cache.track(OrdenProducto, lambda linea: [("orden", linea.id_orden)])
+
+
+def encode_cursor(orden: Orden) -> str:
+    """Opaque cursor with the (fecha_creacion, id) of the last orden of a page"""
+    raw = json.dumps({"f": orden.fecha_creacion.isoformat(), "i": orden.id})
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inverse of `encode_cursor`. Raises ValueError if the cursor is not valid"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(data["f"]), int(data["i"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError("Cursor inválido") from e
 
 
 class OrdenService:
@@ -33,6 +61,104 @@ class OrdenService:
         self.db.refresh(orden)
         return orden
 
+    def crear_ordenes_bulk(self, ordenes: List[OrdenCreate]) -> dict:
+        """Create many ordenes in one transaction.
+
+        Headers are inserted with a single multi-row INSERT ... RETURNING and
+        the line items with another one, instead of one round trip (plus
+        flush, commit and refresh) per orden. Invalid ordenes are reported
+        per item and do not prevent the rest from being created.
+        """
+        if len(ordenes) > settings.BULK_ORDENES_MAX:
+            raise ValueError(f"Máximo {settings.BULK_ORDENES_MAX} órdenes por petición")
+
+        errors = self._validar_bulk(ordenes)
+        validas = [i for i in range(len(ordenes)) if i not in errors]
+        try:
+            creadas = self._insertar_bulk([ordenes[i] for i in validas])
+        except IntegrityError:
+            # Algún dato cambió entre la validación y el INSERT: se aísla
+            # cada orden en un savepoint para saber cuál falla
+            self.db.rollback()
+            creadas = []
+            for i in list(validas):
+                try:
+                    with self.db.begin_nested():
+                        creadas.extend(self._insertar_bulk([ordenes[i]]))
+                except IntegrityError as e:
+                    errors[i] = f"No se pudo crear la orden: {e.orig}"
+                    validas.remove(i)
+
+        self.db.commit()
+        creadas_por_indice = dict(zip(validas, creadas))
+        results = []
+        for i in range(len(ordenes)):
+            if i in errors:
+                results.append({"index": i, "success": False, "orden": None, "error": errors[i]})
+            else:
+                results.append({"index": i, "success": True, "orden": creadas_por_indice[i], "error": None})
+        return {
+            "total": len(ordenes),
+            "created": len(creadas),
+            "failed": len(errors),
+            "results": results,
+        }
+
+    def _validar_bulk(self, ordenes: List[OrdenCreate]) -> Dict[int, str]:
+        """Return `{index: error}` for the ordenes that cannot be created"""
+        ids_vehiculo = {o.id_vehiculo for o in ordenes if o.id_vehiculo is not None}
+        existentes = set()
+        if ids_vehiculo:
+            existentes = {
+                id_vehiculo for (id_vehiculo,) in
+                self.db.query(Vehiculo.id).filter(Vehiculo.id.in_(ids_vehiculo)).all()
+            }
+
+        errors: Dict[int, str] = {}
+        for i, orden in enumerate(ordenes):
+            if orden.id_vehiculo is not None and orden.id_vehiculo not in existentes:
+                errors[i] = f"Vehículo no encontrado: {orden.id_vehiculo}"
+                continue
+            vistos = set()
+            for p in orden.productos:
+                if p.id_producto in vistos:
+                    errors[i] = f"Producto duplicado en la orden: {p.id_producto}"
+                    break
+                vistos.add(p.id_producto)
+        return errors
+
+    def _insertar_bulk(self, ordenes: List[OrdenCreate]) -> List[dict]:
+        """Insert headers and line items without committing; returns the responses in input order"""
+        if not ordenes:
+            return []
+        filas = [o.model_dump(exclude={'productos'}) for o in ordenes]
+        for fila in filas:
+            if fila.get('estado') is None:
+                fila.pop('estado', None)
+        # insertmanyvalues agrupa las filas en INSERTs multi-fila; sort_by_parameter_order
+        # garantiza que las filas devueltas siguen el orden de la entrada (en PostgreSQL
+        # mediante un centinela; SQLite no lo soporta y vuelve a un INSERT por fila)
+        creadas = self.db.scalars(
+            insert(Orden).returning(Orden, sort_by_parameter_order=True), filas
+        ).all()
+
+        productos = [
+            {"id_orden": orden.id, "id_producto": p.id_producto, "cantidad": p.cantidad}
+            for orden, data in zip(creadas, ordenes)
+            for p in data.productos
+        ]
+        if productos:
+            self.db.execute(insert(OrdenProducto), productos)
+        # Los INSERT de sentencia no pasan por la unidad de trabajo: se invalidan
+        # a mano por si había un 404 cacheado para alguno de los ids nuevos
+        for orden in creadas:
+            invalidate_on_commit(self.db, "orden", orden.id)
+
+        return [
+            self._build_response(orden, data.productos)
+            for orden, data in zip(creadas, ordenes)
+        ]
+
     def listar_ordenes(
         self, 
         skip: int = 0, 
@@ -41,8 +167,60 @@ class OrdenService:
         id_cliente: Optional[int] = None,
         id_vendedor: Optional[int] = None,
         fecha_desde: Optional[datetime] = None,
-        fecha_hasta: Optional[datetime] = None
+        fecha_hasta: Optional[datetime] = None,
+        cursor: Optional[str] = None
     ) -> List[Orden]:
+        """List ordenes ordered by (fecha_creacion, id).
+
+        With `cursor` (the value returned by `siguiente_cursor`) the page starts
+        right after the last orden of the previous one (keyset pagination),
+        so every page costs the same no matter how deep it is. Without it the
+        legacy `skip` offset is used.
+        """
+        query = self._query_ordenes(estado, id_cliente, id_vendedor, fecha_desde, fecha_hasta)
+        if cursor:
+            fecha_creacion, orden_id = decode_cursor(cursor)
+            query = query.filter(or_(
+                Orden.fecha_creacion > fecha_creacion,
+                and_(Orden.fecha_creacion == fecha_creacion, Orden.id > orden_id)
+            ))
+        else:
+            query = query.offset(skip)
+        
+        return query.limit(limit).all()
+
+    def exportar_ordenes(
+        self,
+        estado: Optional[str] = None,
+        id_cliente: Optional[int] = None,
+        id_vendedor: Optional[int] = None,
+        fecha_desde: Optional[datetime] = None,
+        fecha_hasta: Optional[datetime] = None,
+        batch_size: int = 500
+    ) -> Iterator[dict]:
+        """Yield every matching orden in response format, without a page limit.
+
+        Rows are read through a server-side cursor (`yield_per`) and the
+        productos are loaded one batch at a time, so memory stays flat no
+        matter how many ordenes are exported.
+        """
+        query = self._query_ordenes(estado, id_cliente, id_vendedor, fecha_desde, fecha_hasta)
+        batch: List[Orden] = []
+        for orden in query.yield_per(batch_size):
+            batch.append(orden)
+            if len(batch) >= batch_size:
+                yield from self._ordenes_to_response(batch)
+                batch = []
+        yield from self._ordenes_to_response(batch)
+
+    def _query_ordenes(
+        self,
+        estado: Optional[str] = None,
+        id_cliente: Optional[int] = None,
+        id_vendedor: Optional[int] = None,
+        fecha_desde: Optional[datetime] = None,
+        fecha_hasta: Optional[datetime] = None
+    ):
         query = self.db.query(Orden)
         
         # Apply filters if provided
@@ -57,11 +235,24 @@ class OrdenService:
         if fecha_hasta is not None:
             query = query.filter(Orden.fecha_creacion <= fecha_hasta)
         
-        return query.offset(skip).limit(limit).all()
+        return query.order_by(Orden.fecha_creacion, Orden.id)
+
+    @staticmethod
+    def siguiente_cursor(ordenes: List[Orden], limit: int) -> Optional[str]:
+        """Cursor for the page after `ordenes`, or None if this was the last one"""
+        if not ordenes or len(ordenes) < limit:
+            return None
+        return encode_cursor(ordenes[-1])
 
     def obtener_orden(self, orden_id: int) -> Optional[Orden]:
         return self.db.query(Orden).filter(Orden.id == orden_id).first()
 
+    @cache.cached("orden", key=lambda self, orden_id: orden_id, endpoint="GET /api/v1/ordenes/{id}")
+    def obtener_orden_response(self, orden_id: int) -> Optional[OrdenResponse]:
+        """Orden with its productos for GET /ordenes/{id}, served from the read cache"""
+        orden = self.obtener_orden(orden_id)
+        return self._orden_to_response(orden) if orden else None
+
     def actualizar_orden(self, orden_id: int, data: OrdenUpdate) -> Optional[Orden]:
         orden = self.obtener_orden(orden_id)
         if not orden:
@@ -79,22 +270,60 @@ class OrdenService:
         
         # Update productos if provided
         if data.productos is not None:
-            # Delete existing productos
-            self.db.query(OrdenProducto).filter(OrdenProducto.id_orden == orden_id).delete()
-            
-            # Add new productos
-            for producto_data in data.productos:
-                orden_producto = OrdenProducto(
-                    id_orden=orden_id,
-                    id_producto=producto_data.id_producto,
-                    cantidad=producto_data.cantidad
-                )
-                self.db.add(orden_producto)
+            self._sincronizar_productos(orden_id, data.productos)
         
         self.db.commit()
         self.db.refresh(orden)
         return orden
 
+    def _sincronizar_productos(self, orden_id: int, productos: List[ProductoOrden]) -> None:
+        """Make the line items of an orden match `productos`.
+
+        Instead of deleting every line and inserting them again, the new list
+        is diffed against the stored one and only the lines that actually
+        change are written: one DELETE for the removed productos, one
+        executemany UPDATE for the changed quantities and one multi-row
+        INSERT for the new productos. Unchanged lines are not touched.
+        """
+        nuevos: Dict[int, int] = {}
+        for p in productos:
+            if p.id_producto in nuevos:
+                raise ValueError(f"Producto duplicado en la orden: {p.id_producto}")
+            nuevos[p.id_producto] = p.cantidad
+
+        actuales = dict(
+            self.db.query(OrdenProducto.id_producto, OrdenProducto.cantidad)
+            .filter(OrdenProducto.id_orden == orden_id)
+            .all()
+        )
+
+        eliminados = [id_producto for id_producto in actuales if id_producto not in nuevos]
+        modificados = [
+            {"id_orden": orden_id, "id_producto": id_producto, "cantidad": cantidad}
+            for id_producto, cantidad in nuevos.items()
+            if id_producto in actuales and actuales[id_producto] != cantidad
+        ]
+        agregados = [
+            {"id_orden": orden_id, "id_producto": id_producto, "cantidad": cantidad}
+            for id_producto, cantidad in nuevos.items()
+            if id_producto not in actuales
+        ]
+
+        if eliminados:
+            self.db.execute(
+                delete(OrdenProducto).where(
+                    OrdenProducto.id_orden == orden_id,
+                    OrdenProducto.id_producto.in_(eliminados)
+                )
+            )
+        if modificados:
+            # UPDATE por clave primaria (id_orden, id_producto) con executemany
+            self.db.execute(update(OrdenProducto), modificados)
+        if agregados:
+            self.db.execute(insert(OrdenProducto), agregados)
+        if eliminados or modificados or agregados:
+            invalidate_on_commit(self.db, "orden", orden_id)
+
     def eliminar_orden(self, orden_id: int) -> bool:
         orden = self.obtener_orden(orden_id)
         if not orden:
@@ -111,7 +340,26 @@ class OrdenService:
     def _orden_to_response(self, orden: Orden) -> dict:
         """Convert Orden model to response format including productos"""
         productos = self.db.query(OrdenProducto).filter(OrdenProducto.id_orden == orden.id).all()
-        
+        return self._build_response(orden, productos)
+
+    def _ordenes_to_response(self, ordenes: List[Orden]) -> List[dict]:
+        """Convert a page of ordenes to response format.
+
+        Loads the productos of the whole page in a single query instead of one
+        query per orden, so the cost does not grow with the page size.
+        """
+        if not ordenes:
+            return []
+        productos_por_orden: Dict[int, List[OrdenProducto]] = defaultdict(list)
+        productos = self.db.query(OrdenProducto).filter(
+            OrdenProducto.id_orden.in_([orden.id for orden in ordenes])
+        ).all()
+        for p in productos:
+            productos_por_orden[p.id_orden].append(p)
+        return [self._build_response(orden, productos_por_orden[orden.id]) for orden in ordenes]
+
+    @staticmethod
+    def _build_response(orden: Orden, productos: List[OrdenProducto]) -> dict:
         return {
             "id": orden.id,
             "fecha_entrega_estimada": orden.fecha_entrega_estimada,
@@ -1,19 +1,29 @@
-from typing import List, Optional
+import heapq
+import math
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from app.models.vehiculo import Vehiculo
-from app.schemas.vehiculo_schema import VehiculoCreate, VehiculoUpdate
-from app.core.redis import get_redis, cache_key, serialize_for_cache, deserialize_from_cache
+from app.models.posicion_historial import PosicionHistorial, PosicionRollup
+from app.schemas.vehiculo_schema import VehiculoCreate, VehiculoUpdate, VehiculoResponse, PosicionVehiculoCreate
+from app.core.cache import cache, CachedResponse
 from app.core.config import settings
+from app.core.position_buffer import Posicion, normalizar_timestamp, position_buffer
+from app.core.geo_index import geo_index
+from app.core.live_positions import live_positions
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Las escrituras (incluidas las de otros servicios sobre Vehiculo) invalidan al confirmar
+cache.namespace("vehiculo", ttl=settings.CACHE_TTL, schema=VehiculoResponse, as_response=True)
+cache.track(Vehiculo, lambda vehiculo: [("vehiculo", vehiculo.id)])
+
 
 class VehiculoService:
     def __init__(self, db: Session):
         self.db = db
-        self.redis = get_redis()
 
     def crear_vehiculo(self, data: VehiculoCreate) -> Vehiculo:
         vehiculo = Vehiculo(**data.model_dump())
@@ -21,6 +31,7 @@ class VehiculoService:
             self.db.add(vehiculo)
             self.db.commit()
             self.db.refresh(vehiculo)
+            geo_index.upsert(vehiculo.id, vehiculo.tipo.value, vehiculo.latitud, vehiculo.longitud, vehiculo.timestamp)
             return vehiculo
         except IntegrityError:
             self.db.rollback()
@@ -29,37 +40,150 @@ class VehiculoService:
     def listar_vehiculos(self, skip: int = 0, limit: int = 100) -> List[Vehiculo]:
         return self.db.query(Vehiculo).offset(skip).limit(limit).all()
 
+    def listar_vehiculos_json(self, skip: int = 0, limit: int = 100) -> bytes:
+        """Cuerpo JSON de GET /vehiculos armado con los cuerpos cacheados de cada vehículo.
+
+        La página se resuelve con una consulta solo de ids (sobre la PK); los
+        vehículos se piden a la caché de una vez (L1 y un MGET) y solo los que
+        falten se leen de la base, en una consulta.
+        """
+        ids = [
+            vehiculo_id for (vehiculo_id,) in
+            self.db.query(Vehiculo.id).order_by(Vehiculo.id).offset(skip).limit(limit).all()
+        ]
+        if not ids:
+            return b"[]"
+        cuerpos = cache.get_many("vehiculo", ids, self._cargar_vehiculos, endpoint="GET /api/v1/vehiculos")
+        # Un vehículo borrado entre la consulta de ids y la carga queda fuera del listado
+        return b"[" + b",".join(cuerpos[i].body for i in ids if cuerpos[i] is not None) + b"]"
+
+    def _cargar_vehiculos(self, ids: List[int]) -> Dict[int, Vehiculo]:
+        return {v.id: v for v in self.db.query(Vehiculo).filter(Vehiculo.id.in_(ids)).all()}
+
     def obtener_vehiculo(self, vehiculo_id: int) -> Optional[Vehiculo]:
-        # Intentar obtener del caché
-        if self.redis:
-            try:
-                key = cache_key("vehiculo", id=vehiculo_id)
-                cached = self.redis.get(key)
-                if cached:
-                    data = deserialize_from_cache(cached)
-                    # Reconstruir objeto Vehiculo desde cache
-                    vehiculo = Vehiculo(**data)
-                    vehiculo.id = data['id']
-                    return vehiculo
-            except Exception as e:
-                logger.warning(f"Error leyendo caché: {e}")
-        
-        # Obtener de base de datos
-        vehiculo = self.db.query(Vehiculo).filter(Vehiculo.id == vehiculo_id).first()
-        
-        # Guardar en caché si existe
-        if vehiculo and self.redis:
-            try:
-                key = cache_key("vehiculo", id=vehiculo_id)
-                self.redis.setex(
-                    key,
-                    settings.CACHE_TTL,
-                    serialize_for_cache(vehiculo)
-                )
-            except Exception as e:
-                logger.warning(f"Error guardando en caché: {e}")
-        
-        return vehiculo
+        return self.db.query(Vehiculo).filter(Vehiculo.id == vehiculo_id).first()
+
+    @cache.cached("vehiculo", key=lambda self, vehiculo_id: vehiculo_id, endpoint="GET /api/v1/vehiculos/{id}")
+    def obtener_vehiculo_response(self, vehiculo_id: int) -> Optional[CachedResponse]:
+        # Cuerpo ya serializado de GET /vehiculos/{id}; un acierto no toca el ORM ni pydantic
+        return self.obtener_vehiculo(vehiculo_id)
+
+    def registrar_posiciones(self, fixes: List[PosicionVehiculoCreate]) -> dict:
+        """Registrar fixes GPS en el buffer de escritura diferida.
+
+        No escribe en la base: la existencia de los vehículos se comprueba con
+        la caché de vehículos (un MGET, y una consulta solo para los que no
+        estén cacheados) y la posición se vuelca en el siguiente ciclo del buffer.
+        """
+        if len(fixes) > settings.GPS_INGEST_MAX:
+            raise ValueError(f"Se permiten como máximo {settings.GPS_INGEST_MAX} posiciones por petición")
+        ids = sorted({f.id_vehiculo for f in fixes})
+        existentes = cache.get_many("vehiculo", ids, self._cargar_vehiculos, endpoint="POST /api/v1/vehiculos/posiciones")
+        validos = [
+            (f.id_vehiculo, Posicion(f.latitud, f.longitud, normalizar_timestamp(f.timestamp)))
+            for f in fixes
+            if existentes[f.id_vehiculo] is not None
+        ]
+        aceptadas = position_buffer.add(validos)
+        return {
+            "recibidas": len(fixes),
+            "aceptadas": aceptadas,
+            "descartadas": len(validos) - aceptadas,
+            "desconocidos": [i for i in ids if existentes[i] is None],
+        }
+
+    def obtener_posicion(self, vehiculo_id: int) -> Optional[dict]:
+        """Última posición del vehículo: primero la del buffer, si no la guardada en la base"""
+        posicion = position_buffer.get(vehiculo_id)
+        if posicion is not None:
+            return {"id_vehiculo": vehiculo_id, **posicion._asdict()}
+        vehiculo = self.obtener_vehiculo(vehiculo_id)
+        if vehiculo is None or vehiculo.latitud is None or vehiculo.longitud is None:
+            return None
+        return {
+            "id_vehiculo": vehiculo.id,
+            "latitud": vehiculo.latitud,
+            "longitud": vehiculo.longitud,
+            "timestamp": vehiculo.timestamp,
+        }
+
+    def buscar_cercanos(self, latitud: float, longitud: float, radio_km: float,
+                        k: int = 10, tipo: Optional[str] = None) -> List[dict]:
+        """Los k vehículos más cercanos al punto, con su distancia, usando el índice espacial"""
+        return [c._asdict() for c in geo_index.nearest(latitud, longitud, radio_km, k=k, tipo=tipo)]
+
+    @staticmethod
+    def posiciones_actuales(ids: List[int]) -> List[dict]:
+        """Última posición en vivo (buffer o Redis, sin la base) de cada vehículo que la tenga"""
+        posiciones = []
+        for vehiculo_id in ids:
+            posicion = position_buffer.get(vehiculo_id)
+            if posicion is not None:
+                posiciones.append({
+                    "id_vehiculo": vehiculo_id,
+                    "latitud": posicion.latitud,
+                    "longitud": posicion.longitud,
+                    "timestamp": posicion.timestamp.isoformat(),
+                })
+        return posiciones
+
+    def obtener_trayectoria(self, vehiculo_id: int, desde: Optional[datetime] = None,
+                            hasta: Optional[datetime] = None, resolucion: Optional[int] = None) -> Optional[dict]:
+        """Recorrido del vehículo entre `desde` y `hasta` (por defecto, las últimas 24 horas).
+
+        Une los fixes crudos y los rollups de los días ya compactados (ambos por
+        rango sobre su PK) y deja un punto por intervalo de `resolucion` segundos.
+        La resolución se aumenta lo necesario para no pasar de
+        GPS_TRAYECTORIA_MAX_PUNTOS puntos.
+        """
+        if self.obtener_vehiculo_response(vehiculo_id) is None:
+            return None
+        hasta = normalizar_timestamp(hasta)
+        desde = normalizar_timestamp(desde) if desde else hasta - timedelta(hours=24)
+        if desde >= hasta:
+            raise ValueError("'desde' debe ser anterior a 'hasta'")
+
+        crudos = (
+            self.db.query(PosicionHistorial.latitud, PosicionHistorial.longitud, PosicionHistorial.timestamp)
+            .filter(PosicionHistorial.id_vehiculo == vehiculo_id,
+                    PosicionHistorial.timestamp >= desde, PosicionHistorial.timestamp <= hasta)
+            .order_by(PosicionHistorial.timestamp)
+        )
+        rollups = (
+            self.db.query(PosicionRollup.latitud, PosicionRollup.longitud, PosicionRollup.bucket)
+            .filter(PosicionRollup.id_vehiculo == vehiculo_id,
+                    PosicionRollup.bucket >= desde, PosicionRollup.bucket <= hasta)
+            .order_by(PosicionRollup.bucket)
+        )
+        puntos = list(heapq.merge(rollups.all(), crudos.all(), key=lambda p: p[2]))
+
+        minima = math.ceil((hasta - desde).total_seconds() / settings.GPS_TRAYECTORIA_MAX_PUNTOS)
+        if resolucion or len(puntos) > settings.GPS_TRAYECTORIA_MAX_PUNTOS:
+            resolucion = max(resolucion or 0, minima)
+            puntos = self._submuestrear(puntos, resolucion)
+        return {
+            "id_vehiculo": vehiculo_id,
+            "desde": desde,
+            "hasta": hasta,
+            "resolucion": resolucion,
+            "puntos": [{"latitud": lat, "longitud": lon, "timestamp": ts} for lat, lon, ts in puntos],
+        }
+
+    @staticmethod
+    def _submuestrear(puntos: list, resolucion: int) -> list:
+        """Primer punto de cada intervalo de `resolucion` segundos, conservando el último del recorrido"""
+        if not puntos:
+            return puntos
+        resultado = []
+        intervalo_actual = None
+        for punto in puntos:
+            intervalo = int((punto[2] - datetime(1970, 1, 1)).total_seconds()) // resolucion
+            if intervalo != intervalo_actual:
+                resultado.append(punto)
+                intervalo_actual = intervalo
+        if resultado[-1] is not puntos[-1]:
+            resultado.append(puntos[-1])
+        return resultado
 
     def actualizar_vehiculo(self, vehiculo_id: int, data: VehiculoUpdate) -> Optional[Vehiculo]:
         vehiculo = self.db.query(Vehiculo).filter(Vehiculo.id == vehiculo_id).first()
@@ -73,15 +197,13 @@ class VehiculoService:
         try:
             self.db.commit()
             self.db.refresh(vehiculo)
-            
-            # Invalidar caché después de actualizar
-            if self.redis:
-                try:
-                    key = cache_key("vehiculo", id=vehiculo_id)
-                    self.redis.delete(key)
-                except Exception as e:
-                    logger.warning(f"Error invalidando caché: {e}")
-            
+            # Una posición escrita a mano reemplaza la que hubiera en el buffer
+            if update_data.keys() & {"latitud", "longitud", "timestamp"}:
+                position_buffer.discard(vehiculo_id)
+                geo_index.upsert(vehiculo.id, vehiculo.tipo.value, vehiculo.latitud, vehiculo.longitud, vehiculo.timestamp)
+            else:
+                geo_index.upsert(vehiculo.id, vehiculo.tipo.value)
+            live_positions.publish_vehiculo(vehiculo.id, VehiculoResponse.model_validate(vehiculo).model_dump(mode='json'))
             return vehiculo
         except IntegrityError:
             self.db.rollback()
@@ -94,13 +216,7 @@ class VehiculoService:
         
         self.db.delete(vehiculo)
         self.db.commit()
-        
-        # Invalidar caché después de eliminar
-        if self.redis:
-            try:
-                key = cache_key("vehiculo", id=vehiculo_id)
-                self.redis.delete(key)
-            except Exception as e:
-                logger.warning(f"Error invalidando caché: {e}")
-        
+        position_buffer.discard(vehiculo_id)
+        geo_index.remove(vehiculo_id)
+        live_positions.publish_vehiculo(vehiculo_id, None)
         return True
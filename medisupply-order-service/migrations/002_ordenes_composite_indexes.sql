@@ -0,0 +1,47 @@
+-- Migración: Índices compuestos para los listados de órdenes
+-- Fecha: 2026-10-16
+-- Descripción: Índices que coinciden con los filtros reales de /api/v1/ordenes y
+-- /internal/v1/ordenes. Todos los listados ordenan por (fecha_creacion, id) para la
+-- paginación por cursor, así que esas columnas van al final de cada índice.
+--
+-- CREATE INDEX CONCURRENTLY no bloquea las escrituras, pero no puede ejecutarse
+-- dentro de una transacción: aplicar SIN --single-transaction ni BEGIN/COMMIT:
+--
+--   psql -U your_user -d your_database -f migrations/002_ordenes_composite_indexes.sql
+--
+-- Si una construcción concurrente falla, el índice queda marcado como INVALID y
+-- IF NOT EXISTS no lo reconstruye. Para encontrarlos:
+--
+--   SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+--   WHERE NOT i.indisvalid;
+--
+-- eliminarlos con DROP INDEX CONCURRENTLY y volver a ejecutar este archivo.
+
+-- Listado sin filtros (paginación por cursor)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_ordenes_fecha_creacion_id
+    ON ordenes (fecha_creacion, id);
+
+-- Filtro por estado (tablero de logística, exportación)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_ordenes_estado_fecha_creacion
+    ON ordenes (estado, fecha_creacion, id);
+
+-- Filtro por vendedor (reportes de ventas)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_ordenes_id_vendedor_fecha_creacion
+    ON ordenes (id_vendedor, fecha_creacion, id);
+
+-- Filtro por cliente (historial de pedidos del cliente)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_ordenes_id_cliente_fecha_creacion
+    ON ordenes (id_cliente, fecha_creacion, id);
+
+-- Búsquedas de líneas por producto; la PK (id_orden, id_producto) no sirve para ellas
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_orden_producto_id_producto
+    ON orden_producto (id_producto);
+
+-- Los índices simples sobre id_cliente / id_vendedor quedan cubiertos por los
+-- compuestos de arriba (misma columna inicial); solo encarecen cada escritura
+DROP INDEX CONCURRENTLY IF EXISTS ix_ordenes_id_cliente;
+DROP INDEX CONCURRENTLY IF EXISTS ix_ordenes_id_vendedor;
+
+-- Actualizar estadísticas para que el planificador considere los índices nuevos
+ANALYZE ordenes;
+ANALYZE orden_producto;
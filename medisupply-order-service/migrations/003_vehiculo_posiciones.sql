@@ -0,0 +1,37 @@
+-- Migración: Historial de posiciones GPS de los vehículos
+-- Fecha: 2026-10-17
+-- Descripción: Fixes crudos en una tabla solo de inserción particionada por día,
+-- y la tabla de rollups a la que se compactan los días más viejos que
+-- GPS_HISTORIAL_DIAS (app/core/position_history.py).
+--
+-- Las particiones diarias las crea y elimina el compactador del servicio: crea
+-- las de los próximos días y, tras agregar un día a la tabla de rollups, borra
+-- su partición con DROP TABLE (sin DELETE ni VACUUM). Los fixes que lleguen
+-- fuera del rango de las particiones existentes van a la partición DEFAULT.
+--
+--   psql -U your_user -d your_database -f migrations/003_vehiculo_posiciones.sql
+--
+-- El servicio crea la misma tabla al arrancar (create_tables ->
+-- ensure_history_table); esta migración sirve para crearla por adelantado. Si
+-- una versión anterior la dejó sin particionar, el arranque lo registra como
+-- error: renombrarla, ejecutar este archivo y copiar las filas a la nueva.
+
+CREATE TABLE IF NOT EXISTS vehiculo_posiciones (
+    id_vehiculo INTEGER NOT NULL,
+    timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    latitud DOUBLE PRECISION NOT NULL,
+    longitud DOUBLE PRECISION NOT NULL,
+    PRIMARY KEY (id_vehiculo, timestamp)
+) PARTITION BY RANGE (timestamp);
+
+CREATE TABLE IF NOT EXISTS vehiculo_posiciones_default
+    PARTITION OF vehiculo_posiciones DEFAULT;
+
+CREATE TABLE IF NOT EXISTS vehiculo_posiciones_rollup (
+    id_vehiculo INTEGER NOT NULL,
+    bucket TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    latitud DOUBLE PRECISION NOT NULL,
+    longitud DOUBLE PRECISION NOT NULL,
+    muestras INTEGER NOT NULL,
+    PRIMARY KEY (id_vehiculo, bucket)
+);
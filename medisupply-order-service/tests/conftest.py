@@ -15,6 +15,23 @@ import app.core.database as core_db
 from app.main import app
 
 
+@pytest.fixture(autouse=True)
+def clear_read_cache():
+    """Each test uses a fresh database with reused ids: start with an empty L1 cache"""
+    from app.core.cache import cache
+    from app.core.position_buffer import position_buffer
+    from app.core.geo_index import geo_index
+    from app.core.live_positions import live_positions
+    cache.clear()
+    position_buffer.clear()
+    geo_index.clear()
+    yield
+    cache.clear()
+    position_buffer.clear()
+    geo_index.clear()
+    live_positions.clear()
+
+
 @pytest.fixture
 def db_session():
     """Shared db_session fixture that ensures engine disposal to avoid ResourceWarning.
@@ -258,3 +258,25 @@ def test_list_bodega_productos_with_coordinates(client):
     assert len(data) >= 1
     assert data[0]["pronostico_entrega"] is not None
 
+
+
+def test_list_bodega_productos_ordenar_por_pronostico(client):
+    """Test ordenar_por=pronostico_entrega puts the soonest delivery first and validates its inputs"""
+    ids = []
+    for nombre, lat, lon in [("Lejos API", 6.2442, -75.5812), ("Cerca API", 4.6097, -74.0817)]:
+        ids.append(client.post("/api/v1/bodegas/", json={
+            "nombre": nombre, "direccion": "Calle", "id_pais": 1, "ciudad": "X", "latitud": lat, "longitud": lon
+        }).json()["id"])
+    for id_bodega in ids:
+        client.post("/api/v1/bodega-productos/", json={
+            "id_bodega": id_bodega, "id_producto": 8100, "lote": "L", "cantidad": 5, "dias_alistamiento": 0
+        })
+
+    response = client.get(
+        "/api/v1/bodega-productos/?id_producto=8100&latitud=4.6097&longitud=-74.0817&ordenar_por=pronostico_entrega"
+    )
+    assert response.status_code == 200
+    assert [bp["id_bodega"] for bp in response.json()] == [ids[1], ids[0]]
+
+    assert client.get("/api/v1/bodega-productos/?ordenar_por=pronostico_entrega").status_code == 400
+    assert client.get("/api/v1/bodega-productos/?ordenar_por=cantidad").status_code == 400
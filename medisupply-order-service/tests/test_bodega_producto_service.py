@@ -340,3 +340,48 @@ def test_listar_sin_pronostico_entrega(db_session):
     assert len(bps) >= 1
     assert bps[0]["pronostico_entrega"] is None
 
+
+
+def test_listar_ordenado_por_pronostico_entrega(db_session):
+    """Test ordering by delivery forecast happens in the query and the page issues no per-row SELECTs"""
+    from sqlalchemy import event
+
+    bodega_svc = BodegaService(db_session)
+    cerca = bodega_svc.crear_bodega(BodegaCreate(
+        nombre="Cerca", direccion="Calle 1", id_pais=1, ciudad="Bogotá", latitud=4.6097, longitud=-74.0817
+    ))
+    lejos = bodega_svc.crear_bodega(BodegaCreate(
+        nombre="Lejos", direccion="Calle 2", id_pais=1, ciudad="Medellín", latitud=6.2442, longitud=-75.5812
+    ))
+    sin_gps = bodega_svc.crear_bodega(BodegaCreate(nombre="Sin GPS", direccion="Calle 3", id_pais=1, ciudad="Cali"))
+    bp_svc = BodegaProductoService(db_session)
+    for bodega, lote, dias in [(sin_gps, "L0", 0), (lejos, "L1", 0), (cerca, "L2", 3), (cerca, "L3", 0)]:
+        bp_svc.crear_bodega_producto(BodegaProductoCreate(
+            id_bodega=bodega.id, id_producto=900, lote=lote, cantidad=10, dias_alistamiento=dias
+        ))
+
+    sentencias = []
+    engine = db_session.get_bind()
+    contar = lambda conn, cursor, statement, *args: sentencias.append(statement)
+    event.listen(engine, "before_cursor_execute", contar)
+    try:
+        bps = bp_svc.listar_bodega_productos(
+            id_producto=900, latitud=4.6097, longitud=-74.0817, ordenar_por="pronostico_entrega"
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", contar)
+
+    # Cerca sin alistamiento, Medellín (~13 h de viaje), cerca con 3 días, sin ubicación al final
+    assert [bp["lote"] for bp in bps] == ["L3", "L1", "L2", "L0"]
+    assert bps[-1]["pronostico_entrega"] is None
+    assert bps[0]["pronostico_entrega"] < bps[1]["pronostico_entrega"] < bps[2]["pronostico_entrega"]
+    # Una consulta para las bodegas y otra para la página
+    assert len(sentencias) == 2
+
+    segunda_pagina = bp_svc.listar_bodega_productos(
+        skip=1, limit=2, id_producto=900, latitud=4.6097, longitud=-74.0817, ordenar_por="pronostico_entrega"
+    )
+    assert [bp["lote"] for bp in segunda_pagina] == ["L1", "L2"]
+
+    with pytest.raises(ValueError):
+        bp_svc.listar_bodega_productos(ordenar_por="pronostico_entrega")
@@ -1,3 +1,4 @@
+import json
 import pytest
 
 
@@ -110,3 +111,201 @@ def test_vehiculo_placa_unique(client):
     response2 = client.post("/api/v1/vehiculos", json=vehiculo_data)
     assert response2.status_code in [400, 409]  # Bad request or Conflict
 
+
+
+def test_cached_bodega_routes_see_writes(client):
+    """Test cached GETs (including a cached 404 and listings) reflect later writes"""
+    assert client.get("/api/v1/bodegas/1").status_code == 404
+    assert client.get("/api/v1/bodegas").json() == []
+
+    bodega = {"nombre": "Central", "direccion": "Av 1", "id_pais": 1, "ciudad": "Lima"}
+    bodega_id = client.post("/api/v1/bodegas", json=bodega).json()["id"]
+    assert client.get(f"/api/v1/bodegas/{bodega_id}").json()["nombre"] == "Central"
+    assert len(client.get("/api/v1/bodegas").json()) == 1
+
+    client.put(f"/api/v1/bodegas/{bodega_id}", json={"nombre": "Central 2"})
+    assert client.get(f"/api/v1/bodegas/{bodega_id}").json()["nombre"] == "Central 2"
+    assert client.get("/api/v1/bodegas").json()[0]["nombre"] == "Central 2"
+
+
+def test_get_vehiculo_conditional_requests(client):
+    """Test the cached vehiculo body carries ETag/Last-Modified and honours conditional GETs"""
+    vehiculo_id = client.post(
+        "/api/v1/vehiculos", json={"id_conductor": 3, "placa": "ETAG01", "tipo": "VAN"}
+    ).json()["id_vehiculo"]
+
+    first = client.get(f"/api/v1/vehiculos/{vehiculo_id}")
+    assert first.status_code == 200
+    assert first.json()["placa"] == "ETAG01"
+    etag = first.headers["etag"]
+    assert first.headers["last-modified"]
+
+    # Cached hit returns the same bytes
+    assert client.get(f"/api/v1/vehiculos/{vehiculo_id}").content == first.content
+
+    not_modified = client.get(f"/api/v1/vehiculos/{vehiculo_id}", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert client.get(
+        f"/api/v1/vehiculos/{vehiculo_id}", headers={"If-Modified-Since": first.headers["last-modified"]}
+    ).status_code == 304
+
+    client.put(f"/api/v1/vehiculos/{vehiculo_id}", json={"placa": "ETAG02"})
+    updated = client.get(f"/api/v1/vehiculos/{vehiculo_id}", headers={"If-None-Match": etag})
+    assert updated.status_code == 200
+    assert updated.json()["placa"] == "ETAG02"
+    assert updated.headers["etag"] != etag
+
+
+def test_list_vehiculos_uses_entity_cache(client):
+    """Test the list is built from cached vehiculo bodies and reflects updates"""
+    ids = [
+        client.post("/api/v1/vehiculos", json={"id_conductor": i, "placa": f"LST{i}", "tipo": "VAN"}).json()["id_vehiculo"]
+        for i in range(3)
+    ]
+    first = client.get("/api/v1/vehiculos")
+    assert [v["id_vehiculo"] for v in first.json()] == ids
+    assert client.get("/api/v1/vehiculos").content == first.content
+    assert client.get("/api/v1/vehiculos?skip=1&limit=1").json()[0]["placa"] == "LST1"
+
+    client.put(f"/api/v1/vehiculos/{ids[1]}", json={"placa": "LST1B"})
+    client.delete(f"/api/v1/vehiculos/{ids[2]}")
+    assert [v["placa"] for v in client.get("/api/v1/vehiculos").json()] == ["LST0", "LST1B"]
+
+    from app.core.cache import cache
+    stats = cache.stats()["endpoints"]["GET /api/v1/vehiculos"]
+    assert stats["hits"] > 0 and stats["misses"] > 0
+
+
+def test_gps_positions_readable_before_flush(client):
+    """Test ingested fixes are served immediately and reach the database on flush"""
+    vehiculo_id = client.post(
+        "/api/v1/vehiculos", json={"id_conductor": 1, "placa": "GPS01", "tipo": "VAN"}
+    ).json()["id_vehiculo"]
+    assert client.get(f"/api/v1/vehiculos/{vehiculo_id}/posicion").status_code == 404
+
+    response = client.post("/api/v1/vehiculos/posiciones", json=[
+        {"id_vehiculo": vehiculo_id, "latitud": 4.60, "longitud": -74.08, "timestamp": "2026-01-01T12:00:00Z"},
+        {"id_vehiculo": vehiculo_id, "latitud": 4.61, "longitud": -74.09, "timestamp": "2026-01-01T12:00:05Z"},
+        {"id_vehiculo": vehiculo_id, "latitud": 4.50, "longitud": -74.00, "timestamp": "2026-01-01T11:59:00Z"},
+        {"id_vehiculo": 9999, "latitud": 4.60, "longitud": -74.08},
+    ])
+    assert response.status_code == 202
+    assert response.json() == {"recibidas": 4, "aceptadas": 2, "descartadas": 1, "desconocidos": [9999]}
+
+    posicion = client.get(f"/api/v1/vehiculos/{vehiculo_id}/posicion").json()
+    assert (posicion["latitud"], posicion["longitud"]) == (4.61, -74.09)
+    # Aún no está en la base
+    assert client.get(f"/api/v1/vehiculos/{vehiculo_id}").json()["latitud"] is None
+
+    from app.core.position_buffer import position_buffer
+    assert position_buffer.flush() == 1
+    assert client.get(f"/api/v1/vehiculos/{vehiculo_id}").json()["latitud"] == 4.61
+
+    single = client.post("/api/v1/vehiculos/posiciones", json={"id_vehiculo": vehiculo_id, "latitud": 91, "longitud": 0})
+    assert single.status_code == 422
+
+
+def test_vehiculos_cercanos(client):
+    """Test nearest search sees stored positions, GPS fixes, type filters and deletions"""
+    ids = {}
+    for placa, tipo, lat, lon in [
+        ("CER01", "VAN", 4.60, -74.08),
+        ("CER02", "CAMION", 4.65, -74.10),
+        ("CER03", "VAN", 6.25, -75.56),
+    ]:
+        ids[placa] = client.post("/api/v1/vehiculos", json={
+            "id_conductor": 1, "placa": placa, "tipo": tipo, "latitud": lat, "longitud": lon
+        }).json()["id_vehiculo"]
+
+    response = client.get("/api/v1/vehiculos/cercanos?lat=4.6&lon=-74.08&radio_km=20")
+    assert response.status_code == 200
+    data = response.json()
+    assert [v["id_vehiculo"] for v in data] == [ids["CER01"], ids["CER02"]]
+    assert data[0]["distancia_km"] == 0
+    assert 5 < data[1]["distancia_km"] < 7
+
+    tipo = client.get("/api/v1/vehiculos/cercanos?lat=4.6&lon=-74.08&radio_km=20&tipo=CAMION").json()
+    assert [v["id_vehiculo"] for v in tipo] == [ids["CER02"]]
+
+    # Un fix GPS mueve el vehículo en el índice sin esperar al volcado
+    client.post("/api/v1/vehiculos/posiciones", json={"id_vehiculo": ids["CER03"], "latitud": 4.601, "longitud": -74.081})
+    cercanos = client.get("/api/v1/vehiculos/cercanos?lat=4.6&lon=-74.08&radio_km=20&k=2").json()
+    assert [v["id_vehiculo"] for v in cercanos] == [ids["CER01"], ids["CER03"]]
+
+    client.delete(f"/api/v1/vehiculos/{ids['CER01']}")
+    cercanos = client.get("/api/v1/vehiculos/cercanos?lat=4.6&lon=-74.08&radio_km=20").json()
+    assert [v["id_vehiculo"] for v in cercanos] == [ids["CER03"], ids["CER02"]]
+
+    assert client.get("/api/v1/vehiculos/cercanos?lat=95&lon=0").status_code == 422
+
+
+def test_vehiculo_trayectoria(client):
+    """Test the trajectory merges rollups and raw fixes and downsamples them"""
+    from datetime import datetime
+    import app.core.database as core_db
+    from app.core.position_buffer import position_buffer
+    from app.models.posicion_historial import PosicionRollup
+
+    vehiculo_id = client.post(
+        "/api/v1/vehiculos", json={"id_conductor": 1, "placa": "TRY01", "tipo": "VAN"}
+    ).json()["id_vehiculo"]
+    client.post("/api/v1/vehiculos/posiciones", json=[
+        {"id_vehiculo": vehiculo_id, "latitud": round(4.6 + i / 100, 2), "longitud": -74.08, "timestamp": f"2026-01-02T10:00:{i * 10:02d}Z"}
+        for i in range(6)
+    ])
+    position_buffer.flush()
+    db = core_db.SessionLocal()
+    db.add(PosicionRollup(id_vehiculo=vehiculo_id, bucket=datetime(2026, 1, 1, 9, 0), latitud=4.5, longitud=-74.0, muestras=12))
+    db.commit()
+    db.close()
+
+    url = f"/api/v1/vehiculos/{vehiculo_id}/trayectoria?desde=2026-01-01T00:00:00Z&hasta=2026-01-03T00:00:00Z"
+    data = client.get(url).json()
+    assert data["resolucion"] is None
+    assert [p["latitud"] for p in data["puntos"]] == [4.5, 4.6, 4.61, 4.62, 4.63, 4.64, 4.65]
+
+    submuestreada = client.get(url + "&resolucion=600").json()
+    assert submuestreada["resolucion"] == 600
+    assert [p["timestamp"] for p in submuestreada["puntos"]] == [
+        "2026-01-01T09:00:00", "2026-01-02T10:00:00", "2026-01-02T10:00:50"
+    ]
+
+    assert client.get(f"/api/v1/vehiculos/{vehiculo_id}/trayectoria?desde=2026-01-03T00:00:00Z&hasta=2026-01-01T00:00:00Z").status_code == 400
+    assert client.get("/api/v1/vehiculos/9999/trayectoria").status_code == 404
+
+
+def test_stream_vehiculos_pushes_live_positions(client):
+    """Test the SSE stream sends the current position on connect, then coalesced updates"""
+    import threading
+    from datetime import datetime, timedelta
+    from unittest.mock import patch
+    from app.core.config import settings
+    from app.core.position_buffer import Posicion, position_buffer
+
+    vehiculo_id = client.post(
+        "/api/v1/vehiculos", json={"id_conductor": 1, "placa": "SSE01", "tipo": "VAN"}
+    ).json()["id_vehiculo"]
+    client.post("/api/v1/vehiculos/posiciones", json={
+        "id_vehiculo": vehiculo_id, "latitud": 4.6, "longitud": -74.08, "timestamp": "2026-01-01T12:00:00Z"
+    })
+
+    def reportar():
+        # Tres fixes seguidos del mismo vehículo mientras la conexión está abierta
+        for i, latitud in enumerate((4.61, 4.62, 4.63), start=1):
+            position_buffer.add([(vehiculo_id, Posicion(latitud, -74.08, datetime(2026, 1, 1, 12) + timedelta(seconds=i)))])
+
+    with patch.object(settings, "LIVE_PUSH_INTERVAL", 0.1), patch.object(settings, "LIVE_MAX_DURATION", 0.5):
+        # TestClient entrega el cuerpo cuando termina el stream: los fixes llegan desde otro hilo
+        threading.Timer(0.15, reportar).start()
+        response = client.get(f"/api/v1/vehiculos/stream?ids={vehiculo_id}")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    eventos = [json.loads(linea[len("data: "):]) for linea in response.text.splitlines() if linea.startswith("data: ")]
+    assert eventos == [
+        [{"id_vehiculo": vehiculo_id, "latitud": 4.6, "longitud": -74.08, "timestamp": "2026-01-01T12:00:00"}],
+        [{"id_vehiculo": vehiculo_id, "latitud": 4.63, "longitud": -74.08, "timestamp": "2026-01-01T12:00:03"}],
+    ]
+
+    assert client.get("/api/v1/vehiculos/stream?bbox=1,2,3").status_code == 400
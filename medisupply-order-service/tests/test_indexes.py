@@ -0,0 +1,106 @@
+import pytest
+from datetime import datetime, timezone
+from sqlalchemy import create_engine, event, inspect
+
+from app.core.database import Base
+from app.core.indexes import ensure_indexes, missing_indexes
+from app.models.orden import Orden, EstadoOrden
+from app.models.orden_producto import OrdenProducto
+from app.services.orden_service import OrdenService, encode_cursor
+
+
+def _explain(engine, statement, params) -> str:
+    """Plan de SQLite (EXPLAIN QUERY PLAN) para una sentencia ya compilada"""
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, params).fetchall()
+    return "\n".join(row[-1] for row in rows)
+
+
+def _plan_listado(db_session, **kwargs) -> str:
+    """Plan de la consulta que emite realmente `listar_ordenes`"""
+    capturadas = []
+
+    def capturar(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "FROM ordenes" in statement:
+            capturadas.append((statement, parameters))
+
+    engine = db_session.get_bind()
+    event.listen(engine, "before_cursor_execute", capturar)
+    try:
+        OrdenService(db_session).listar_ordenes(**kwargs)
+    finally:
+        event.remove(engine, "before_cursor_execute", capturar)
+    assert len(capturadas) == 1
+    return _explain(engine, *capturadas[0])
+
+
+@pytest.mark.parametrize("filtros, indice", [
+    ({}, "ix_ordenes_fecha_creacion_id"),
+    ({"estado": EstadoOrden.ABIERTO.value}, "ix_ordenes_estado_fecha_creacion"),
+    ({"id_vendedor": 7}, "ix_ordenes_id_vendedor_fecha_creacion"),
+    ({"id_cliente": 3}, "ix_ordenes_id_cliente_fecha_creacion"),
+])
+def test_listado_ordenes_usa_indice_compuesto(db_session, filtros, indice):
+    """Each listing filter is served by its composite index, without sorting in memory"""
+    plan = _plan_listado(db_session, limit=20, **filtros)
+    assert indice in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_listado_ordenes_con_cursor_usa_indice(db_session):
+    """Keyset pagination seeks into the index instead of sorting the table"""
+    ultima = Orden(id=10, fecha_creacion=datetime(2026, 1, 1, tzinfo=timezone.utc))
+    plan = _plan_listado(db_session, limit=20, estado=EstadoOrden.ABIERTO.value, cursor=encode_cursor(ultima))
+    assert "ix_ordenes_estado_fecha_creacion" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_busqueda_por_producto_usa_indice(db_session):
+    engine = db_session.get_bind()
+    query = db_session.query(OrdenProducto).filter(OrdenProducto.id_producto == 1)
+    compiled = query.statement.compile(dialect=engine.dialect)
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    assert "ix_orden_producto_id_producto" in _explain(engine, str(compiled), params)
+
+
+def test_ensure_indexes_crea_los_indices_faltantes():
+    """An existing database without the new indexes gets them, and a second run is a no-op"""
+    engine = create_engine("sqlite:///:memory:")
+    try:
+        Base.metadata.create_all(bind=engine)
+        for nombre in ("ix_ordenes_estado_fecha_creacion", "ix_orden_producto_id_producto"):
+            with engine.begin() as conn:
+                conn.exec_driver_sql(f"DROP INDEX {nombre}")
+
+        assert {ix.name for ix in missing_indexes(engine)} == {
+            "ix_ordenes_estado_fecha_creacion", "ix_orden_producto_id_producto"
+        }
+        creados = ensure_indexes(engine)
+        assert sorted(creados) == ["ix_orden_producto_id_producto", "ix_ordenes_estado_fecha_creacion"]
+        nombres = {ix["name"] for ix in inspect(engine).get_indexes("ordenes")}
+        assert "ix_ordenes_estado_fecha_creacion" in nombres
+
+        assert missing_indexes(engine) == []
+        assert ensure_indexes(engine) == []
+    finally:
+        engine.dispose()
+
+
+def test_missing_indexes_incluye_los_invalidos():
+    """An index left INVALID by an interrupted concurrent build counts as missing"""
+    from unittest.mock import patch
+
+    engine = create_engine("sqlite:///:memory:")
+    try:
+        Base.metadata.create_all(bind=engine)
+        with patch("app.core.indexes.invalid_indexes", return_value={"ix_ordenes_estado_fecha_creacion"}):
+            assert [ix.name for ix in missing_indexes(engine)] == ["ix_ordenes_estado_fecha_creacion"]
+    finally:
+        engine.dispose()
+
+
+def test_sin_indices_simples_redundantes():
+    """id_cliente / id_vendedor are covered by the composite indexes that start with them"""
+    nombres = {ix.name for ix in Orden.__table__.indexes}
+    assert "ix_ordenes_id_cliente" not in nombres
+    assert "ix_ordenes_id_vendedor" not in nombres
@@ -100,3 +100,148 @@ def test_filter_ordenes_by_cliente(client):
     assert len(data) >= 2
     for orden in data:
         assert orden["id_cliente"] == 1
+
+
+def test_list_ordenes_cursor_pagination(client):
+    """Test walking all ordenes with the keyset cursor returned in X-Next-Cursor"""
+    created = []
+    for i in range(5):
+        response = client.post("/api/v1/ordenes", json={
+            "fecha_entrega_estimada": (datetime.now() + timedelta(days=7)).isoformat(),
+            "id_cliente": i + 1,
+            "id_vendedor": 1,
+            "estado": "ABIERTO",
+            "productos": []
+        })
+        created.append(response.json()["id"])
+
+    seen = []
+    params = {"limit": 2}
+    while True:
+        response = client.get("/api/v1/ordenes", params=params)
+        assert response.status_code == 200
+        seen.extend(o["id"] for o in response.json())
+        next_cursor = response.headers.get("X-Next-Cursor")
+        if not next_cursor:
+            break
+        params = {"limit": 2, "cursor": next_cursor}
+
+    assert seen == sorted(created)
+
+    # skip sigue funcionando para clientes existentes
+    legacy = client.get("/api/v1/ordenes", params={"skip": 2, "limit": 2}).json()
+    assert [o["id"] for o in legacy] == sorted(created)[2:4]
+
+    assert client.get("/api/v1/ordenes", params={"cursor": "no-valido"}).status_code == 400
+
+
+def test_export_ordenes_ndjson_stream(client):
+    """Test the internal NDJSON export returns every matching orden, one per line"""
+    import json
+    from app.core.config import settings
+
+    for i in range(3):
+        client.post("/api/v1/ordenes", json={
+            "fecha_entrega_estimada": (datetime.now() + timedelta(days=7)).isoformat(),
+            "id_cliente": 1,
+            "id_vendedor": 7 if i < 2 else 8,
+            "estado": "ABIERTO",
+            "productos": [{"id_producto": 1, "cantidad": i + 1}]
+        })
+
+    headers = {"X-Internal-Service-Key": settings.INTERNAL_SERVICE_KEY}
+    response = client.get("/internal/v1/ordenes/export", params={"id_vendedor": 7}, headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    *ordenes, trailer = [json.loads(line) for line in response.text.splitlines()]
+    assert trailer == {"_fin": {"total": 2}}
+    assert [o["id_vendedor"] for o in ordenes] == [7, 7]
+    assert [o["productos"][0]["cantidad"] for o in ordenes] == [1, 2]
+
+    assert client.get("/internal/v1/ordenes/export").status_code == 403
+
+
+def test_export_ordenes_reports_error_in_trailer(client):
+    """Test a failure after the 200 is sent ends the stream with an error line instead of a silent cut"""
+    import json
+    from unittest.mock import patch
+    from app.core.config import settings
+
+    for i in range(2):
+        client.post("/api/v1/ordenes", json={
+            "fecha_entrega_estimada": (datetime.now() + timedelta(days=7)).isoformat(),
+            "id_cliente": 1,
+            "id_vendedor": 7,
+            "productos": []
+        })
+
+    def exportar_y_fallar(self, **kwargs):
+        yield {"id": 1, "id_vendedor": 7}
+        raise RuntimeError("conexión perdida")
+
+    headers = {"X-Internal-Service-Key": settings.INTERNAL_SERVICE_KEY}
+    with patch("app.services.orden_service.OrdenService.exportar_ordenes", exportar_y_fallar):
+        response = client.get("/internal/v1/ordenes/export", headers=headers)
+    assert response.status_code == 200
+    lineas = [json.loads(line) for line in response.text.splitlines()]
+    assert lineas[0]["id"] == 1
+    assert lineas[-1] == {"_error": "conexión perdida"}
+
+
+def test_create_ordenes_bulk_reports_per_item_results(client):
+    """Test bulk creation inserts valid ordenes and reports the invalid ones"""
+    fecha = (datetime.now() + timedelta(days=7)).isoformat()
+    payload = {"ordenes": [
+        {"fecha_entrega_estimada": fecha, "id_cliente": 1, "id_vendedor": 5,
+         "productos": [{"id_producto": 1, "cantidad": 2}, {"id_producto": 2, "cantidad": 1}]},
+        {"fecha_entrega_estimada": fecha, "id_cliente": 2, "id_vendedor": 5,
+         "productos": [{"id_producto": 1, "cantidad": 2}, {"id_producto": 1, "cantidad": 3}]},
+        {"fecha_entrega_estimada": fecha, "id_cliente": 3, "id_vendedor": 5, "id_vehiculo": 999},
+        {"fecha_entrega_estimada": fecha, "id_cliente": 4, "id_vendedor": 5, "estado": "POR_ALISTAR"},
+    ]}
+
+    response = client.post("/api/v1/ordenes/bulk", json=payload)
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["total"], data["created"], data["failed"]) == (4, 2, 2)
+    assert [r["success"] for r in data["results"]] == [True, False, False, True]
+    assert "Producto duplicado" in data["results"][1]["error"]
+    assert "Vehículo no encontrado" in data["results"][2]["error"]
+
+    creada = data["results"][0]["orden"]
+    assert creada["estado"] == "ABIERTO"
+    assert creada["productos"] == [{"id_producto": 1, "cantidad": 2}, {"id_producto": 2, "cantidad": 1}]
+    assert data["results"][3]["orden"]["estado"] == "POR_ALISTAR"
+
+    response = client.get(f"/api/v1/ordenes/{creada['id']}")
+    assert response.status_code == 200
+    assert response.json()["productos"] == creada["productos"]
+    listado = client.get("/api/v1/ordenes", params={"id_vendedor": 5}).json()
+    assert sorted(o["id_cliente"] for o in listado) == [1, 4]
+
+
+def test_create_ordenes_bulk_rejects_oversized_batch(client, monkeypatch):
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "BULK_ORDENES_MAX", 1)
+    fecha = (datetime.now() + timedelta(days=7)).isoformat()
+    orden = {"fecha_entrega_estimada": fecha, "id_cliente": 1, "id_vendedor": 1}
+    response = client.post("/api/v1/ordenes/bulk", json={"ordenes": [orden, orden]})
+    assert response.status_code == 400
+
+
+def test_cached_orden_route_sees_product_changes(client):
+    """Test line item diffs (statement-level writes) invalidate the cached orden"""
+    orden_id = client.post("/api/v1/ordenes", json={
+        "fecha_entrega_estimada": (datetime.now() + timedelta(days=7)).isoformat(),
+        "id_cliente": 1,
+        "id_vendedor": 1,
+        "productos": [{"id_producto": 1, "cantidad": 2}]
+    }).json()["id"]
+    assert client.get(f"/api/v1/ordenes/{orden_id}").json()["productos"] == [{"id_producto": 1, "cantidad": 2}]
+
+    client.put(f"/api/v1/ordenes/{orden_id}", json={"productos": [{"id_producto": 1, "cantidad": 5}]})
+    assert client.get(f"/api/v1/ordenes/{orden_id}").json()["productos"] == [{"id_producto": 1, "cantidad": 5}]
+
+    client.delete(f"/api/v1/ordenes/{orden_id}")
+    assert client.get(f"/api/v1/ordenes/{orden_id}").status_code == 404
@@ -113,3 +113,142 @@ def test_filtrar_ordenes_por_cliente(db_session):
     
     ordenes_cliente_2 = orden_svc.listar_ordenes(id_cliente=2)
     assert len(ordenes_cliente_2) == 1
+
+
+def test_ordenes_to_response_query_count_is_constant(db_session):
+    """Test listing a page costs the same number of queries regardless of its size"""
+    from sqlalchemy import event
+
+    orden_svc = OrdenService(db_session)
+    for i in range(20):
+        orden_svc.crear_orden(OrdenCreate(
+            fecha_entrega_estimada=datetime.now() + timedelta(days=7),
+            id_cliente=i + 1,
+            id_vendedor=1,
+            estado=EstadoOrden.ABIERTO,
+            productos=[ProductoOrden(id_producto=1, cantidad=i + 1), ProductoOrden(id_producto=2, cantidad=1)]
+        ))
+
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = db_session.get_bind()
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        counts = {}
+        for limit in (2, 20):
+            statements.clear()
+            db_session.expire_all()
+            respuesta = orden_svc._ordenes_to_response(orden_svc.listar_ordenes(limit=limit))
+            counts[limit] = len(statements)
+            assert len(respuesta) == limit
+            assert all(len(o["productos"]) == 2 for o in respuesta)
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+    assert counts[2] == counts[20] == 2
+
+
+def test_exportar_ordenes_batches_productos(db_session):
+    """Test the export loads productos per batch and yields every orden"""
+    service = OrdenService(db_session)
+    for i in range(5):
+        service.crear_orden(OrdenCreate(
+            fecha_entrega_estimada=datetime.now() + timedelta(days=7),
+            id_cliente=i + 1,
+            id_vendedor=1,
+            productos=[ProductoOrden(id_producto=1, cantidad=i + 1)]
+        ))
+
+    exportadas = list(service.exportar_ordenes(batch_size=2))
+    assert [o["id_cliente"] for o in exportadas] == [1, 2, 3, 4, 5]
+    assert [o["productos"][0]["cantidad"] for o in exportadas] == [1, 2, 3, 4, 5]
+
+
+def test_crear_ordenes_bulk_inserts_line_items_in_one_statement(db_session):
+    """Test bulk creation inserts the line items with multi-row INSERTs and keeps the input order"""
+    from sqlalchemy import event
+
+    orden_svc = OrdenService(db_session)
+    statements = []
+
+    # Solo las líneas: las cabeceras usan INSERT ... RETURNING ordenado, que SQLite
+    # no puede agrupar (en PostgreSQL también es un INSERT multi-fila)
+    def count(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("INSERT INTO ORDEN_PRODUCTO"):
+            statements.append(statement)
+
+    engine = db_session.get_bind()
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        counts = {}
+        for size in (2, 50):
+            statements.clear()
+            resultado = orden_svc.crear_ordenes_bulk([
+                OrdenCreate(
+                    fecha_entrega_estimada=datetime.now() + timedelta(days=7),
+                    id_cliente=i + 1,
+                    id_vendedor=1,
+                    productos=[ProductoOrden(id_producto=1, cantidad=i + 1), ProductoOrden(id_producto=2, cantidad=1)]
+                )
+                for i in range(size)
+            ])
+            counts[size] = len(statements)
+            assert resultado["created"] == size
+            assert [r["orden"]["id_cliente"] for r in resultado["results"]] == list(range(1, size + 1))
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+    assert counts[2] == counts[50] == 1
+    assert len(orden_svc._ordenes_to_response(orden_svc.listar_ordenes(limit=100))) == 52
+
+
+def test_actualizar_orden_productos_writes_only_the_diff(db_session):
+    """Test updating productos only deletes, updates and inserts the lines that changed"""
+    from sqlalchemy import event
+
+    orden_svc = OrdenService(db_session)
+    orden = orden_svc.crear_orden(OrdenCreate(
+        fecha_entrega_estimada=datetime.now() + timedelta(days=7),
+        id_cliente=1,
+        id_vendedor=1,
+        productos=[ProductoOrden(id_producto=i, cantidad=1) for i in range(1, 11)]
+    ))
+
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if "orden_producto" in statement and not statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement.split()[0].upper(), parameters))
+
+    engine = db_session.get_bind()
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        # 1 eliminado (10), 1 modificado (2), 1 agregado (11), el resto sin cambios
+        productos = [ProductoOrden(id_producto=i, cantidad=5 if i == 2 else 1) for i in range(1, 10)]
+        productos.append(ProductoOrden(id_producto=11, cantidad=3))
+        orden_svc.actualizar_orden(orden.id, OrdenUpdate(productos=productos))
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    assert sorted(kind for kind, _ in statements) == ["DELETE", "INSERT", "UPDATE"]
+
+    respuesta = orden_svc._orden_to_response(orden_svc.obtener_orden(orden.id))
+    cantidades = {p["id_producto"]: p["cantidad"] for p in respuesta["productos"]}
+    assert cantidades == {**{i: 1 for i in range(1, 10)}, 2: 5, 11: 3}
+
+
+def test_actualizar_orden_productos_duplicados(db_session):
+    orden_svc = OrdenService(db_session)
+    orden = orden_svc.crear_orden(OrdenCreate(
+        fecha_entrega_estimada=datetime.now() + timedelta(days=7),
+        id_cliente=1,
+        id_vendedor=1,
+        productos=[ProductoOrden(id_producto=1, cantidad=1)]
+    ))
+    with pytest.raises(ValueError):
+        orden_svc.actualizar_orden(orden.id, OrdenUpdate(productos=[
+            ProductoOrden(id_producto=2, cantidad=1), ProductoOrden(id_producto=2, cantidad=4)
+        ]))
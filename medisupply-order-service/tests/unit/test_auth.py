@@ -7,7 +7,8 @@ from unittest.mock import Mock, patch
 
 def test_verify_token_with_user_service_valid():
     """Test token verification with valid token"""
-    with patch('app.core.auth.requests.get') as mock_get:
+    with patch('app.core.auth.get_http_client') as mock_client:
+        mock_get = mock_client.return_value.get
         mock_response = Mock()
         mock_response.status_code = 200
         mock_response.json.return_value = {
@@ -24,7 +25,8 @@ def test_verify_token_with_user_service_valid():
 
 def test_verify_token_with_user_service_invalid():
     """Test token verification with invalid token"""
-    with patch('app.core.auth.requests.get') as mock_get:
+    with patch('app.core.auth.get_http_client') as mock_client:
+        mock_get = mock_client.return_value.get
         mock_response = Mock()
         mock_response.status_code = 401
         mock_get.return_value = mock_response
@@ -35,9 +37,10 @@ def test_verify_token_with_user_service_invalid():
 
 def test_verify_token_with_user_service_connection_error():
     """Test token verification when user service is unavailable"""
-    import requests
-    with patch('app.core.auth.requests.get') as mock_get:
-        mock_get.side_effect = requests.RequestException("Connection error")
+    import httpx
+    with patch('app.core.auth.get_http_client') as mock_client:
+        mock_get = mock_client.return_value.get
+        mock_get.side_effect = httpx.ConnectError("Connection error")
         
         result = verify_token_with_user_service("some_token")
         assert result is None
@@ -70,3 +73,306 @@ def test_get_current_user_without_credentials():
     
     assert exc_info.value.status_code == 401
 
+
+
+def _make_token(claims, minutes=5):
+    from datetime import datetime, timedelta, timezone
+    from jose import jwt
+    from app.core.config import settings
+
+    payload = dict(claims)
+    payload["exp"] = datetime.now(timezone.utc) + timedelta(minutes=minutes)
+    return jwt.encode(payload, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
+
+
+def test_verify_token_locally_valid():
+    """Test local token verification returns the /users/me shape"""
+    from app.core.auth import verify_token_locally
+
+    token = _make_token({"sub": "test@example.com", "uid": 1, "name": "Test User", "role_id": 1, "role": "Admin"})
+    user = verify_token_locally(token)
+    assert user["id"] == 1
+    assert user["email"] == "test@example.com"
+    assert user["role"] == "Admin"
+
+
+def test_verify_token_locally_invalid_signature():
+    """Test local token verification rejects tokens signed with another key"""
+    from datetime import datetime, timedelta, timezone
+    from jose import jwt
+    from app.core.auth import verify_token_locally
+
+    token = jwt.encode(
+        {"sub": "test@example.com", "uid": 1, "exp": datetime.now(timezone.utc) + timedelta(minutes=5)},
+        "another-secret",
+        algorithm="HS256",
+    )
+    assert verify_token_locally(token) is None
+
+
+def test_verify_token_local_mode_falls_back_for_legacy_tokens():
+    """Test tokens without uid are still resolved through user-service"""
+    from app.core import auth
+
+    token = _make_token({"sub": "test@example.com"})
+    with patch.object(auth.settings, "AUTH_MODE", "local"), \
+            patch("app.core.auth.verify_token_with_user_service") as mock_remote:
+        mock_remote.return_value = {"id": 1, "email": "test@example.com"}
+        assert auth.verify_token(token)["id"] == 1
+        mock_remote.assert_called_once_with(token)
+
+
+@pytest.mark.parametrize("kind", ["expired", "wrong_key"])
+def test_verify_token_local_mode_rejects_invalid_tokens_without_remote_call(kind):
+    """Test expired or forged tokens are rejected locally, not sent to user-service"""
+    import asyncio
+    from datetime import datetime, timedelta, timezone
+    from unittest.mock import AsyncMock
+    from jose import jwt
+    from app.core import auth
+
+    claims = {"sub": "test@example.com", "uid": 1}
+    if kind == "expired":
+        token = jwt.encode({**claims, "exp": datetime.now(timezone.utc) - timedelta(minutes=1)},
+                           auth.settings.JWT_SECRET_KEY, algorithm="HS256")
+    else:
+        token = jwt.encode({**claims, "exp": datetime.now(timezone.utc) + timedelta(minutes=5)},
+                           "another-secret", algorithm="HS256")
+
+    with patch.object(auth.settings, "AUTH_MODE", "local"), \
+            patch.object(auth.settings, "JWT_ALGORITHM", "HS256"), \
+            patch("app.core.auth.verify_token_with_user_service") as mock_remote, \
+            patch("app.core.auth.verify_token_with_user_service_async", new=AsyncMock()) as mock_remote_async:
+        assert auth.verify_token(token) is None
+        assert asyncio.run(auth.verify_token_async(token)) is None
+        mock_remote.assert_not_called()
+        mock_remote_async.assert_not_called()
+
+
+def test_jwks_cache_refreshes_once_on_concurrent_misses():
+    """Test concurrent requests with an unknown kid trigger a single JWKS fetch"""
+    import threading
+    from app.core.jwks import JWKSCache
+
+    cache = JWKSCache("http://user-service/.well-known/jwks.json", min_refresh_interval=60)
+    with patch('app.core.jwks.get_http_client') as mock_client:
+        mock_get = mock_client.return_value.get
+        mock_response = Mock()
+        mock_response.json.return_value = {"keys": [{"kid": "k1", "kty": "RSA"}]}
+        mock_get.return_value = mock_response
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get_key("unknown"))) for _ in range(20)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert mock_get.call_count == 1
+        assert results == [None] * 20
+        assert cache.get_key("k1")["kty"] == "RSA"
+        assert mock_get.call_count == 1
+
+
+def test_token_cache_single_flight_and_hits():
+    """Test concurrent requests with the same token share one remote verification"""
+    import threading
+    import time
+    from app.core.token_cache import TokenCache
+
+    cache = TokenCache(max_entries=10, ttl=60, use_redis=False)
+    calls = []
+
+    def slow_loader(token):
+        calls.append(token)
+        time.sleep(0.05)
+        return {"id": 1, "email": "test@example.com"}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_load("tok", slow_loader))) for _ in range(10)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert all(r["id"] == 1 for r in results)
+    assert cache.get_or_load("tok", slow_loader)["id"] == 1
+    assert len(calls) == 1
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["coalesced"] == 9
+
+
+def test_token_cache_async_leader_cancellation_does_not_fail_followers():
+    """Test a cancelled leader (client disconnect) does not resolve followers as an invalid token"""
+    import asyncio
+    from app.core.token_cache import TokenCache
+
+    cache = TokenCache(max_entries=10, ttl=60, use_redis=False)
+    calls = []
+
+    async def slow_loader(token):
+        calls.append(token)
+        await asyncio.sleep(0.05)
+        return {"id": 1, "email": "test@example.com"}
+
+    async def scenario():
+        leader = asyncio.create_task(cache.get_or_load_async("tok", slow_loader))
+        await asyncio.sleep(0)
+        followers = [asyncio.create_task(cache.get_or_load_async("tok", slow_loader)) for _ in range(5)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        results = await asyncio.gather(*followers)
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return results
+
+    results = asyncio.run(scenario())
+    assert all(r["id"] == 1 for r in results)
+    # La carga cancelada y una única repetición por parte de un seguidor
+    assert len(calls) == 2
+
+
+def test_token_cache_async_leader_error_propagates_to_followers():
+    """Test an upstream error in the leader reaches followers instead of a None (401)"""
+    import asyncio
+    from app.core.token_cache import TokenCache
+
+    cache = TokenCache(max_entries=10, ttl=60, use_redis=False)
+
+    async def failing_loader(token):
+        await asyncio.sleep(0.02)
+        raise RuntimeError("user-service down")
+
+    async def scenario():
+        tasks = [asyncio.create_task(cache.get_or_load_async("tok", failing_loader)) for _ in range(3)]
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_token_cache_respects_exp_and_evicts_lru():
+    """Test entries never outlive the token exp and the LRU bound is enforced"""
+    from app.core.token_cache import TokenCache
+
+    cache = TokenCache(max_entries=2, ttl=60, use_redis=False)
+    loader = Mock(return_value={"id": 1})
+
+    expired = _make_token({"sub": "a@example.com"}, minutes=-1)
+    cache.get_or_load(expired, loader)
+    cache.get_or_load(expired, loader)
+    assert loader.call_count == 2
+
+    for name in ("a", "b", "c"):
+        cache.get_or_load(_make_token({"sub": f"{name}@example.com"}), loader)
+    assert cache.stats()["entries"] == 2
+    assert cache.stats()["evictions"] == 1
+
+    # Los resultados negativos no se cachean
+    assert cache.get_or_load("bad", Mock(return_value=None)) is None
+    assert cache.stats()["entries"] == 2
+
+
+def test_token_cache_uses_redis_second_tier():
+    """Test a miss in L1 is served from Redis without calling user-service"""
+    import json
+    from app.core.token_cache import TokenCache
+
+    cache = TokenCache(max_entries=10, ttl=60)
+    redis_client = Mock()
+    redis_client.get.return_value = json.dumps({"id": 3, "email": "r@example.com"})
+    loader = Mock()
+
+    with patch("app.core.token_cache.RedisClient.get_client", return_value=redis_client):
+        user = cache.get_or_load(_make_token({"sub": "r@example.com"}), loader)
+
+    assert user["id"] == 3
+    loader.assert_not_called()
+    assert cache.stats()["redis_hits"] == 1
+
+
+def test_authenticated_request_verifies_token_once(client):
+    """Test middleware and router-level Security dependency share one verification"""
+    import os
+    from app.core import auth
+
+    calls = []
+
+    def fake_remote(token):
+        calls.append(token)
+        return {"id": 1, "email": "test@example.com"}
+
+    async def fake_remote_async(token):
+        return fake_remote(token)
+
+    previous = os.environ.get("AUTH_DISABLED")
+    os.environ["AUTH_DISABLED"] = "false"
+    try:
+        with patch.object(auth.settings, "AUTH_MODE", "remote"), \
+                patch.object(auth.settings, "TOKEN_CACHE_ENABLED", False), \
+                patch("app.core.auth.verify_token_with_user_service", side_effect=fake_remote), \
+                patch("app.core.auth.verify_token_with_user_service_async", side_effect=fake_remote_async):
+            resp = client.get("/api/v1/bodegas/", headers={"Authorization": "Bearer abc123"})
+    finally:
+        os.environ["AUTH_DISABLED"] = previous if previous is not None else "true"
+
+    assert resp.status_code == 200
+    assert calls == ["abc123"]
+
+
+def test_auth_middleware_does_not_serialize_concurrent_requests():
+    """Test slow token verification overlaps across requests instead of blocking the event loop"""
+    import asyncio
+    import os
+    import time
+    import httpx
+    from app.core import auth
+    from app.main import app
+
+    delay = 0.2
+    concurrency = 20
+
+    async def slow_user_service(token):
+        await asyncio.sleep(delay)
+        return {"id": 1, "email": "test@example.com"}
+
+    async def fire():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+            start = time.perf_counter()
+            responses = await asyncio.gather(*[
+                ac.get("/api/v1/no-existe", headers={"Authorization": f"Bearer token-{i}"})
+                for i in range(concurrency)
+            ])
+            return time.perf_counter() - start, responses
+
+    previous = os.environ.get("AUTH_DISABLED")
+    os.environ["AUTH_DISABLED"] = "false"
+    try:
+        with patch.object(auth.settings, "AUTH_MODE", "remote"), \
+                patch.object(auth.settings, "TOKEN_CACHE_ENABLED", False), \
+                patch("app.core.auth.verify_token_with_user_service_async", side_effect=slow_user_service):
+            elapsed, responses = asyncio.run(fire())
+    finally:
+        os.environ["AUTH_DISABLED"] = previous if previous is not None else "true"
+
+    assert all(r.status_code == 404 for r in responses)
+    # Serializado tardaría concurrency * delay (4s)
+    assert elapsed < concurrency * delay / 4
+
+
+def test_http_client_is_shared_and_pooled():
+    """Test inter-service calls reuse one pooled client until shutdown"""
+    import asyncio
+    from app.core import http_client
+
+    client = http_client.get_http_client()
+    async_client = http_client.get_async_http_client()
+    assert http_client.get_http_client() is client
+    assert http_client.get_async_http_client() is async_client
+
+    asyncio.run(http_client.close_http_clients())
+    assert client.is_closed and async_client.is_closed
+    assert http_client.get_http_client() is not client
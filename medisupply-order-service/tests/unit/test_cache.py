@@ -0,0 +1,134 @@
+import json
+import threading
+import time
+
+from app.core.cache import TwoTierCache, cache, invalidate_on_commit
+from app.models.bodega import Bodega
+
+
+def _local_cache(**kwargs) -> TwoTierCache:
+    local = TwoTierCache(use_redis=False, **kwargs)
+    local.namespace("item", ttl=60)
+    return local
+
+
+def test_l1_hit_skips_loader_and_caches_misses():
+    """Test both found values and None (negative caching) are served from L1"""
+    local = _local_cache()
+    calls = []
+
+    def loader(value):
+        calls.append(value)
+        return value
+
+    assert local.get_or_load("item", 1, lambda: loader({"id": 1})) == {"id": 1}
+    assert local.get_or_load("item", 1, lambda: loader({"id": 99})) == {"id": 1}
+    assert local.get_or_load("item", 2, lambda: loader(None)) is None
+    assert local.get_or_load("item", 2, lambda: loader({"id": 2})) is None
+    assert calls == [{"id": 1}, None]
+
+
+def test_concurrent_misses_share_one_load():
+    """Test stampede protection: concurrent misses on the same key run the loader once"""
+    local = _local_cache()
+    calls = []
+
+    def slow_loader():
+        calls.append(1)
+        time.sleep(0.1)
+        return {"id": 1}
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(local.get_or_load("item", 1, slow_loader)))
+        for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert results == [{"id": 1}] * 8
+    assert local.coalesced == 7
+
+
+def test_lru_evicts_oldest_entry():
+    local = _local_cache(max_entries=2)
+    for i in range(3):
+        local.get_or_load("item", i, lambda i=i: {"id": i})
+    assert local.stats()["size"] == 2
+    assert local.get_or_load("item", 0, lambda: {"id": "recargado"}) == {"id": "recargado"}
+
+
+def test_invalidation_from_other_replica_evicts_l1():
+    """Test pub/sub messages from other replicas evict L1, our own are ignored"""
+    local = _local_cache()
+    local.get_or_load("item", 1, lambda: {"id": 1})
+
+    local._on_message({"data": json.dumps({"origin": local.instance_id, "namespace": "item", "key": "1"})})
+    assert local.get_or_load("item", 1, lambda: {"id": "nuevo"}) == {"id": 1}
+
+    local._on_message({"data": json.dumps({"origin": "otra-replica", "namespace": "item", "key": "1"})})
+    assert local.get_or_load("item", 1, lambda: {"id": "nuevo"}) == {"id": "nuevo"}
+
+
+def test_invalidation_applied_on_commit_and_discarded_on_rollback(db_session):
+    db_session.add(Bodega(id=1, nombre="Norte", direccion="Calle 1", id_pais=1, ciudad="Bogotá"))
+    db_session.commit()
+    cache.get_or_load("bodega", 1, lambda: {"id": 1, "nombre": "Norte", "direccion": "Calle 1", "id_pais": 1, "ciudad": "Bogotá"})
+
+    invalidate_on_commit(db_session, "bodega", 1)
+    db_session.rollback()
+    assert cache.get_or_load("bodega", 1, lambda: None).nombre == "Norte"
+
+    bodega = db_session.get(Bodega, 1)
+    bodega.nombre = "Norte 2"
+    db_session.flush()
+    # Hasta el commit la fila confirmada sigue siendo la anterior
+    assert cache.get_or_load("bodega", 1, lambda: None).nombre == "Norte"
+    db_session.commit()
+    assert cache.get_or_load("bodega", 1, lambda: bodega).nombre == "Norte 2"
+
+
+def test_get_many_loads_only_misses_in_one_call():
+    """Test batched reads serve cached keys and back-fill all misses with a single loader call"""
+    local = _local_cache()
+    local.get_or_load("item", 1, lambda: {"id": 1})
+    batches = []
+
+    def load_many(keys):
+        batches.append(list(keys))
+        return {k: {"id": k} for k in keys if k != 4}
+
+    result = local.get_many("item", [1, 2, 3, 4], load_many, endpoint="GET /items")
+    assert result == {1: {"id": 1}, 2: {"id": 2}, 3: {"id": 3}, 4: None}
+    assert batches == [[2, 3, 4]]
+
+    assert local.get_many("item", [2, 3, 4], load_many, endpoint="GET /items") == {2: {"id": 2}, 3: {"id": 3}, 4: None}
+    assert batches == [[2, 3, 4]]
+
+    stats = local.stats()["endpoints"]["GET /items"]
+    assert (stats["hits"], stats["misses"]) == (4, 3)
+    assert stats["hit_ratio"] == round(4 / 7, 4)
+
+
+def test_get_many_skips_storing_after_concurrent_invalidation():
+    local = _local_cache()
+
+    def load_and_invalidate(keys):
+        local.invalidate("item", 1)
+        return {k: {"id": k} for k in keys}
+
+    local.get_many("item", [1], load_and_invalidate)
+    assert local.get_or_load("item", 1, lambda: {"id": "nuevo"}) == {"id": "nuevo"}
+
+
+def test_invalidate_many_evicts_every_key():
+    local = _local_cache()
+    for i in (1, 2, 3):
+        local.get_or_load("item", i, lambda i=i: {"id": i})
+
+    local.invalidate_many("item", [1, 2])
+    local._on_message({"data": json.dumps({"origin": "otra-replica", "namespace": "item", "keys": ["3"]})})
+    assert [local.get_or_load("item", i, lambda: {"id": "nuevo"}) for i in (1, 2, 3)] == [{"id": "nuevo"}] * 3
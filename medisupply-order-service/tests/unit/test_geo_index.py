@@ -0,0 +1,65 @@
+import random
+import time
+from datetime import datetime
+
+from app.core.geo_index import GeoIndex, haversine_km
+from app.core.position_buffer import Posicion
+
+
+def _indice(n: int, semilla: int = 7) -> GeoIndex:
+    """Índice en memoria con n vehículos repartidos alrededor de Bogotá"""
+    rng = random.Random(semilla)
+    index = GeoIndex(use_redis=False)
+    index._loaded = True
+    for i in range(n):
+        index._tipos[i] = "CAMION" if i % 2 else "VAN"
+    index.on_positions({
+        i: Posicion(4.6 + rng.uniform(-1, 1), -74.08 + rng.uniform(-1, 1), datetime(2026, 1, 1))
+        for i in range(n)
+    })
+    return index
+
+
+def _fuerza_bruta(index, lat, lon, radio_km, k, tipo=None):
+    distancias = sorted(
+        (haversine_km(lat, lon, p.latitud, p.longitud), i)
+        for i, p in index._points.items()
+        if not tipo or index._tipos[i] == tipo
+    )
+    return [i for d, i in distancias if d <= radio_km][:k]
+
+
+def test_nearest_matches_brute_force():
+    """Test the ring search returns exactly the k nearest within the radius"""
+    index = _indice(2000)
+    for lat, lon, radio, k, tipo in [
+        (4.6, -74.08, 10, 5, None),
+        (4.6, -74.08, 50, 20, "CAMION"),
+        (5.5, -73.2, 30, 10, None),
+        (4.6, -74.08, 0.5, 10, None),
+    ]:
+        resultado = index.nearest(lat, lon, radio, k=k, tipo=tipo)
+        assert [c.id_vehiculo for c in resultado] == _fuerza_bruta(index, lat, lon, radio, k, tipo)
+        assert [c.distancia_km for c in resultado] == sorted(c.distancia_km for c in resultado)
+
+
+def test_moved_and_removed_vehicles_leave_their_cell():
+    index = GeoIndex(use_redis=False)
+    index._loaded = True
+    index.upsert(1, "VAN", 4.6, -74.08)
+    index.on_positions({1: Posicion(6.25, -75.56, datetime(2026, 1, 1))})
+    assert index.nearest(4.6, -74.08, 5) == []
+    assert [c.id_vehiculo for c in index.nearest(6.25, -75.56, 5)] == [1]
+
+    index.remove(1)
+    assert index.nearest(6.25, -75.56, 5) == []
+    assert index.stats()["cells"] == 0
+
+
+def test_nearest_is_fast_for_large_fleets():
+    """Test a query over 20k vehicles is answered in milliseconds"""
+    index = _indice(20000)
+    start = time.perf_counter()
+    for _ in range(50):
+        assert len(index.nearest(4.6, -74.08, 20, k=10)) == 10
+    assert (time.perf_counter() - start) / 50 < 0.02
@@ -0,0 +1,58 @@
+import json
+from datetime import datetime
+
+from app.core.live_positions import EVENTO_POSICION, EVENTO_VEHICULO, LivePositions
+from app.core.position_buffer import Posicion
+
+
+def _fix(latitud: float, segundo: int = 0) -> Posicion:
+    return Posicion(round(latitud, 2), -74.08, datetime(2026, 1, 1, 12, 0, segundo))
+
+
+def test_updates_are_coalesced_per_vehicle():
+    """Test a client receives only the latest position of each vehicle per push"""
+    hub = LivePositions(use_redis=False)
+    suscripcion = hub.subscribe(ids=[1, 2])
+    for segundo in range(10):
+        hub.on_positions({1: _fix(4.6 + segundo / 100, segundo), 3: _fix(4.0, segundo)})
+    hub.on_positions({2: _fix(5.0)})
+
+    lotes = suscripcion.drain()
+    assert [(p["id_vehiculo"], p["latitud"]) for p in lotes[EVENTO_POSICION]] == [(1, 4.69), (2, 5.0)]
+    assert suscripcion.coalesced == 9
+    assert suscripcion.drain() == {}
+
+
+def test_bbox_follows_vehicles_until_they_leave():
+    hub = LivePositions(use_redis=False)
+    suscripcion = hub.subscribe(bbox=(4.0, -75.0, 5.0, -74.0))
+
+    hub.publish_vehiculo(1, {"id_vehiculo": 1, "placa": "AAA"})
+    hub.on_positions({1: _fix(4.5), 2: _fix(6.0)})
+    hub.publish_vehiculo(1, None)
+    lotes = suscripcion.drain()
+    assert [p["id_vehiculo"] for p in lotes[EVENTO_POSICION]] == [1]
+    assert lotes[EVENTO_VEHICULO] == [{"id_vehiculo": 1, "eliminado": True}]
+
+    # La posición con la que sale del recuadro se envía; las siguientes no
+    hub.on_positions({1: _fix(6.0, 1)})
+    hub.on_positions({1: _fix(6.1, 2)})
+    assert [p["latitud"] for p in suscripcion.drain()[EVENTO_POSICION]] == [6.0]
+    hub.on_positions({1: _fix(6.2, 3)})
+    assert suscripcion.drain() == {}
+
+
+def test_events_from_other_replicas_reach_local_subscribers():
+    hub = LivePositions(use_redis=False)
+    suscripcion = hub.subscribe(ids=[7])
+    evento = [EVENTO_POSICION, 7, {"id_vehiculo": 7, "latitud": 4.6, "longitud": -74.0, "timestamp": "2026-01-01T12:00:00"}]
+
+    hub._on_message({"data": json.dumps({"origin": hub.instance_id, "eventos": [evento]})})
+    assert suscripcion.drain() == {}
+
+    hub._on_message({"data": json.dumps({"origin": "otra-replica", "eventos": [evento]})})
+    assert suscripcion.drain() == {EVENTO_POSICION: [evento[2]]}
+
+    hub.unsubscribe(suscripcion)
+    hub._on_message({"data": json.dumps({"origin": "otra-replica", "eventos": [evento]})})
+    assert hub.stats()["subscriptions"] == 0
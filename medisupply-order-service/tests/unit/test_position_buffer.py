@@ -0,0 +1,68 @@
+from datetime import datetime
+from unittest.mock import patch
+
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+import app.core.database as core_db
+from app.core.position_buffer import Posicion, PositionBuffer
+from app.models.vehiculo import Vehiculo, TipoVehiculo
+
+
+def _posicion(minuto: int, latitud: float = 4.6) -> Posicion:
+    return Posicion(latitud, -74.08, datetime(2026, 1, 1, 12, minuto))
+
+
+def test_add_keeps_latest_fix_and_drops_out_of_order():
+    """Test only the newest fix per vehicle is kept and older arrivals are discarded"""
+    buffer = PositionBuffer(use_redis=False)
+    assert buffer.add([(1, _posicion(1)), (1, _posicion(3, latitud=4.7)), (2, _posicion(2))]) == 3
+    assert buffer.add([(1, _posicion(2))]) == 0
+
+    assert buffer.get(1) == _posicion(3, latitud=4.7)
+    assert buffer.pending() == 2
+    assert buffer.stats()["discarded"] == 1
+
+
+def test_flush_writes_all_vehicles_in_batched_updates(db_session):
+    """Test the flush issues executemany UPDATEs and never overwrites a newer stored fix"""
+    for i in (1, 2, 3):
+        db_session.add(Vehiculo(id=i, id_conductor=i, placa=f"GPS{i}", tipo=TipoVehiculo.VAN))
+    db_session.get(Vehiculo, 3).timestamp = datetime(2026, 1, 1, 13, 0)
+    db_session.commit()
+
+    buffer = PositionBuffer(batch_size=2, use_redis=False)
+    buffer.add([(1, _posicion(1)), (2, _posicion(2)), (3, _posicion(3))])
+
+    updates = []
+
+    def capturar(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("UPDATE"):
+            updates.append(executemany)
+
+    engine = db_session.get_bind()
+    event.listen(engine, "before_cursor_execute", capturar)
+    try:
+        with patch.object(core_db, "SessionLocal", sessionmaker(bind=engine)):
+            assert buffer.flush() == 3
+    finally:
+        event.remove(engine, "before_cursor_execute", capturar)
+
+    assert updates == [True, False]
+    assert buffer.pending() == 0
+    db_session.expire_all()
+    assert db_session.get(Vehiculo, 1).timestamp == datetime(2026, 1, 1, 12, 1)
+    assert db_session.get(Vehiculo, 2).latitud == 4.6
+    # El fix del buffer es más viejo que el guardado
+    assert db_session.get(Vehiculo, 3).timestamp == datetime(2026, 1, 1, 13, 0)
+    assert db_session.get(Vehiculo, 3).latitud is None
+
+
+def test_failed_flush_requeues_fixes():
+    buffer = PositionBuffer(use_redis=False)
+    buffer.add([(1, _posicion(1))])
+
+    with patch.object(core_db, "SessionLocal", side_effect=RuntimeError("db down")):
+        assert buffer.flush() == 0
+    assert buffer.pending() == 1
+    assert buffer.stats()["flush_errors"] == 1
@@ -0,0 +1,111 @@
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+from sqlalchemy.orm import sessionmaker
+
+import app.core.database as core_db
+from app.core.position_buffer import Posicion, PositionBuffer
+from app.core.position_history import TABLA, PositionHistory
+from app.models.posicion_historial import PosicionHistorial, PosicionRollup
+from app.models.vehiculo import Vehiculo, TipoVehiculo
+
+
+def test_flush_appends_every_fix_to_history(db_session):
+    """Test the flush inserts all accepted fixes, not only the latest, and ignores re-sent ones"""
+    db_session.add(Vehiculo(id=1, id_conductor=1, placa="HIS01", tipo=TipoVehiculo.VAN))
+    db_session.commit()
+    buffer = PositionBuffer(use_redis=False)
+    fixes = [(1, Posicion(4.6 + i / 1000, -74.08, datetime(2026, 1, 1, 12, 0, i))) for i in range(5)]
+
+    with patch.object(core_db, "SessionLocal", sessionmaker(bind=db_session.get_bind())):
+        buffer.add(fixes)
+        buffer.flush()
+        # Un reintento de otra réplica con fixes ya guardados no rompe el volcado
+        buffer._history.extend(fixes[:2])
+        buffer.flush()
+
+    assert db_session.query(PosicionHistorial).count() == 5
+    assert buffer.stats()["history_pending"] == 0
+
+
+def test_compact_rolls_up_old_days_and_deletes_raw_points(db_session):
+    ahora = datetime(2026, 3, 10, 15, 0)
+    viejo = datetime(2026, 3, 1, 8, 0)
+    db_session.add_all(
+        [PosicionHistorial(id_vehiculo=1, timestamp=viejo + timedelta(seconds=30 * i), latitud=4.0 + i, longitud=-74.0)
+         for i in range(4)]
+        + [PosicionHistorial(id_vehiculo=1, timestamp=ahora - timedelta(hours=1), latitud=5.0, longitud=-75.0)]
+    )
+    db_session.commit()
+    history = PositionHistory(dias_crudos=7, resolucion_rollup=60)
+
+    with patch.object(core_db, "SessionLocal", sessionmaker(bind=db_session.get_bind())):
+        resumen = history.compact(ahora)
+        # Un fix atrasado del mismo minuto ya agregado se suma a su rollup
+        db_session.add(PosicionHistorial(id_vehiculo=1, timestamp=viejo + timedelta(seconds=5), latitud=10.0, longitud=-74.0))
+        db_session.commit()
+        history.compact(ahora)
+
+    assert resumen["crudos_borrados"] == 4
+    assert db_session.query(PosicionHistorial).count() == 1
+    rollups = db_session.query(PosicionRollup).order_by(PosicionRollup.bucket).all()
+    assert [(r.bucket, r.latitud, r.muestras) for r in rollups] == [
+        (datetime(2026, 3, 1, 8, 0), (4.0 + 5.0 + 10.0) / 3, 3),
+        (datetime(2026, 3, 1, 8, 1), 6.5, 2),
+    ]
+
+
+def _engine_postgres(particionada: bool):
+    """Engine falso de PostgreSQL que registra las sentencias ejecutadas"""
+    sentencias = []
+    conn = MagicMock()
+
+    def execute(sql, params=None):
+        sentencias.append(str(sql))
+        resultado = MagicMock()
+        resultado.first.return_value = (1,) if particionada else None
+        return resultado
+
+    conn.execute.side_effect = execute
+    engine = MagicMock()
+    engine.dialect.name = "postgresql"
+    engine.begin.return_value.__enter__.return_value = conn
+    return engine, sentencias
+
+
+def test_create_tables_creates_partitioned_history_on_postgres():
+    """Test create_all skips vehiculo_posiciones on PostgreSQL, which is created partitioned by day"""
+    engine, sentencias = _engine_postgres(particionada=True)
+    with patch.object(core_db, "engine", engine), \
+            patch.object(core_db.Base.metadata, "create_all") as create_all:
+        core_db.create_tables()
+
+    tablas = [t.name for t in create_all.call_args.kwargs["tables"]]
+    assert TABLA not in tablas and "vehiculo_posiciones_rollup" in tablas
+    assert "PARTITION BY RANGE (timestamp)" in sentencias[0]
+    assert any(f"{TABLA}_default PARTITION OF {TABLA} DEFAULT" in s for s in sentencias)
+
+
+def test_unpartitioned_history_is_reported_at_startup(caplog):
+    engine, sentencias = _engine_postgres(particionada=False)
+    with patch.object(core_db, "engine", engine), patch.object(core_db.Base.metadata, "create_all"):
+        core_db.create_tables()
+
+    assert not any("DEFAULT" in s for s in sentencias)
+    assert "SIN particionar" in caplog.text
+
+
+def test_compact_drops_old_partitions_when_partitioned(db_session):
+    """Test compaction takes the partition path: old days are dropped whole"""
+    history = PositionHistory(dias_crudos=7)
+    particiones = [f"{TABLA}_default", f"{TABLA}_p20260228", f"{TABLA}_p20260302", f"{TABLA}_p20260303"]
+
+    with patch.object(core_db, "SessionLocal", sessionmaker(bind=db_session.get_bind())), \
+            patch.object(PositionHistory, "_particionada", return_value=True), \
+            patch.object(PositionHistory, "_particiones", return_value=particiones), \
+            patch.object(PositionHistory, "ensure_partitions", return_value=[f"{TABLA}_p20260309"]) as crear:
+        resumen = history.compact(datetime(2026, 3, 9, 10, 0))
+
+    assert resumen["particiones_borradas"] == [f"{TABLA}_p20260228"]
+    assert resumen["particiones_creadas"] == [f"{TABLA}_p20260309"]
+    crear.assert_called_once()
@@ -0,0 +1,89 @@
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.core.config import settings
+from app.core.redis import RedisClient
+
+
+@pytest.fixture
+def breaker():
+    """RedisClient with a clean circuit and a fast reconnection probe"""
+    def reset():
+        RedisClient._stop_probe.set()
+        if RedisClient._probe_thread is not None:
+            RedisClient._probe_thread.join(timeout=2)
+        RedisClient._instance = None
+        RedisClient._open = False
+        RedisClient._failures = 0
+        RedisClient._opened_at = None
+
+    reset()
+    listeners = list(RedisClient._reconnect_listeners)
+    with patch.object(RedisClient, "_enabled", True), \
+            patch.object(settings, "REDIS_PROBE_INITIAL_DELAY", 0.01), \
+            patch.object(settings, "REDIS_PROBE_MAX_DELAY", 0.02):
+        yield RedisClient
+    reset()
+    RedisClient._reconnect_listeners[:] = listeners
+
+
+def _wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_failed_first_ping_opens_circuit_and_fails_fast(breaker):
+    """Test an unreachable Redis pauses the cache without waiting on timeouts per call"""
+    failing = MagicMock()
+    failing.ping.side_effect = RedisConnectionError("connection refused")
+    probe = MagicMock()
+    probe.ping.side_effect = RedisConnectionError("connection refused")
+
+    with patch.object(RedisClient, "_create_client", return_value=failing), \
+            patch("app.core.redis.redis.Redis.from_url", return_value=probe):
+        assert breaker.get_client() is None
+        assert breaker.stats()["circuit"] == "open"
+
+        start = time.monotonic()
+        for _ in range(100):
+            assert breaker.get_client() is None
+        assert time.monotonic() - start < 0.1
+        assert failing.ping.call_count == 1
+        # The background probe keeps retrying with backoff
+        assert _wait_until(lambda: probe.ping.call_count >= 2)
+
+
+def test_circuit_closes_when_redis_comes_back(breaker):
+    """Test the probe re-enables the cache and notifies listeners after an outage"""
+    reconnected = []
+    breaker.add_reconnect_listener(lambda: reconnected.append(True))
+    healthy = MagicMock()
+    probe = MagicMock()
+    probe.ping.side_effect = [RedisConnectionError("down"), True]
+
+    with patch("app.core.redis.redis.Redis.from_url", return_value=probe):
+        for _ in range(settings.REDIS_BREAKER_THRESHOLD):
+            breaker.record_failure()
+        assert breaker.get_client() is None
+
+        with patch.object(RedisClient, "_create_client", return_value=healthy):
+            assert _wait_until(lambda: breaker.stats()["circuit"] == "closed")
+            assert breaker.get_client() is healthy
+
+    assert reconnected == [True]
+    assert breaker.stats()["consecutive_failures"] == 0
+
+
+def test_success_resets_consecutive_failures(breaker):
+    for _ in range(settings.REDIS_BREAKER_THRESHOLD - 1):
+        breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.stats()["circuit"] == "closed"
@@ -1,12 +1,15 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from app.core.database import get_db
 from app.schemas.report_schema import ReporteRequest, ReporteResponse
-from app.services.report_service import ReportService
+from app.services.report_service import ExportacionIncompletaError, ReportService
 
 router = APIRouter(prefix="/api/v1/reportes", tags=["Reportes"])
 
 @router.post("/", response_model=ReporteResponse, summary="Consultar reportes de vendedores")
 def consultar_reportes(payload: ReporteRequest, db: Session = Depends(get_db)):
     service = ReportService(db)
-    return service.generar_reportes(payload)
+    try:
+        return service.generar_reportes(payload)
+    except ExportacionIncompletaError as e:
+        raise HTTPException(status_code=502, detail=f"Órdenes incompletas del order-service: {str(e)}")
@@ -16,6 +16,28 @@ class Settings(BaseSettings):
     USER_SERVICE_URL: str = os.getenv('USER_SERVICE_URL', 'http://medisupply-user-service:8000')
     # URL base del servicio de órdenes (usado para obtener datos de órdenes/pedidos)
     ORDER_SERVICE_URL: str = os.getenv('ORDER_SERVICE_URL', 'http://medisupply-order-service:8000')
+    # Validación de tokens: 'remote' consulta /api/v1/users/me, 'local' valida el JWT en proceso
+    AUTH_MODE: str = os.getenv('AUTH_MODE', 'remote').lower()
+    # Debe coincidir con la SECRET_KEY/ALGORITHM del user-service para validar localmente
+    JWT_SECRET_KEY: str = os.getenv('JWT_SECRET_KEY', os.getenv('SECRET_KEY', 'replace_with_secure_secret'))
+    JWT_ALGORITHM: str = os.getenv('JWT_ALGORITHM', 'HS256')
+    # Con RS256/ES256 las claves públicas se obtienen del JWKS del user-service
+    JWKS_URL: str = os.getenv('JWKS_URL', USER_SERVICE_URL.rstrip('/') + '/.well-known/jwks.json')
+    JWKS_REFRESH_SECONDS: int = int(os.getenv('JWKS_REFRESH_SECONDS', '300'))
+    JWKS_MIN_REFRESH_SECONDS: int = int(os.getenv('JWKS_MIN_REFRESH_SECONDS', '30'))
+    # Caché en proceso de la validación remota (/users/me); el TTL se acota además al `exp` del token
+    TOKEN_CACHE_ENABLED: bool = os.getenv('TOKEN_CACHE_ENABLED', 'True').lower() == 'true'
+    TOKEN_CACHE_MAX_ENTRIES: int = int(os.getenv('TOKEN_CACHE_MAX_ENTRIES', '10000'))
+    TOKEN_CACHE_TTL_SECONDS: int = int(os.getenv('TOKEN_CACHE_TTL_SECONDS', '60'))
+    # Pool HTTP compartido para llamadas entre servicios (keep-alive)
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv('HTTP_MAX_CONNECTIONS', '100'))
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv('HTTP_MAX_KEEPALIVE_CONNECTIONS', '20'))
+    HTTP_KEEPALIVE_EXPIRY: float = float(os.getenv('HTTP_KEEPALIVE_EXPIRY', '30'))
+    HTTP_DEFAULT_TIMEOUT: float = float(os.getenv('HTTP_DEFAULT_TIMEOUT', '10'))
+    # Timeouts por upstream (segundos)
+    AUTH_TIMEOUT: float = float(os.getenv('AUTH_TIMEOUT', '3'))
+    USER_SERVICE_TIMEOUT: float = float(os.getenv('USER_SERVICE_TIMEOUT', '10'))
+    ORDER_SERVICE_TIMEOUT: float = float(os.getenv('ORDER_SERVICE_TIMEOUT', '30'))
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv('ACCESS_TOKEN_EXPIRE_MINUTES', '30'))
     PROJECT_NAME: str = "medisupply-supplier-service"
     VERSION: str = "0.1.0"
@@ -3,7 +3,7 @@ import os
 from typing import Optional
 from fastapi import HTTPException, Request, status, Security
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from app.core.auth import verify_token_with_user_service
+from app.core.auth import verify_token
 from fastapi import Depends
 from app.core.config import settings
 
@@ -21,7 +21,7 @@ def get_current_user(request: Request, credentials: Optional[HTTPAuthorizationCr
 	Comportamiento:
 	- Si `AUTH_DISABLED=true` en el entorno, devuelve un usuario de prueba (para CI/tests locales).
 	- Si `request.state.user` ya fue poblado por el middleware, lo devuelve (evita doble verificación remota).
-	- En caso contrario, delega la verificación al user-service vía `verify_token_with_user_service`.
+	- En caso contrario, valida el token vía `verify_token` (local o remoto según `AUTH_MODE`).
 	Lanza 401 si el token es inválido o user-service no responde.
 	"""
 	# Test / local shortcut
@@ -53,31 +53,42 @@ def get_current_user(request: Request, credentials: Optional[HTTPAuthorizationCr
 			raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid Authorization header format")
 		token = parts[1]
 
-	user = verify_token_with_user_service(token)
-	if not user:
-		raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired token")
-	return user
+	return _resolve_user(request, token)
 
 
-def require_auth_security(credentials: Optional[HTTPAuthorizationCredentials] = Security(HTTPBearer(auto_error=False))) -> dict:
+def require_auth_security(request: Request, credentials: Optional[HTTPAuthorizationCredentials] = Security(HTTPBearer(auto_error=False))) -> dict:
 	"""Security dependency to show OpenAPI lock and validate token.
 
 	This is intended to be used with Security(...) at the router level so
-	FastAPI shows the padlock in the docs. It performs the same token
-	validation as get_current_user but is a minimal dependency that accepts
-	the HTTP Bearer credential directly.
+	FastAPI shows the padlock in the docs. It reuses the identity already
+	resolved by the middleware (`request.state.user`) and only validates the
+	HTTP Bearer credential itself when nothing upstream did.
 	"""
 	# If tests disable auth, allow through with a test user
 	if os.getenv("AUTH_DISABLED", "false").lower() == "true":
 		return {"id": 0, "email": "test@local", "name": "test-user", "is_active": True}
 
+	# Identity already resolved for this request (middleware or another dependency)
+	user: Optional[dict] = getattr(request.state, "user", None)
+	if user:
+		return user
+
 	if not credentials or not credentials.scheme or credentials.scheme.lower() != 'bearer':
 		raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or missing credentials")
 
-	token = credentials.credentials
-	user = verify_token_with_user_service(token)
+	return _resolve_user(request, credentials.credentials)
+
+
+def _resolve_user(request: Request, token: str) -> dict:
+	"""Valida el token una sola vez por petición y lo guarda en `request.state.user`.
+
+	Así `require_auth_security`, `get_current_user` y `require_roles` comparten
+	la misma identidad sin volver a verificar el token.
+	"""
+	user = verify_token(token)
 	if not user:
 		raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired token")
+	request.state.user = user
 	return user
 
 
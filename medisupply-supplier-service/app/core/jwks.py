@@ -0,0 +1,90 @@
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+import httpx
+
+from app.core.config import settings
+from app.core.http_client import get_http_client
+
+logger = logging.getLogger(__name__)
+
+
+class JWKSCache:
+    """Caché de las claves públicas publicadas por el user-service.
+
+    Las claves se indexan por `kid` para una búsqueda O(1). Un hilo en
+    segundo plano las refresca periódicamente; ante un `kid` desconocido se
+    fuerza un refresco, como máximo uno por `min_refresh_interval` aunque
+    lleguen muchas peticiones concurrentes.
+    """
+
+    def __init__(self, url: str, refresh_interval: int = 300, min_refresh_interval: int = 30, timeout: float = settings.AUTH_TIMEOUT):
+        self.url = url
+        self.refresh_interval = refresh_interval
+        self.min_refresh_interval = min_refresh_interval
+        self.timeout = timeout
+        self._keys: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._last_refresh: Optional[float] = None
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def get_key(self, kid: Optional[str], refresh: bool = True) -> Optional[dict]:
+        key = self._keys.get(kid)
+        if key is not None or not refresh:
+            return key
+
+        with self._lock:
+            # Otro hilo pudo haber refrescado mientras esperábamos el lock
+            key = self._keys.get(kid)
+            if key is None and self._can_refresh():
+                self._refresh_locked()
+                key = self._keys.get(kid)
+        return key
+
+    def refresh(self) -> None:
+        with self._lock:
+            self._refresh_locked()
+
+    def _can_refresh(self) -> bool:
+        return self._last_refresh is None or time.monotonic() - self._last_refresh >= self.min_refresh_interval
+
+    def _refresh_locked(self) -> None:
+        # Se marca antes de la llamada para que un user-service caído no provoque reintentos en cascada
+        self._last_refresh = time.monotonic()
+        try:
+            resp = get_http_client().get(self.url, timeout=self.timeout)
+            resp.raise_for_status()
+            keys = resp.json().get('keys', [])
+        except (httpx.HTTPError, ValueError) as e:
+            logger.warning(f"Could not refresh JWKS from {self.url}: {e}")
+            return
+        # Reemplazo atómico del dict: los lectores nunca ven un estado parcial
+        self._keys = {k['kid']: k for k in keys if k.get('kid')}
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='jwks-refresh', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def _run(self) -> None:
+        self.refresh()
+        while not self._stop_event.wait(self.refresh_interval):
+            self.refresh()
+
+
+jwks_cache = JWKSCache(
+    settings.JWKS_URL,
+    refresh_interval=settings.JWKS_REFRESH_SECONDS,
+    min_refresh_interval=settings.JWKS_MIN_REFRESH_SECONDS,
+)
@@ -0,0 +1,191 @@
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional
+
+from jose import JWTError, jwt
+
+from app.core.config import settings
+
+
+class _InFlight:
+    """Verificación en curso compartida por las peticiones con el mismo token."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[dict] = None
+        self.error: Optional[BaseException] = None
+
+
+class TokenCache:
+    """Caché LRU + TTL de los resultados de `/api/v1/users/me`.
+
+    - Las entradas se indexan por el SHA-256 del token (nunca el token en claro).
+    - Cada entrada vence en `min(exp del token, ahora + ttl)`.
+    - Peticiones concurrentes con el mismo token sin cachear comparten una
+      sola verificación remota (single-flight).
+    - Los resultados negativos no se cachean.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl: int = 60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._in_flight: Dict[str, _InFlight] = {}
+        self._async_in_flight: Dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def token_key(token: str) -> str:
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+    def _expires_at(self, token: str) -> float:
+        expires_at = time.time() + self.ttl
+        try:
+            exp = jwt.get_unverified_claims(token).get('exp')
+        except JWTError:
+            exp = None
+        if isinstance(exp, (int, float)):
+            expires_at = min(expires_at, float(exp))
+        return expires_at
+
+    def get_or_load(self, token: str, loader: Callable[[str], Optional[dict]]) -> Optional[dict]:
+        key = self.token_key(token)
+        leader = False
+        with self._lock:
+            user = self._lookup_locked(key)
+            if user is not None:
+                return user
+
+            call = self._in_flight.get(key)
+            if call is None:
+                call = _InFlight()
+                self._in_flight[key] = call
+                leader = True
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                # Un fallo del líder no significa que el token sea inválido
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._load(token, key, loader)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            call.done.set()
+        return call.result
+
+    def _lookup_locked(self, key: str) -> Optional[dict]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            user, expires_at = entry
+            if expires_at > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return user
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    async def get_or_load_async(self, token: str, loader: Callable[[str], Awaitable[Optional[dict]]]) -> Optional[dict]:
+        """Variante async de `get_or_load` para usar desde el event loop sin bloquearlo.
+
+        Si el líder se cancela (el cliente se desconectó) los seguidores no
+        reciben un resultado "token inválido": uno de ellos repite la carga.
+        Un error del líder se propaga a los seguidores.
+        """
+        key = self.token_key(token)
+        while True:
+            with self._lock:
+                user = self._lookup_locked(key)
+                if user is not None:
+                    return user
+
+            future = self._async_in_flight.get(key)
+            if future is None:
+                break
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # Se repite solo si el cancelado fue el líder, no esta petición
+                if not future.cancelled() or asyncio.current_task().cancelling():
+                    raise
+
+        future = asyncio.get_running_loop().create_future()
+        # Evita el aviso "exception was never retrieved" cuando no hay seguidores
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._async_in_flight[key] = future
+        try:
+            user = await self._load_async(token, key, loader)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            self._async_in_flight.pop(key, None)
+        future.set_result(user)
+        return user
+
+    def _load(self, token: str, key: str, loader: Callable[[str], Optional[dict]]) -> Optional[dict]:
+        expires_at = self._expires_at(token)
+        user = loader(token)
+        if user is None:
+            return None
+
+        if expires_at > time.time():
+            self._store(key, user, expires_at)
+        return user
+
+    async def _load_async(self, token: str, key: str, loader: Callable[[str], Awaitable[Optional[dict]]]) -> Optional[dict]:
+        expires_at = self._expires_at(token)
+        user = await loader(token)
+        if user is None:
+            return None
+
+        if expires_at > time.time():
+            self._store(key, user, expires_at)
+        return user
+
+    def _store(self, key: str, user: dict, expires_at: float) -> None:
+        with self._lock:
+            self._entries[key] = (user, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'coalesced': self.coalesced,
+        }
+
+
+token_cache = TokenCache(
+    max_entries=settings.TOKEN_CACHE_MAX_ENTRIES,
+    ttl=settings.TOKEN_CACHE_TTL_SECONDS,
+)
@@ -4,7 +4,7 @@ from fastapi.responses import JSONResponse
 from app.api.v1 import proveedor_routes, producto_routes, catalog_routes, plan_routes, vendedor_routes, report_routes, visita_routes
 from app.api.v1 import user_lookup_routes
 from app.core.dependencies import get_current_user, require_auth_security
-from app.core.auth import require_auth
+from app.core.auth import require_auth_async
 from app.core.database import create_tables
 import os
 from app.core.seed_data import seed_data
@@ -147,7 +147,7 @@ async def auth_middleware(request: Request, call_next):
         request.state.user = {"id": 0, "email": "test@local", "name": "test-user", "is_active": True}
     else:
         try:
-            user_json = require_auth(request)
+            user_json = await require_auth_async(request)
             # attach user info to the request so endpoints can use it if needed
             request.state.user = user_json
         except HTTPException as exc:
@@ -227,11 +227,13 @@ def healthz():
                     }
                 )
         
+        from app.core.token_cache import token_cache
         return {
             "status": "healthy",
             "service": "supplier-service",
             "database": "connected",
-            "tables": "ready"
+            "tables": "ready",
+            "auth_cache": token_cache.stats()
         }
     except HTTPException:
         raise
@@ -276,6 +278,15 @@ async def startup_event():
     logger.info(f"{settings.PROJECT_NAME} v{settings.VERSION} starting up...")
     logger.info(f"Environment: {'Development' if settings.DEBUG else 'Production'}")
     
+    # Pool HTTP compartido para las llamadas a otros servicios
+    from app.core.http_client import init_http_clients
+    init_http_clients()
+    
+    # Refresco en segundo plano de las claves públicas del user-service
+    if settings.AUTH_MODE == 'local' and not settings.JWT_ALGORITHM.startswith('HS'):
+        from app.core.jwks import jwks_cache
+        jwks_cache.start()
+    
     # Reintentar crear tablas y ejecutar seeds en background después de 10 segundos
     import asyncio
     
@@ -294,3 +305,15 @@ async def startup_event():
     
     # Ejecutar en background sin bloquear (guardar referencia para evitar garbage collection)
     _startup_task = asyncio.create_task(retry_create_tables_and_seed())
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Evento de shutdown - detiene tareas en segundo plano"""
+    logger.info(f"{settings.PROJECT_NAME} shutting down...")
+
+    from app.core.jwks import jwks_cache
+    jwks_cache.stop()
+
+    from app.core.http_client import close_http_clients
+    await close_http_clients()
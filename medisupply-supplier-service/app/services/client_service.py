@@ -2,7 +2,7 @@ from sqlalchemy.orm import Session
 from typing import List, Dict, Any, Optional, Union
 from sqlalchemy.exc import IntegrityError
 import uuid
-import httpx
+from app.core.http_client import get_http_client
 from app.core.config import settings
 from app.models.client import Cliente
 from app.models.vendedor import Vendedor
@@ -55,11 +55,11 @@ class ClientService:
             }
             try:
                 url = f"{settings.USER_SERVICE_URL}/api/v1/users/register"
-                with httpx.Client(timeout=10.0) as client:
-                    resp = client.post(url, json=user_payload)
-                    if resp.status_code not in (200, 201):
-                        raise ValueError(f"user-service register failed: {resp.status_code} {resp.text}")
-                    created_user_info = resp.json()
+                client = get_http_client()
+                resp = client.post(url, json=user_payload, timeout=settings.USER_SERVICE_TIMEOUT)
+                if resp.status_code not in (200, 201):
+                    raise ValueError(f"user-service register failed: {resp.status_code} {resp.text}")
+                created_user_info = resp.json()
             except Exception as e:
                 raise ValueError(f"No se pudo crear usuario en user-service: {str(e)}")
 
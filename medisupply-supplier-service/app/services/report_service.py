@@ -1,7 +1,9 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from datetime import date, datetime
-import httpx
+import json
+import logging
+from app.core.http_client import get_http_client
 from typing import List, Dict, Any
 from app.core.config import settings
 from app.models.pedido import Pedido
@@ -14,6 +16,13 @@ from app.schemas.report_schema import (
 )
 from app.models.catalogs import Pais
 
+logger = logging.getLogger(__name__)
+
+
+class ExportacionIncompletaError(ValueError):
+    """La exportación de órdenes del order-service llegó truncada o con error"""
+
+
 class ReportService:
     def __init__(self, db: Session):
         self.db = db
@@ -56,13 +65,12 @@ class ReportService:
             fecha_desde_dt = datetime.combine(fecha_desde, datetime.min.time())
             fecha_hasta_dt = datetime.combine(fecha_hasta, datetime.max.time())
             
-            # Construir URL del endpoint interno
-            url = f"{self.order_service_url}/internal/v1/ordenes"
+            # Exportación NDJSON del order-service: todas las órdenes del rango en una sola petición
+            url = f"{self.order_service_url}/internal/v1/ordenes/export"
             params = {
                 "fecha_desde": fecha_desde_dt.isoformat(),
                 "fecha_hasta": fecha_hasta_dt.isoformat(),
                 "estado": "ENTREGADO",  # Solo órdenes entregadas para reportes
-                "limit": 1000  # Ajustar según necesidades
             }
             
             if id_vendedor:
@@ -72,14 +80,53 @@ class ReportService:
             headers = {
                 "X-Internal-Service-Key": settings.INTERNAL_SERVICE_KEY
             }
-            with httpx.Client(timeout=30.0, follow_redirects=True) as client:
-                response = client.get(url, params=params, headers=headers)
+            client = get_http_client()
+            with client.stream("GET", url, params=params, headers=headers, timeout=settings.ORDER_SERVICE_TIMEOUT) as response:
                 response.raise_for_status()
-                return response.json()
+                return self._leer_exportacion(response.iter_lines())
+        except ExportacionIncompletaError as e:
+            # Un reporte con las órdenes a medias se vería como ventas bajas: se falla
+            logger.error(f"Exportación de órdenes incompleta del order-service: {e}")
+            raise
         except Exception as e:
-            print(f"Error al obtener órdenes del order-service: {str(e)}")
+            logger.error(f"Error al obtener órdenes del order-service: {e}")
             return []
     
+    @staticmethod
+    def _leer_exportacion(lineas) -> List[Dict[str, Any]]:
+        """Lee el NDJSON de /export validando el trailer final.
+
+        El order-service termina el stream con `{"_fin": {"total": N}}` o con
+        `{"_error": ...}`. Si falta el trailer, trae un error o el total no
+        coincide, el stream llegó truncado y se lanza ExportacionIncompletaError
+        en lugar de devolver una lista parcial como si fuera completa.
+        """
+        ordenes: List[Dict[str, Any]] = []
+        trailer = None
+        for line in lineas:
+            if not line:
+                continue
+            if trailer is not None:
+                raise ExportacionIncompletaError("Exportación de órdenes con datos después del trailer")
+            try:
+                item = json.loads(line)
+            except ValueError:
+                raise ExportacionIncompletaError(f"Exportación de órdenes con una línea cortada tras {len(ordenes)} filas")
+            if "_error" in item:
+                raise ExportacionIncompletaError(f"Exportación de órdenes interrumpida: {item['_error']}")
+            if "_fin" in item:
+                trailer = item["_fin"]
+                continue
+            ordenes.append(item)
+
+        if trailer is None:
+            raise ExportacionIncompletaError(f"Exportación de órdenes truncada tras {len(ordenes)} filas (sin trailer)")
+        if trailer.get("total") != len(ordenes):
+            raise ExportacionIncompletaError(
+                f"Exportación de órdenes incompleta: {len(ordenes)} filas de {trailer.get('total')}"
+            )
+        return ordenes
+
     # -------------------------
     def _calcular_tiempo_entrega_promedio(self, ordenes: List[Dict[str, Any]]) -> float:
         """Calcula el tiempo promedio de entrega en horas basándose en órdenes ENTREGADAS"""
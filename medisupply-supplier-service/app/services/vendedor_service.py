@@ -6,7 +6,7 @@ from app.models.catalogs import Pais
 from app.models.plan_venta import PlanVenta
 import json
 import uuid
-import httpx
+from app.core.http_client import get_http_client
 from app.core.config import settings
 
 class VendedorService:
@@ -74,11 +74,11 @@ class VendedorService:
             try:
                 url = f"{settings.USER_SERVICE_URL}/api/v1/users/register"
                 headers = {}
-                with httpx.Client(timeout=10.0) as client:
-                    resp = client.post(url, json=user_payload, headers=headers)
-                    if resp.status_code not in (200, 201):
-                        raise ValueError(f"user-service register failed: {resp.status_code} {resp.text}")
-                    created_user_info = resp.json()
+                client = get_http_client()
+                resp = client.post(url, json=user_payload, headers=headers, timeout=settings.USER_SERVICE_TIMEOUT)
+                if resp.status_code not in (200, 201):
+                    raise ValueError(f"user-service register failed: {resp.status_code} {resp.text}")
+                created_user_info = resp.json()
             except Exception as e:
                 raise ValueError(f"No se pudo crear usuario en user-service: {str(e)}")
 
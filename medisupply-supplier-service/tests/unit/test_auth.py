@@ -1,8 +1,9 @@
 import pytest
+from types import SimpleNamespace
 
 
 def test_verify_token_with_user_service_success(monkeypatch):
-    # monkeypatch requests.get to simulate user-service returning 200
+    # monkeypatch the shared HTTP client to simulate user-service returning 200
     class FakeResp:
         def __init__(self, status_code, json_data):
             self.status_code = status_code
@@ -14,7 +15,7 @@ def test_verify_token_with_user_service_success(monkeypatch):
     def fake_get(url, headers, timeout):
         return FakeResp(200, {"id": 1, "email": "u@test"})
 
-    monkeypatch.setattr('app.core.auth.requests.get', fake_get)
+    monkeypatch.setattr('app.core.auth.get_http_client', lambda: SimpleNamespace(get=fake_get))
     from app.core.auth import verify_token_with_user_service
 
     res = verify_token_with_user_service('token123')
@@ -23,13 +24,137 @@ def test_verify_token_with_user_service_success(monkeypatch):
 
 
 def test_verify_token_with_user_service_failure(monkeypatch):
-    # Simulate requests raising an exception or non-200
-    import requests
+    # Simulate the HTTP client raising an exception or non-200
+    import httpx
 
     def fake_get_err(url, headers, timeout):
-        raise requests.RequestException("network")
+        raise httpx.ConnectError("network")
 
-    monkeypatch.setattr('app.core.auth.requests.get', fake_get_err)
+    monkeypatch.setattr('app.core.auth.get_http_client', lambda: SimpleNamespace(get=fake_get_err))
     from app.core.auth import verify_token_with_user_service
 
     assert verify_token_with_user_service('token123') is None
+
+
+def _make_token(claims, minutes=5):
+    from datetime import datetime, timedelta, timezone
+    from jose import jwt
+    from app.core.config import settings
+
+    payload = dict(claims)
+    payload['exp'] = datetime.now(timezone.utc) + timedelta(minutes=minutes)
+    return jwt.encode(payload, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
+
+
+def test_verify_token_locally_valid():
+    from app.core.auth import verify_token_locally
+
+    token = _make_token({'sub': 'v@test', 'uid': 7, 'name': 'V', 'role_id': 3, 'role': 'Vendedor'})
+    user = verify_token_locally(token)
+    assert user == {'id': 7, 'email': 'v@test', 'name': 'V', 'is_active': True, 'role_id': 3, 'role': 'Vendedor'}
+
+
+def test_verify_token_locally_rejects_expired_and_legacy_tokens():
+    from app.core.auth import verify_token_locally
+
+    assert verify_token_locally(_make_token({'sub': 'v@test', 'uid': 7}, minutes=-1)) is None
+    # tokens sin `uid` no pueden resolverse localmente
+    assert verify_token_locally(_make_token({'sub': 'v@test'})) is None
+
+
+def test_verify_token_local_mode_skips_user_service(monkeypatch):
+    from app.core import auth
+    from app.core.dependencies import require_roles
+
+    monkeypatch.setattr(auth.settings, 'AUTH_MODE', 'local')
+
+    def fail_get(*args, **kwargs):
+        raise AssertionError('user-service should not be called')
+
+    monkeypatch.setattr('app.core.auth.get_http_client', lambda: SimpleNamespace(get=fail_get))
+    token = _make_token({'sub': 'v@test', 'uid': 7, 'role_id': 3, 'role': 'Vendedor'})
+    user = auth.verify_token(token)
+    assert user['id'] == 7
+    assert require_roles('Vendedor')(user=user) is user
+
+
+def test_verify_token_local_mode_rejects_invalid_tokens_without_remote_call(monkeypatch):
+    import asyncio
+    from datetime import datetime, timedelta, timezone
+    from jose import jwt
+    from app.core import auth
+
+    monkeypatch.setattr(auth.settings, 'AUTH_MODE', 'local')
+    monkeypatch.setattr(auth.settings, 'JWT_ALGORITHM', 'HS256')
+
+    def fail_remote(token):
+        raise AssertionError('user-service should not be called')
+
+    async def fail_remote_async(token):
+        raise AssertionError('user-service should not be called')
+
+    monkeypatch.setattr(auth, 'verify_token_with_user_service', fail_remote)
+    monkeypatch.setattr(auth, 'verify_token_with_user_service_async', fail_remote_async)
+
+    expired = _make_token({'sub': 'v@test', 'uid': 7}, minutes=-1)
+    forged = jwt.encode(
+        {'sub': 'v@test', 'uid': 7, 'exp': datetime.now(timezone.utc) + timedelta(minutes=5)},
+        'another-secret', algorithm='HS256'
+    )
+    for token in (expired, forged):
+        assert auth.verify_token(token) is None
+        assert asyncio.run(auth.verify_token_async(token)) is None
+
+
+def test_verify_token_locally_with_jwks(monkeypatch):
+    from datetime import datetime, timedelta, timezone
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from jose import jwk, jwt
+    from app.core import auth
+    from app.core.jwks import JWKSCache
+
+    private_pem = rsa.generate_private_key(public_exponent=65537, key_size=2048).private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ).decode()
+    public_jwk = jwk.construct(private_pem, 'RS256').public_key().to_dict()
+    public_jwk['kid'] = 'k1'
+
+    class FakeResp:
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return {'keys': [public_jwk]}
+
+    monkeypatch.setattr('app.core.jwks.get_http_client', lambda: SimpleNamespace(get=lambda url, timeout: FakeResp()))
+    monkeypatch.setattr(auth, 'jwks_cache', JWKSCache('http://user-service/.well-known/jwks.json'))
+    monkeypatch.setattr(auth.settings, 'JWT_ALGORITHM', 'RS256')
+
+    exp = datetime.now(timezone.utc) + timedelta(minutes=5)
+    token = jwt.encode({'sub': 'v@test', 'uid': 7, 'exp': exp}, private_pem, algorithm='RS256', headers={'kid': 'k1'})
+    assert auth.verify_token_locally(token)['id'] == 7
+
+    other = jwt.encode({'sub': 'v@test', 'uid': 7, 'exp': exp}, private_pem, algorithm='RS256', headers={'kid': 'k2'})
+    assert auth.verify_token_locally(other) is None
+
+
+def test_verify_token_remote_results_are_cached(monkeypatch):
+    from app.core import auth
+    from app.core.token_cache import TokenCache
+
+    calls = []
+
+    def fake_remote(token):
+        calls.append(token)
+        return {'id': 9, 'email': 'c@test'}
+
+    monkeypatch.setattr(auth, 'token_cache', TokenCache(max_entries=10, ttl=60))
+    monkeypatch.setattr(auth, 'verify_token_with_user_service', fake_remote)
+    monkeypatch.setattr(auth.settings, 'AUTH_MODE', 'remote')
+
+    token = _make_token({'sub': 'c@test'})
+    assert auth.verify_token(token)['id'] == 9
+    assert auth.verify_token(token)['id'] == 9
+    assert len(calls) == 1
+    assert auth.token_cache.stats()['hits'] == 1
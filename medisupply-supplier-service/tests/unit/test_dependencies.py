@@ -23,14 +23,58 @@ def test_get_current_user_auth_disabled(monkeypatch):
 
 
 def test_get_current_user_header_token(monkeypatch):
-    # Ensure auth enabled and monkeypatch verify_token_with_user_service
+    # Ensure auth enabled and monkeypatch verify_token
     monkeypatch.setenv('AUTH_DISABLED', 'false')
     def fake_verify(token):
         return {'id': 5, 'email': 'ok@test'}
 
-    monkeypatch.setattr('app.core.dependencies.verify_token_with_user_service', fake_verify)
+    monkeypatch.setattr('app.core.dependencies.verify_token', fake_verify)
     from app.core.dependencies import get_current_user
 
     req = FakeRequest(headers={'authorization': 'Bearer abc123'})
     user = get_current_user(req, credentials=None)
     assert user['email'] == 'ok@test'
+
+
+def test_role_gated_request_verifies_token_once(monkeypatch):
+    # Middleware, require_auth_security, require_roles and get_current_user must share one verification
+    from fastapi.testclient import TestClient
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from app.core import auth
+    from app.core.database import Base, get_db
+    from app.main import app
+
+    engine = create_engine('sqlite:///:memory:', connect_args={'check_same_thread': False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(bind=engine)
+
+    def override_get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    calls = []
+
+    def fake_remote(token):
+        calls.append(token)
+        return {'id': 5, 'email': 'v@test', 'role': 'Vendedor', 'role_id': 3}
+
+    monkeypatch.setenv('AUTH_DISABLED', 'false')
+    monkeypatch.setattr(auth.settings, 'AUTH_MODE', 'remote')
+    monkeypatch.setattr(auth.settings, 'TOKEN_CACHE_ENABLED', False)
+    async def fake_remote_async(token):
+        return fake_remote(token)
+
+    monkeypatch.setattr(auth, 'verify_token_with_user_service', fake_remote)
+    monkeypatch.setattr(auth, 'verify_token_with_user_service_async', fake_remote_async)
+    monkeypatch.setitem(app.dependency_overrides, get_db, override_get_db)
+
+    resp = TestClient(app).get('/api/v1/vendedores/', headers={'Authorization': 'Bearer abc123'})
+    engine.dispose()
+
+    assert resp.status_code == 200
+    assert calls == ['abc123']
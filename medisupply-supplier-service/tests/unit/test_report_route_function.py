@@ -1,13 +1,15 @@
+import json
 import pytest
 from datetime import date, datetime, timedelta
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
-from unittest.mock import patch, Mock
+from unittest.mock import patch, MagicMock, Mock
 from app.core.database import Base
 from app.models.catalogs import Pais
 from app.models.vendedor import Vendedor
 from app.models.product import Producto
 from app.models.plan_venta import PlanVenta
+from fastapi import HTTPException
 from app.api.v1.report_routes import consultar_reportes
 from app.schemas.report_schema import ReporteRequest
 
@@ -21,14 +23,17 @@ def setup_inmemory_db():
 
 
 def create_mock_httpx_response(ordenes_data):
-    """Crea un mock de respuesta HTTP con los datos de órdenes"""
-    mock_response = Mock()
-    mock_response.json.return_value = ordenes_data
+    """Crea un mock de respuesta HTTP (stream NDJSON) con los datos de órdenes"""
+    mock_response = MagicMock()
+    mock_response.__enter__.return_value = mock_response
+    mock_response.iter_lines.return_value = [json.dumps(o) for o in ordenes_data] + [
+        json.dumps({"_fin": {"total": len(ordenes_data)}})
+    ]
     mock_response.raise_for_status = Mock()
     return mock_response
 
 
-@patch('app.services.report_service.httpx.Client')
+@patch('app.services.report_service.get_http_client')
 def test_consultar_reportes_endpoint(mock_httpx_client):
     """Test: Endpoint consultar_reportes funciona correctamente con mocks"""
     db = setup_inmemory_db()
@@ -89,7 +94,7 @@ def test_consultar_reportes_endpoint(mock_httpx_client):
         mock_client_instance = Mock()
         mock_client_instance.__enter__ = Mock(return_value=mock_client_instance)
         mock_client_instance.__exit__ = Mock(return_value=False)
-        mock_client_instance.get = Mock(return_value=mock_response)
+        mock_client_instance.stream = Mock(return_value=mock_response)
         mock_httpx_client.return_value = mock_client_instance
         
         # Test: Llamar al endpoint
@@ -119,7 +124,7 @@ def test_consultar_reportes_endpoint(mock_httpx_client):
         db.close()
 
 
-@patch('app.services.report_service.httpx.Client')
+@patch('app.services.report_service.get_http_client')
 def test_consultar_reportes_filtro_por_vendedor(mock_httpx_client):
     """Test: Filtrar reporte por vendedor específico"""
     db = setup_inmemory_db()
@@ -160,7 +165,7 @@ def test_consultar_reportes_filtro_por_vendedor(mock_httpx_client):
         mock_client_instance = Mock()
         mock_client_instance.__enter__ = Mock(return_value=mock_client_instance)
         mock_client_instance.__exit__ = Mock(return_value=False)
-        mock_client_instance.get = Mock(return_value=mock_response)
+        mock_client_instance.stream = Mock(return_value=mock_response)
         mock_httpx_client.return_value = mock_client_instance
         
         # Test: Filtrar por vendedor_id=1
@@ -184,7 +189,7 @@ def test_consultar_reportes_filtro_por_vendedor(mock_httpx_client):
         db.close()
 
 
-@patch('app.services.report_service.httpx.Client')
+@patch('app.services.report_service.get_http_client')
 def test_consultar_reportes_multiples_tipos(mock_httpx_client):
     """Test: Generar múltiples tipos de reportes simultáneamente"""
     db = setup_inmemory_db()
@@ -228,7 +233,7 @@ def test_consultar_reportes_multiples_tipos(mock_httpx_client):
         mock_client_instance = Mock()
         mock_client_instance.__enter__ = Mock(return_value=mock_client_instance)
         mock_client_instance.__exit__ = Mock(return_value=False)
-        mock_client_instance.get = Mock(return_value=mock_response)
+        mock_client_instance.stream = Mock(return_value=mock_response)
         mock_httpx_client.return_value = mock_client_instance
         
         # Test: Solicitar múltiples tipos de reporte
@@ -254,7 +259,7 @@ def test_consultar_reportes_multiples_tipos(mock_httpx_client):
         db.close()
 
 
-@patch('app.services.report_service.httpx.Client')
+@patch('app.services.report_service.get_http_client')
 def test_consultar_reportes_validacion_filtros(mock_httpx_client):
     """Test: Verificar que la función valida correctamente los filtros"""
     db = setup_inmemory_db()
@@ -272,7 +277,7 @@ def test_consultar_reportes_validacion_filtros(mock_httpx_client):
         mock_client_instance = Mock()
         mock_client_instance.__enter__ = Mock(return_value=mock_client_instance)
         mock_client_instance.__exit__ = Mock(return_value=False)
-        mock_client_instance.get = Mock(return_value=mock_response)
+        mock_client_instance.stream = Mock(return_value=mock_response)
         mock_httpx_client.return_value = mock_client_instance
         
         # Test: Request con filtros válidos
@@ -294,3 +299,28 @@ def test_consultar_reportes_validacion_filtros(mock_httpx_client):
         
     finally:
         db.close()
+
+
+@patch('app.services.report_service.get_http_client')
+def test_consultar_reportes_exportacion_truncada_responde_502(mock_httpx_client):
+    """Test: Si la exportación de órdenes llega truncada, el endpoint responde 502"""
+    db = setup_inmemory_db()
+    try:
+        mock_response = create_mock_httpx_response([{"id": 1}])
+        mock_response.iter_lines.return_value = mock_response.iter_lines.return_value[:-1]
+        mock_client_instance = Mock()
+        mock_client_instance.stream = Mock(return_value=mock_response)
+        mock_httpx_client.return_value = mock_client_instance
+
+        payload = ReporteRequest(
+            vendedor_id=None,
+            pais=[1],
+            zona_geografica=[],
+            periodo_tiempo='MES_ACTUAL',
+            tipo_reporte=['DESEMPENO_VENDEDOR']
+        )
+        with pytest.raises(HTTPException) as exc:
+            consultar_reportes(payload, db)
+        assert exc.value.status_code == 502
+    finally:
+        db.close()
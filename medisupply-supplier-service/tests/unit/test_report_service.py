@@ -1,3 +1,4 @@
+import json
 import pytest
 from datetime import date, datetime, timedelta
 from sqlalchemy import create_engine, func
@@ -8,7 +9,7 @@ from app.models.catalogs import Pais
 from app.models.vendedor import Vendedor
 from app.models.product import Producto
 from app.models.plan_venta import PlanVenta
-from app.services.report_service import ReportService
+from app.services.report_service import ExportacionIncompletaError, ReportService
 from app.schemas.report_schema import ReporteRequest
 
 
@@ -21,14 +22,17 @@ def setup_inmemory_db():
 
 
 def create_mock_httpx_response(ordenes_data):
-    """Crea un mock de respuesta HTTP con los datos de órdenes"""
-    mock_response = Mock()
-    mock_response.json.return_value = ordenes_data
+    """Crea un mock de respuesta HTTP (stream NDJSON) con los datos de órdenes"""
+    mock_response = MagicMock()
+    mock_response.__enter__.return_value = mock_response
+    mock_response.iter_lines.return_value = [json.dumps(o) for o in ordenes_data] + [
+        json.dumps({"_fin": {"total": len(ordenes_data)}})
+    ]
     mock_response.raise_for_status = Mock()
     return mock_response
 
 
-@patch('app.services.report_service.httpx.Client')
+@patch('app.services.report_service.get_http_client')
 def test_calcular_valor_orden(mock_httpx_client):
     """Test: Calcula correctamente el valor total de una orden basándose en productos"""
     db = setup_inmemory_db()
@@ -67,7 +71,7 @@ def test_calcular_valor_orden(mock_httpx_client):
         db.close()
 
 
-@patch('app.services.report_service.httpx.Client')
+@patch('app.services.report_service.get_http_client')
 def test_calcular_tiempo_entrega_promedio(mock_httpx_client):
     """Test: Calcula correctamente el tiempo promedio de entrega en horas"""
     db = setup_inmemory_db()
@@ -97,7 +101,7 @@ def test_calcular_tiempo_entrega_promedio(mock_httpx_client):
         db.close()
 
 
-@patch('app.services.report_service.httpx.Client')
+@patch('app.services.report_service.get_http_client')
 def test_generar_reportes_con_mock_http(mock_httpx_client):
     """Test: Genera reportes correctamente usando mock de HTTP"""
     db = setup_inmemory_db()
@@ -158,7 +162,7 @@ def test_generar_reportes_con_mock_http(mock_httpx_client):
         mock_client_instance = Mock()
         mock_client_instance.__enter__ = Mock(return_value=mock_client_instance)
         mock_client_instance.__exit__ = Mock(return_value=False)
-        mock_client_instance.get = Mock(return_value=mock_response)
+        mock_client_instance.stream = Mock(return_value=mock_response)
         mock_httpx_client.return_value = mock_client_instance
         
         # Test: Generar reporte
@@ -189,7 +193,7 @@ def test_generar_reportes_con_mock_http(mock_httpx_client):
         db.close()
 
 
-@patch('app.services.report_service.httpx.Client')
+@patch('app.services.report_service.get_http_client')
 def test_reporte_con_multiples_vendedores(mock_httpx_client):
     """Test: Reporte con múltiples vendedores y productos"""
     db = setup_inmemory_db()
@@ -242,7 +246,7 @@ def test_reporte_con_multiples_vendedores(mock_httpx_client):
         mock_client_instance = Mock()
         mock_client_instance.__enter__ = Mock(return_value=mock_client_instance)
         mock_client_instance.__exit__ = Mock(return_value=False)
-        mock_client_instance.get = Mock(return_value=mock_response)
+        mock_client_instance.stream = Mock(return_value=mock_response)
         mock_httpx_client.return_value = mock_client_instance
         
         # Test
@@ -268,7 +272,7 @@ def test_reporte_con_multiples_vendedores(mock_httpx_client):
         db.close()
 
 
-@patch('app.services.report_service.httpx.Client')
+@patch('app.services.report_service.get_http_client')
 def test_reporte_sin_ordenes(mock_httpx_client):
     """Test: Reporte cuando no hay órdenes devuelve valores en cero"""
     db = setup_inmemory_db()
@@ -290,7 +294,7 @@ def test_reporte_sin_ordenes(mock_httpx_client):
         mock_client_instance = Mock()
         mock_client_instance.__enter__ = Mock(return_value=mock_client_instance)
         mock_client_instance.__exit__ = Mock(return_value=False)
-        mock_client_instance.get = Mock(return_value=mock_response)
+        mock_client_instance.stream = Mock(return_value=mock_response)
         mock_httpx_client.return_value = mock_client_instance
         
         # Test
@@ -315,7 +319,7 @@ def test_reporte_sin_ordenes(mock_httpx_client):
         db.close()
 
 
-@patch('app.services.report_service.httpx.Client')
+@patch('app.services.report_service.get_http_client')
 def test_meta_default_cuando_no_hay_planes(mock_httpx_client):
     """Test: Meta por defecto de 100000 cuando no hay planes de venta"""
     db = setup_inmemory_db()
@@ -333,7 +337,7 @@ def test_meta_default_cuando_no_hay_planes(mock_httpx_client):
         mock_client_instance = Mock()
         mock_client_instance.__enter__ = Mock(return_value=mock_client_instance)
         mock_client_instance.__exit__ = Mock(return_value=False)
-        mock_client_instance.get = Mock(return_value=mock_response)
+        mock_client_instance.stream = Mock(return_value=mock_response)
         mock_httpx_client.return_value = mock_client_instance
         
         # Test
@@ -352,4 +356,38 @@ def test_meta_default_cuando_no_hay_planes(mock_httpx_client):
         assert resp.meta_objetivo_usd == 100000.0
         
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+@patch('app.services.report_service.get_http_client')
+def test_exportacion_truncada_no_se_toma_como_completa(mock_httpx_client):
+    """Test: Un stream NDJSON sin trailer (cortado a mitad) falla en lugar de devolver una lista parcial o vacía"""
+    db = setup_inmemory_db()
+    try:
+        mock_response = create_mock_httpx_response([{"id": 1}, {"id": 2}])
+        mock_response.iter_lines.return_value = mock_response.iter_lines.return_value[:-1]
+        mock_client_instance = Mock()
+        mock_client_instance.stream = Mock(return_value=mock_response)
+        mock_httpx_client.return_value = mock_client_instance
+
+        svc = ReportService(db)
+        with pytest.raises(ExportacionIncompletaError):
+            svc._obtener_ordenes_desde_api(date(2025, 1, 1), date(2025, 1, 31))
+    finally:
+        db.close()
+
+
+@pytest.mark.parametrize("lineas", [
+    [json.dumps({"id": 1}), json.dumps({"_error": "conexión perdida"})],
+    [json.dumps({"id": 1}), json.dumps({"_fin": {"total": 2}})],
+    [json.dumps({"_fin": {"total": 0}}), json.dumps({"id": 1})],
+])
+def test_leer_exportacion_rechaza_streams_incompletos(lineas):
+    """Test: Marcador de error, total distinto o datos tras el trailer invalidan la exportación"""
+    with pytest.raises(ValueError):
+        ReportService._leer_exportacion(lineas)
+
+
+def test_leer_exportacion_valida_trailer():
+    """Test: Con trailer correcto se devuelven solo las órdenes"""
+    lineas = [json.dumps({"id": 1}), "", json.dumps({"id": 2}), json.dumps({"_fin": {"total": 2}})]
+    assert ReportService._leer_exportacion(lineas) == [{"id": 1}, {"id": 2}]
@@ -15,6 +15,7 @@ from locust import HttpUser, task, between, events
 from faker import Faker
 import random
 import json
+import time
 
 fake = Faker()
 
@@ -40,21 +41,51 @@ class MediSupplyUser(HttpUser):
         })
         
         if response.status_code == 200:
-            data = response.json()
-            self.token = data.get("access_token")
-            self.headers = {
-                "Authorization": f"Bearer {self.token}",
-                "Content-Type": "application/json"
-            }
+            self._set_session(response.json())
         else:
             print(f"Login failed: {response.status_code}")
             self.token = None
+            self.refresh_token = None
             self.headers = {}
     
+    def _set_session(self, data):
+        self.token = data.get("access_token")
+        self.refresh_token = data.get("refresh_token")
+        # Renovar un poco antes de los 30 minutos de vida del access token
+        self.token_expires_at = time.time() + 25 * 60
+        self.headers = {
+            "Authorization": f"Bearer {self.token}",
+            "Content-Type": "application/json"
+        }
+    
+    def _ensure_session(self):
+        """
+        Renovar el token si está por vencer antes de hacer una petición.
+        Usa el refresh token en lugar de repetir el login (bcrypt); no es una
+        tarea para no consumir turnos ni `wait_time` de la mezcla de carga.
+        """
+        if not self.token:
+            return False
+        if time.time() < self.token_expires_at:
+            return True
+        
+        response = None
+        if self.refresh_token:
+            response = self.client.post(
+                "/api/v1/users/refresh",
+                json={"refresh_token": self.refresh_token},
+                name="/api/v1/users/refresh"
+            )
+        if response is not None and response.status_code == 200:
+            self._set_session(response.json())
+        else:
+            self.login()
+        return bool(self.token)
+    
     @task(3)
     def list_productos(self):
         """Listar productos (tarea común)"""
-        if not self.token:
+        if not self._ensure_session():
             return
         
         self.client.get(
@@ -67,7 +98,7 @@ class MediSupplyUser(HttpUser):
     @task(2)
     def list_clientes(self):
         """Listar clientes"""
-        if not self.token:
+        if not self._ensure_session():
             return
         
         self.client.get(
@@ -80,7 +111,7 @@ class MediSupplyUser(HttpUser):
     @task(2)
     def list_ordenes(self):
         """Listar órdenes"""
-        if not self.token:
+        if not self._ensure_session():
             return
         
         self.client.get(
@@ -93,7 +124,7 @@ class MediSupplyUser(HttpUser):
     @task(1)
     def list_vendedores(self):
         """Listar vendedores"""
-        if not self.token:
+        if not self._ensure_session():
             return
         
         self.client.get(
@@ -105,7 +136,7 @@ class MediSupplyUser(HttpUser):
     @task(1)
     def list_bodegas(self):
         """Listar bodegas (localización)"""
-        if not self.token:
+        if not self._ensure_session():
             return
         
         self.client.get(
@@ -117,7 +148,7 @@ class MediSupplyUser(HttpUser):
     @task(1)
     def list_vehiculos(self):
         """Listar vehículos (localización)"""
-        if not self.token:
+        if not self._ensure_session():
             return
         
         self.client.get(
@@ -12,7 +12,8 @@ import httpx
 from config import (
     EDGE_PROXY_URL, 
     LOCALIZATION_THRESHOLD, 
-    ROUTE_OPTIMIZATION_THRESHOLD
+    ROUTE_OPTIMIZATION_THRESHOLD,
+    ORDERS_PER_MINUTE_MAX
 )
 
 
@@ -180,6 +181,102 @@ class TestOrderServicePerformance:
             f"Localización vehículos promedio: {stats.mean:.3f}s, SLA: ≤{LOCALIZATION_THRESHOLD}s"
 
 
+class TestAuthConcurrencyScaling:
+    """Throughput bajo concurrencia: la validación del token no debe serializar peticiones"""
+
+    CONCURRENCY_LEVELS = [1, 10, 25]
+    REQUESTS_PER_WORKER = 4
+
+    @staticmethod
+    async def _measure_throughput(url, headers, concurrency, total_requests):
+        import asyncio
+        import time
+
+        semaphore = asyncio.Semaphore(concurrency)
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(timeout=30.0, limits=limits, follow_redirects=True) as client:
+            async def one():
+                async with semaphore:
+                    response = await client.get(url, headers=headers)
+                    response.raise_for_status()
+
+            start = time.perf_counter()
+            await asyncio.gather(*[one() for _ in range(total_requests)])
+            return total_requests / (time.perf_counter() - start)
+
+    def test_authenticated_throughput_scales_with_concurrency(self, auth_headers):
+        """
+        Test: El throughput de un endpoint autenticado debe crecer con la concurrencia
+        Si la validación del token bloqueara el event loop, el throughput se quedaría
+        plano al aumentar usuarios concurrentes.
+        """
+        import asyncio
+
+        url = f"{EDGE_PROXY_URL}/api/v1/bodegas"
+        throughput = {}
+        for level in self.CONCURRENCY_LEVELS:
+            throughput[level] = asyncio.run(
+                self._measure_throughput(url, auth_headers, level, level * self.REQUESTS_PER_WORKER)
+            )
+            print(f"concurrencia={level}: {throughput[level]:.1f} req/s")
+
+        lowest, highest = self.CONCURRENCY_LEVELS[0], self.CONCURRENCY_LEVELS[-1]
+        assert throughput[highest] > 3 * throughput[lowest], \
+            f"Throughput no escala: {throughput[lowest]:.1f} req/s -> {throughput[highest]:.1f} req/s"
+
+
+class TestBulkOrderThroughput:
+    """Órdenes por segundo: una petición por orden vs POST /api/v1/ordenes/bulk"""
+
+    TOTAL_ORDERS = 100
+    BULK_BATCH_SIZE = 50
+
+    @staticmethod
+    def _orden(i):
+        return {
+            "fecha_entrega_estimada": "2025-12-31T23:59:59",
+            "id_cliente": 1,
+            "id_vendedor": 1,
+            "estado": "ABIERTO",
+            "productos": [
+                {"id_producto": 1, "cantidad": 1 + i % 5},
+                {"id_producto": 2, "cantidad": 1}
+            ]
+        }
+
+    def test_bulk_orders_throughput(self, http_client, auth_headers):
+        """
+        Test: Comparar el throughput de creación de órdenes individual vs bulk
+        SLA: 400 pedidos/min; el endpoint bulk debe superarlo con holgura
+        """
+        import time
+
+        ordenes = [self._orden(i) for i in range(self.TOTAL_ORDERS)]
+
+        start = time.perf_counter()
+        for orden in ordenes:
+            response = http_client.post(f"{EDGE_PROXY_URL}/api/v1/ordenes", headers=auth_headers, json=orden)
+            assert response.status_code == 201
+        single = self.TOTAL_ORDERS / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for i in range(0, self.TOTAL_ORDERS, self.BULK_BATCH_SIZE):
+            response = http_client.post(
+                f"{EDGE_PROXY_URL}/api/v1/ordenes/bulk",
+                headers=auth_headers,
+                json={"ordenes": ordenes[i:i + self.BULK_BATCH_SIZE]}
+            )
+            response.raise_for_status()
+            assert response.json()["failed"] == 0
+        bulk = self.TOTAL_ORDERS / (time.perf_counter() - start)
+
+        print(f"individual: {single:.1f} órdenes/s ({single * 60:.0f}/min)")
+        print(f"bulk x{self.BULK_BATCH_SIZE}: {bulk:.1f} órdenes/s ({bulk * 60:.0f}/min)")
+        assert bulk > single, f"Bulk no mejora el throughput: {single:.1f} -> {bulk:.1f} órdenes/s"
+        assert bulk * 60 >= ORDERS_PER_MINUTE_MAX, \
+            f"Bulk: {bulk * 60:.0f} órdenes/min, SLA: ≥{ORDERS_PER_MINUTE_MAX}/min"
+
+
 class TestClientServicePerformance:
     """Tests de performance para client-service"""
     
@@ -2,6 +2,7 @@ from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta, timezone
 from app.core.config import settings
+from app.core.keys import get_key_store
 
 # Configuración para hash de passwords
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -26,13 +27,27 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
         expire = datetime.now(timezone.utc) + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
-    return encoded_jwt
+    if settings.ALGORITHM.startswith("HS"):
+        return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+    kid, private_key = get_key_store().signing_key()
+    return jwt.encode(to_encode, private_key, algorithm=settings.ALGORITHM, headers={"kid": kid})
+
+def decode_token(token: str) -> dict:
+    """Decodificar y validar un token JWT. Lanza JWTError si no es válido"""
+    if settings.ALGORITHM.startswith("HS"):
+        return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+
+    kid = jwt.get_unverified_header(token).get("kid")
+    public_key = get_key_store().public_key(kid)
+    if public_key is None:
+        raise JWTError(f"Unknown key id: {kid}")
+    return jwt.decode(token, public_key, algorithms=[settings.ALGORITHM])
 
 def verify_token(token: str):
     """Verificar token JWT"""
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        payload = decode_token(token)
         email: str = payload.get("sub")
         if email is None:
             return None
@@ -13,8 +13,31 @@ class Settings(BaseSettings):
         "SECRET_KEY", 
         "09d25e094faa6ca2556c818166b7a9563b93f7099f6f0f4caa6cf63b88e8d3e7"
     )
-    ALGORITHM: str = "HS256"
+    # HS256 usa SECRET_KEY; RS256/ES256 firman con las claves de JWT_KEYS_DIR y se publican en /.well-known/jwks.json
+    ALGORITHM: str = os.getenv("JWT_ALGORITHM", "HS256")
+    JWT_KEYS_DIR: str = os.getenv("JWT_KEYS_DIR", "")
+    JWT_ACTIVE_KID: str = os.getenv("JWT_ACTIVE_KID", "")
+    # Solo desarrollo/tests: sin PEMs en JWT_KEYS_DIR, firmar con una clave efímera por proceso
+    JWT_EPHEMERAL_KEYS: bool = os.getenv("JWT_EPHEMERAL_KEYS", "False").lower() == "true"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+    # Refresh tokens opacos para renovar la sesión sin volver a verificar la contraseña
+    REFRESH_TOKEN_EXPIRE_DAYS: int = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
+    # Cada cuánto se eliminan los refresh tokens vencidos (0 desactiva la tarea)
+    REFRESH_TOKEN_PURGE_INTERVAL_SECONDS: int = int(os.getenv("REFRESH_TOKEN_PURGE_INTERVAL_SECONDS", "3600"))
+    
+    # Caché de perfiles para /api/v1/users/me (se invalida al actualizar o desactivar un usuario)
+    USER_CACHE_ENABLED: bool = os.getenv("USER_CACHE_ENABLED", "True").lower() == "true"
+    USER_CACHE_MAX_ENTRIES: int = int(os.getenv("USER_CACHE_MAX_ENTRIES", "10000"))
+    USER_CACHE_TTL_SECONDS: int = int(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+    
+    # Hash de contraseñas (bcrypt) en un pool de procesos; 0 workers = threadpool
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 2)))
+    PASSWORD_HASH_MAX_CONCURRENCY: int = int(os.getenv("PASSWORD_HASH_MAX_CONCURRENCY", str(os.cpu_count() or 2)))
+    # Peticiones esperando turno antes de responder 503 (0 = sin límite)
+    PASSWORD_HASH_MAX_QUEUE: int = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "200"))
+    
+    # Máximo de usuarios por petición a /api/v1/users/register/bulk
+    BULK_REGISTER_MAX_USERS: int = int(os.getenv("BULK_REGISTER_MAX_USERS", "1000"))
     
     # App
     PROJECT_NAME: str = "User Service - MediSupply"
@@ -25,6 +25,7 @@ def create_tables():
     # Importar todos los modelos para que SQLAlchemy los reconozca
     from app.models.user import User
     from app.models.role import Role
+    from app.models.refresh_token import RefreshToken
 
     Base.metadata.create_all(bind=engine)
 
@@ -5,6 +5,7 @@ from app.core.database import get_db
 from app.core.auth import verify_token
 from app.services.user_service import UserService
 from app.models.user import User
+from app.schemas.user_schema import UserResponse
 
 from typing import List
 
@@ -51,6 +52,31 @@ def get_current_user(
     
     return user
 
+def get_current_user_profile(
+    token: str = Depends(oauth2_scheme),
+    user_service: UserService = Depends(get_user_service)
+) -> UserResponse:
+    """Obtener el perfil del usuario actual (activo) desde la caché de perfiles.
+
+    Pensado para /me: en un acierto de caché no se consulta la base de datos.
+    """
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="No se pudieron validar las credenciales",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+    email = verify_token(token)
+    if email is None:
+        raise credentials_exception
+
+    profile = user_service.get_user_profile_by_email(email)
+    if profile is None:
+        raise credentials_exception
+    if not profile.is_active:
+        raise HTTPException(status_code=400, detail="Usuario inactivo")
+    return profile
+
 def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
     """Verificar que el usuario actual esté activo"""
     if not current_user.is_active:
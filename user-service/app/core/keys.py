@@ -0,0 +1,98 @@
+"""Claves asimétricas para firmar tokens (RS256/ES256) y publicarlas como JWKS.
+
+Las claves privadas se leen de `JWT_KEYS_DIR` (un archivo `<kid>.pem` por
+clave). Para rotar, se agrega un nuevo PEM y se apunta `JWT_ACTIVE_KID` a él;
+las claves anteriores se siguen publicando para validar tokens ya emitidos
+hasta que se eliminen del directorio.
+
+Sin PEMs el servicio no arranca: una clave efímera por proceso haría que los
+tokens de una réplica no validen en otra ni tras un reinicio. Solo con
+`JWT_EPHEMERAL_KEYS=true` (desarrollo/tests) se genera una en memoria.
+"""
+import logging
+import os
+import threading
+import uuid
+from typing import Dict, Optional, Tuple
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+from jose import jwk
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _generate_private_pem(algorithm: str) -> str:
+    if algorithm.startswith("ES"):
+        private_key = ec.generate_private_key(ec.SECP256R1())
+    else:
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode("utf-8")
+
+
+class KeyStore:
+    """Conjunto de claves de firma indexado por `kid`."""
+
+    def __init__(self, algorithm: str, keys_dir: str = "", active_kid: str = "", allow_ephemeral: bool = False):
+        self.algorithm = algorithm
+        self._private_keys: Dict[str, str] = {}
+        self._public_keys: Dict[str, dict] = {}
+
+        if keys_dir and os.path.isdir(keys_dir):
+            for filename in sorted(os.listdir(keys_dir)):
+                if not filename.endswith(".pem"):
+                    continue
+                with open(os.path.join(keys_dir, filename)) as fh:
+                    self.add_key(filename[:-4], fh.read())
+
+        if not self._private_keys:
+            if not allow_ephemeral:
+                raise RuntimeError(
+                    f"No JWT signing keys for {algorithm}: JWT_KEYS_DIR={keys_dir!r} "
+                    f"is unset, not a directory or has no .pem files"
+                )
+            # Desarrollo/tests: clave efímera en memoria
+            logger.warning("No JWT signing keys configured, generating an ephemeral key")
+            self.add_key(f"ephemeral-{uuid.uuid4().hex[:8]}", _generate_private_pem(algorithm))
+
+        # Por defecto la clave activa es la última en orden alfabético
+        self.active_kid = active_kid if active_kid in self._private_keys else sorted(self._private_keys)[-1]
+
+    def add_key(self, kid: str, private_pem: str) -> None:
+        public = jwk.construct(private_pem, self.algorithm).public_key().to_dict()
+        public.update({"kid": kid, "use": "sig"})
+        self._private_keys[kid] = private_pem
+        self._public_keys[kid] = public
+
+    def signing_key(self) -> Tuple[str, str]:
+        """Devuelve `(kid, private_pem)` de la clave activa."""
+        return self.active_kid, self._private_keys[self.active_kid]
+
+    def public_key(self, kid: Optional[str]) -> Optional[dict]:
+        return self._public_keys.get(kid)
+
+    def jwks(self) -> dict:
+        return {"keys": list(self._public_keys.values())}
+
+
+_key_store: Optional[KeyStore] = None
+_key_store_lock = threading.Lock()
+
+
+def get_key_store() -> KeyStore:
+    """Instancia única del KeyStore, creada en el primer uso."""
+    global _key_store
+    if _key_store is None:
+        with _key_store_lock:
+            if _key_store is None:
+                _key_store = KeyStore(
+                    settings.ALGORITHM, settings.JWT_KEYS_DIR, settings.JWT_ACTIVE_KID,
+                    allow_ephemeral=settings.JWT_EPHEMERAL_KEYS,
+                )
+    return _key_store
@@ -0,0 +1,137 @@
+"""Hash y verificación de contraseñas fuera del hilo de la petición.
+
+bcrypt es deliberadamente lento (cientos de ms por operación). Ejecutado en
+el handler ocupa un hilo del threadpool durante todo ese tiempo, y una
+ráfaga de logins deja sin hilos a `/me` y al resto de endpoints baratos.
+
+`PasswordHasher` envía el trabajo a un pool de procesos acotado
+(`PASSWORD_HASH_WORKERS`). Un semáforo limita las operaciones en curso
+(`PASSWORD_HASH_MAX_CONCURRENCY`); las peticiones que exceden el límite
+esperan en el event loop sin ocupar hilos. Si la cola supera
+`PASSWORD_HASH_MAX_QUEUE` se responde 503 en lugar de acumular latencia.
+"""
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Optional
+
+from fastapi import HTTPException, status
+from starlette.concurrency import run_in_threadpool
+
+from app.core.auth import get_password_hash, verify_password
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordHasher:
+    """Ejecuta bcrypt en un pool de procesos con límite de concurrencia y métricas de cola."""
+
+    def __init__(self, workers: int, max_concurrency: int, max_queue: int = 0):
+        self.workers = workers
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        # Con workers=0 se usa el threadpool de Starlette (desarrollo/tests)
+        self._executor: Optional[ProcessPoolExecutor] = ProcessPoolExecutor(max_workers=workers) if workers > 0 else None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+        self.queued = 0
+        self.max_queued = 0
+        self.completed = 0
+        self.rejected = 0
+
+    async def hash(self, password: str) -> str:
+        return await self._run(get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    async def hash_many(self, passwords: List[str]) -> List[str]:
+        """Hashear un lote (altas masivas) respetando los mismos límites que un login.
+
+        Cada hash ocupa su propio turno del semáforo y cuenta en `queued` e
+        `in_flight`. El lote se envía en tramos de `max_concurrency` para no
+        llenar la cola de una vez: los logins que llegan mientras tanto
+        compiten por el semáforo en igualdad de condiciones.
+        """
+        hashes: List[str] = []
+        for start in range(0, len(passwords), self.max_concurrency):
+            chunk = passwords[start:start + self.max_concurrency]
+            hashes.extend(await asyncio.gather(*(self.hash(p) for p in chunk)))
+        return hashes
+
+    async def _run(self, fn: Callable, *args):
+        if self.max_queue and self.queued >= self.max_queue:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Servicio saturado, intente nuevamente en unos segundos",
+                headers={"Retry-After": "1"},
+            )
+
+        self.queued += 1
+        self.max_queued = max(self.max_queued, self.queued)
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+
+        self.in_flight += 1
+        try:
+            if self._executor is None:
+                return await run_in_threadpool(fn, *args)
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self._semaphore.release()
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "max_queued": self.max_queued,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+
+_hasher: Optional[PasswordHasher] = None
+
+
+def get_password_hasher() -> PasswordHasher:
+    """Instancia única del PasswordHasher, creada en el primer uso."""
+    global _hasher
+    if _hasher is None:
+        _hasher = PasswordHasher(
+            workers=settings.PASSWORD_HASH_WORKERS,
+            max_concurrency=settings.PASSWORD_HASH_MAX_CONCURRENCY,
+            max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+        )
+    return _hasher
+
+
+def shutdown_password_hasher() -> None:
+    global _hasher
+    if _hasher is not None:
+        _hasher.shutdown()
+        _hasher = None
+
+
+async def hash_password_async(password: str) -> str:
+    return await get_password_hasher().hash(password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await get_password_hasher().verify(plain_password, hashed_password)
+
+
+async def hash_passwords_async(passwords: List[str]) -> List[str]:
+    return await get_password_hasher().hash_many(passwords)
@@ -0,0 +1,140 @@
+"""Caché en proceso de los perfiles que sirve /api/v1/users/me.
+
+`/me` es el endpoint más llamado del sistema (los demás servicios validan
+tokens contra él). Con la caché, un acierto responde sin consultar la base
+de datos. Las entradas se indexan por email (el `sub` del token), vencen a
+los `USER_CACHE_TTL_SECONDS` y se descartan por LRU al superar
+`USER_CACHE_MAX_ENTRIES`.
+
+Para invalidar se escuchan los eventos de la sesión de SQLAlchemy: en cada
+flush se anotan los usuarios modificados o eliminados (cambio de datos,
+desactivación) y si cambió algún rol; al confirmarse la transacción
+(`after_commit`) se descartan sus entradas, o la caché entera si cambió un
+rol. Invalidar antes del commit dejaría una ventana en la que un `/me`
+concurrente recarga la fila anterior y la cachea por todo el TTL.
+
+La caché es por proceso y las invalidaciones no se propagan a otras réplicas:
+un cambio hecho en una réplica puede tardar hasta `USER_CACHE_TTL_SECONDS` en
+verse en las demás. Ese TTL es la cota de desactualización entre réplicas.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.role import Role
+from app.models.user import User
+from app.schemas.user_schema import UserResponse
+
+
+class UserProfileCache:
+    """LRU + TTL de `UserResponse` indexado por email, con índice secundario por id."""
+
+    def __init__(self, max_entries: int = 10000, ttl: int = 60, enabled: bool = True):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.enabled = enabled
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._emails_by_id: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, email: str) -> Optional[UserResponse]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(email)
+            if entry is not None:
+                profile, expires_at = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(email)
+                    self.hits += 1
+                    return profile
+                self._remove_locked(email)
+            self.misses += 1
+            return None
+
+    def set(self, profile: UserResponse) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[profile.email] = (profile, time.monotonic() + self.ttl)
+            self._entries.move_to_end(profile.email)
+            self._emails_by_id[profile.id] = profile.email
+            while len(self._entries) > self.max_entries:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._forget_id_locked(evicted)
+
+    def invalidate(self, user_id: Optional[int] = None, email: Optional[str] = None) -> None:
+        with self._lock:
+            if user_id is not None:
+                cached_email = self._emails_by_id.get(user_id)
+                if cached_email is not None:
+                    self._remove_locked(cached_email)
+            if email is not None:
+                self._remove_locked(email)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._emails_by_id.clear()
+
+    def _remove_locked(self, email: str) -> None:
+        entry = self._entries.pop(email, None)
+        if entry is not None:
+            self._forget_id_locked(entry[0])
+
+    def _forget_id_locked(self, profile: UserResponse) -> None:
+        if self._emails_by_id.get(profile.id) == profile.email:
+            del self._emails_by_id[profile.id]
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+user_cache = UserProfileCache(
+    max_entries=settings.USER_CACHE_MAX_ENTRIES,
+    ttl=settings.USER_CACHE_TTL_SECONDS,
+    enabled=settings.USER_CACHE_ENABLED,
+)
+
+
+_PENDING_KEY = "user_cache_pending"
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_invalidations(session, flush_context) -> None:
+    # En after_flush las colecciones dirty/deleted y el historial aún reflejan
+    # el estado previo al flush: se anota qué invalidar y se aplica al commit
+    pending = session.info.setdefault(_PENDING_KEY, {"users": set(), "roles": False})
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User):
+            pending["users"].add((obj.id, obj.email))
+            for old_email in inspect(obj).attrs.email.history.deleted or ():
+                pending["users"].add((obj.id, old_email))
+        elif isinstance(obj, Role):
+            # El nombre del rol viaja en cada perfil: ante un cambio se descarta todo
+            pending["roles"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_invalidations(session) -> None:
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    if pending["roles"]:
+        user_cache.clear()
+        return
+    for user_id, email in pending["users"]:
+        user_cache.invalidate(user_id=user_id, email=email)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_invalidations(session) -> None:
+    # Los cambios descartados no afectan a lo que hay en caché
+    session.info.pop(_PENDING_KEY, None)
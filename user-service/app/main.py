@@ -16,6 +16,8 @@ logger = logging.getLogger(__name__)
 
 # Variable para rastrear si las tablas fueron creadas
 _tables_created = False
+# Tarea en background que purga los refresh tokens vencidos
+_purge_task = None
 
 
 def ensure_tables_exist():
@@ -104,7 +106,8 @@ def root():
             "users": "/api/v1/users",
             "providers": "/api/v1/providers",
             "docs": "/docs",
-            "health": "/health"
+            "health": "/health",
+            "jwks": "/.well-known/jwks.json"
         }
     }
 
@@ -129,10 +132,28 @@ def get_roles():
     finally:
         db.close()
 
+@app.get("/.well-known/jwks.json")
+def jwks():
+    """
+    🔑 Claves públicas para validar tokens (JWKS)
+
+    Los demás servicios descargan y cachean estas claves para validar los
+    tokens localmente. Con HS256 no hay claves públicas que publicar.
+    """
+    from fastapi.responses import JSONResponse
+    from app.core.keys import get_key_store
+
+    if settings.ALGORITHM.startswith("HS"):
+        body = {"keys": []}
+    else:
+        body = get_key_store().jwks()
+    return JSONResponse(content=body, headers={"Cache-Control": "public, max-age=300"})
+
 @app.get("/health")
 def health_check():
     """Health check endpoint - verifica conexión a BD y tablas"""
     from app.core.database import engine
+    from app.core.password_hasher import get_password_hasher
     from sqlalchemy import text
     
     try:
@@ -179,7 +200,8 @@ def health_check():
             "service": "user-provider-service",
             "database": "connected",
             "tables": "ready",
-            "features": ["users", "providers", "audit"]
+            "features": ["users", "providers", "audit"],
+            "password_hashing": get_password_hasher().stats()
         }
     except HTTPException:
         raise
@@ -223,6 +245,11 @@ async def startup_event():
     """Evento de startup - reintenta crear tablas y ejecutar seeds después de iniciar"""
     logger.info(f"{settings.PROJECT_NAME} v{settings.VERSION} starting up...")
     logger.info(f"Environment: {'Development' if settings.DEBUG else 'Production'}")
+
+    if not settings.ALGORITHM.startswith("HS"):
+        # Falla al arrancar si RS256/ES256 no tiene claves en JWT_KEYS_DIR
+        from app.core.keys import get_key_store
+        logger.info(f"JWT signing key: {get_key_store().active_kid}")
     
     # Reintentar crear tablas y ejecutar seeds en background después de 10 segundos
     import asyncio
@@ -242,3 +269,40 @@ async def startup_event():
     
     # Ejecutar en background sin bloquear (guardar referencia para evitar garbage collection)
     _startup_task = asyncio.create_task(retry_create_tables_and_seed())
+
+    if settings.REFRESH_TOKEN_PURGE_INTERVAL_SECONDS > 0:
+        global _purge_task
+        _purge_task = asyncio.create_task(purge_refresh_tokens_periodically())
+
+
+async def purge_refresh_tokens_periodically():
+    """Eliminar periódicamente los refresh tokens vencidos para que la tabla no crezca sin límite"""
+    import asyncio
+    from starlette.concurrency import run_in_threadpool
+
+    def purge() -> int:
+        from app.core.database import SessionLocal
+        from app.services.user_service import UserService
+        db = SessionLocal()
+        try:
+            return UserService(db).purge_expired_refresh_tokens()
+        finally:
+            db.close()
+
+    while True:
+        await asyncio.sleep(settings.REFRESH_TOKEN_PURGE_INTERVAL_SECONDS)
+        try:
+            deleted = await run_in_threadpool(purge)
+            if deleted:
+                logger.info(f"Purged {deleted} expired refresh tokens")
+        except Exception as e:
+            logger.warning(f"Could not purge expired refresh tokens: {e}")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Evento de shutdown - detiene la purga de tokens y libera el pool de procesos de bcrypt"""
+    if _purge_task is not None:
+        _purge_task.cancel()
+    from app.core.password_hasher import shutdown_password_hasher
+    shutdown_password_hasher()
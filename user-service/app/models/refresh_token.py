@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from app.core.database import Base
+from sqlalchemy.orm import relationship
+
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True)
+    # Solo se guarda el SHA-256 del token; la búsqueda es por este índice único
+    token_hash = Column(String(64), unique=True, index=True, nullable=False)
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), index=True, nullable=False)
+    # Indexado para la purga periódica de tokens vencidos
+    expires_at = Column(DateTime(timezone=True), index=True, nullable=False)
+    # Un token rotado o revocado queda marcado; si se vuelve a presentar se revoca toda la sesión
+    revoked_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    user = relationship('User', lazy='joined')
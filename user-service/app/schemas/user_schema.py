@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 class UserCreate(BaseModel):
     name: str
@@ -9,6 +9,9 @@ class UserCreate(BaseModel):
     # Role id (integer) referencing roles table
     role_id: int
 
+class UserBulkCreate(BaseModel):
+    users: List[UserCreate]
+
 class UserLogin(BaseModel):
     email: EmailStr
     password: str
@@ -25,11 +28,29 @@ class UserResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class UserBulkItemResult(BaseModel):
+    # Posición del usuario en la lista enviada
+    index: int
+    email: EmailStr
+    success: bool
+    user: Optional[UserResponse] = None
+    error: Optional[str] = None
+
+class UserBulkResponse(BaseModel):
+    total: int
+    created: int
+    failed: int
+    results: List[UserBulkItemResult]
+
 class Token(BaseModel):
     access_token: str
     token_type: str
     role_id: Optional[int] = None
     role: Optional[str] = None
+    refresh_token: Optional[str] = None
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
 
 class TokenData(BaseModel):
     email: Optional[str] = None
@@ -1,10 +1,19 @@
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
-from app.schemas.user_schema import UserCreate, UserResponse, UserLogin
+from app.schemas.user_schema import UserCreate, UserResponse, UserLogin, UserBulkItemResult, UserBulkResponse
 from app.models.user import User
 from app.models.role import Role
+from app.models.refresh_token import RefreshToken
 from app.core.auth import get_password_hash, verify_password, create_access_token
-from typing import Optional
+from app.core.password_hasher import hash_password_async, hash_passwords_async, verify_password_async
+from app.core.user_cache import user_cache
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+import hashlib
+import secrets
 
 class UserService:
     def __init__(self, db: Session):
@@ -12,7 +21,115 @@ class UserService:
 
     def create_user(self, user: UserCreate) -> UserResponse:
         """Crear un nuevo usuario"""
-        # Verificar si el email ya existe
+        role_obj = self._validate_new_user(user)
+        
+        # Crear hash de la contraseña
+        hashed_password = get_password_hash(user.password)
+        
+        return self._insert_user(user, role_obj, hashed_password)
+
+    async def create_user_async(self, user: UserCreate) -> UserResponse:
+        """Crear un nuevo usuario calculando el hash fuera del hilo de la petición"""
+        role_obj = await run_in_threadpool(self._validate_new_user, user)
+        hashed_password = await hash_password_async(user.password)
+        return await run_in_threadpool(self._insert_user, user, role_obj, hashed_password)
+
+    async def create_users_bulk_async(self, users: List[UserCreate]) -> UserBulkResponse:
+        """Registrar muchos usuarios en una sola operación.
+
+        Valida emails y roles con una consulta `IN` cada uno, hashea las
+        contraseñas en paralelo y los inserta en una única transacción. Los
+        errores se informan por usuario sin abortar el resto del lote.
+        """
+        if len(users) > settings.BULK_REGISTER_MAX_USERS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Máximo {settings.BULK_REGISTER_MAX_USERS} usuarios por petición"
+            )
+
+        errors = await run_in_threadpool(self._validate_bulk, users)
+        valid = [i for i in range(len(users)) if i not in errors]
+        hashes = await hash_passwords_async([users[i].password for i in valid])
+        created, conflicts = await run_in_threadpool(
+            self._insert_bulk, [(users[i], hashes[n]) for n, i in enumerate(valid)]
+        )
+
+        results = []
+        for i, user in enumerate(users):
+            if i in errors or user.email in conflicts:
+                results.append(UserBulkItemResult(
+                    index=i, email=user.email, success=False,
+                    error=errors.get(i, "El email ya está registrado")
+                ))
+            else:
+                results.append(UserBulkItemResult(index=i, email=user.email, success=True, user=created[user.email]))
+        created_count = sum(1 for r in results if r.success)
+        return UserBulkResponse(
+            total=len(users),
+            created=created_count,
+            failed=len(users) - created_count,
+            results=results,
+        )
+
+    def _validate_bulk(self, users: List[UserCreate]) -> Dict[int, str]:
+        """Devuelve `{índice: error}` de los usuarios que no se pueden crear"""
+        emails = {user.email for user in users}
+        existing = {
+            email for (email,) in
+            self.db.query(User.email).filter(User.email.in_(emails)).all()
+        } if emails else set()
+        role_ids = {user.role_id for user in users}
+        valid_roles = {
+            role_id for (role_id,) in self.db.query(Role.id).filter(Role.id.in_(role_ids)).all()
+        } if role_ids else set()
+
+        errors: Dict[int, str] = {}
+        seen = set()
+        for i, user in enumerate(users):
+            if user.email in existing:
+                errors[i] = "El email ya está registrado"
+            elif user.email in seen:
+                errors[i] = "Email duplicado en la solicitud"
+            elif user.role_id not in valid_roles:
+                errors[i] = f"Rol inválido: {user.role_id}"
+            seen.add(user.email)
+        return errors
+
+    def _insert_bulk(self, items: List[Tuple[UserCreate, str]]) -> Tuple[Dict[str, UserResponse], set]:
+        """Insertar el lote en una transacción.
+
+        Si otra petición registra alguno de los emails mientras tanto, se
+        descartan esos usuarios y se reintenta una vez con el resto.
+        """
+        conflicts: set = set()
+        for attempt in range(2):
+            pending = [(user, hashed) for user, hashed in items if user.email not in conflicts]
+            if not pending:
+                return {}, conflicts
+            self.db.add_all([
+                User(name=user.name, email=user.email, hashed_password=hashed, role_id=user.role_id)
+                for user, hashed in pending
+            ])
+            try:
+                self.db.commit()
+                break
+            except IntegrityError:
+                self.db.rollback()
+                if attempt:
+                    raise
+                emails = [user.email for user, _ in pending]
+                conflicts |= {
+                    email for (email,) in
+                    self.db.query(User.email).filter(User.email.in_(emails)).all()
+                }
+
+        # Una sola consulta para devolver ids y fechas de todos los creados
+        emails = [user.email for user, _ in pending]
+        created = self.db.query(User).filter(User.email.in_(emails)).all()
+        return {user.email: self._to_response(user) for user in created}, conflicts
+
+    def _validate_new_user(self, user: UserCreate) -> Role:
+        """Verificar que el email no exista y que el rol sea válido"""
         db_user = self.db.query(User).filter(User.email == user.email).first()
         if db_user:
             raise HTTPException(
@@ -23,11 +140,9 @@ class UserService:
         role_obj = self.db.query(Role).filter(Role.id == user.role_id).first()
         if not role_obj:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Rol inválido: {user.role_id}")
-        
-        # Crear hash de la contraseña
-        hashed_password = get_password_hash(user.password)
-        
-        # Crear nuevo usuario
+        return role_obj
+
+    def _insert_user(self, user: UserCreate, role_obj: Role, hashed_password: str) -> UserResponse:
         db_user = User(
             name=user.name,
             email=user.email,
@@ -39,15 +154,7 @@ class UserService:
         self.db.commit()
         self.db.refresh(db_user)
         
-        return UserResponse(
-            id=db_user.id,
-            name=db_user.name,
-            email=db_user.email,
-            is_active=db_user.is_active,
-            created_at=db_user.created_at,
-            role_id=db_user.role_id,
-            role=db_user.role.name if db_user.role else None
-        )
+        return self._to_response(db_user)
 
     def authenticate_user(self, email: str, password: str) -> Optional[User]:
         """Autenticar usuario con email y contraseña"""
@@ -58,9 +165,26 @@ class UserService:
             return None
         return user
 
+    async def authenticate_user_async(self, email: str, password: str) -> Optional[User]:
+        """Igual que `authenticate_user` pero verificando bcrypt en el pool de procesos"""
+        user = await run_in_threadpool(self.get_user_by_email, email)
+        if not user:
+            return None
+        if not await verify_password_async(password, user.hashed_password):
+            return None
+        return user
+
     def login_user(self, user_login: UserLogin) -> dict:
         """Login de usuario y generación de token"""
         user = self.authenticate_user(user_login.email, user_login.password)
+        return self._issue_token(user)
+
+    async def login_user_async(self, user_login: UserLogin) -> dict:
+        """Login de usuario sin bloquear un hilo mientras se verifica la contraseña"""
+        user = await self.authenticate_user_async(user_login.email, user_login.password)
+        return await run_in_threadpool(self._issue_token, user)
+
+    def _issue_token(self, user: Optional[User]) -> dict:
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -74,20 +198,118 @@ class UserService:
                 detail="Usuario inactivo"
             )
         
-        # Crear token de acceso
-        access_token = create_access_token(data={"sub": user.email, "role": (user.role.name if user.role else None)})
+        # Crear token de acceso. Incluye id, nombre y rol para que los demás
+        # servicios puedan validar el token localmente sin consultar /users/me
+        role_name = user.role.name if user.role else None
+        access_token = create_access_token(data={
+            "sub": user.email,
+            "uid": user.id,
+            "name": user.name,
+            "role_id": user.role_id,
+            "role": role_name,
+        })
 
         return {
             "access_token": access_token,
             "token_type": "bearer",
             "role_id": user.role_id,
-            "role": user.role.name if user.role else None
+            "role": role_name,
+            "refresh_token": self._create_refresh_token(user),
         }
 
+    def refresh_session(self, refresh_token: str) -> dict:
+        """Renovar la sesión con un refresh token, rotándolo.
+
+        Cuesta una búsqueda por índice y una firma JWT, sin bcrypt. Cada
+        refresh token sirve una sola vez: si un token ya rotado se vuelve a
+        presentar (posible robo), se revocan todas las sesiones del usuario.
+        """
+        invalid_exception = HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Refresh token inválido o expirado",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+        now = datetime.now(timezone.utc)
+        stored = (
+            self.db.query(RefreshToken)
+            .filter(RefreshToken.token_hash == self._hash_refresh_token(refresh_token))
+            .with_for_update()
+            .first()
+        )
+        if stored is None:
+            raise invalid_exception
+
+        if stored.revoked_at is not None:
+            self.db.query(RefreshToken).filter(
+                RefreshToken.user_id == stored.user_id,
+                RefreshToken.revoked_at.is_(None),
+            ).update({RefreshToken.revoked_at: now}, synchronize_session=False)
+            self.db.commit()
+            raise invalid_exception
+
+        expires_at = stored.expires_at
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        if expires_at <= now:
+            raise invalid_exception
+
+        stored.revoked_at = now
+        # Limpieza oportunista de los tokens vencidos del usuario; se confirma
+        # en el mismo commit que emite el token nuevo
+        self.db.query(RefreshToken).filter(
+            RefreshToken.user_id == stored.user_id,
+            RefreshToken.expires_at <= now,
+        ).delete(synchronize_session=False)
+        return self._issue_token(stored.user)
+
+    def purge_expired_refresh_tokens(self) -> int:
+        """Eliminar los refresh tokens vencidos, revocados o no. Devuelve cuántos.
+
+        Un token revocado se conserva hasta su vencimiento para detectar su
+        reutilización; una vez vencido ya se rechaza por expiración.
+        """
+        deleted = self.db.query(RefreshToken).filter(
+            RefreshToken.expires_at <= datetime.now(timezone.utc)
+        ).delete(synchronize_session=False)
+        self.db.commit()
+        return deleted
+
+    def _create_refresh_token(self, user: User) -> str:
+        """Crear y persistir un refresh token opaco; se devuelve en claro una única vez.
+
+        Implica un INSERT y un commit en cada login: es el único commit del
+        login, y en la rotación confirma también la revocación del anterior.
+        """
+        refresh_token = secrets.token_urlsafe(32)
+        self.db.add(RefreshToken(
+            token_hash=self._hash_refresh_token(refresh_token),
+            user_id=user.id,
+            expires_at=datetime.now(timezone.utc) + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+        ))
+        self.db.commit()
+        return refresh_token
+
+    @staticmethod
+    def _hash_refresh_token(refresh_token: str) -> str:
+        return hashlib.sha256(refresh_token.encode("utf-8")).hexdigest()
+
     def get_user_by_email(self, email: str) -> Optional[User]:
         """Obtener usuario por email"""
         return self.db.query(User).filter(User.email == email).first()
 
+    def get_user_profile_by_email(self, email: str) -> Optional[UserResponse]:
+        """Obtener el perfil del usuario por email, desde la caché si está disponible"""
+        profile = user_cache.get(email)
+        if profile is not None:
+            return profile
+
+        user = self.get_user_by_email(email)
+        if user is None:
+            return None
+        profile = self._to_response(user)
+        user_cache.set(profile)
+        return profile
+
     def get_user(self, user_id: int) -> UserResponse:
         """Obtener usuario por ID"""
         user = self.db.query(User).filter(User.id == user_id).first()
@@ -96,6 +318,10 @@ class UserService:
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Usuario no encontrado"
             )
+        return self._to_response(user)
+
+    @staticmethod
+    def _to_response(user: User) -> UserResponse:
         return UserResponse(
             id=user.id,
             name=user.name,
@@ -108,3 +108,12 @@ def inactive_user(db_session):
     db_session.refresh(user)
     
     return user
+
+
+@pytest.fixture(autouse=True)
+def clear_user_cache():
+    """Vaciar la caché de perfiles entre tests (la BD de testing se recrea en cada uno)"""
+    from app.core.user_cache import user_cache
+    user_cache.clear()
+    yield
+    user_cache.clear()
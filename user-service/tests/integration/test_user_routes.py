@@ -1,4 +1,5 @@
 import pytest
+from unittest.mock import patch
 from fastapi.testclient import TestClient
 from fastapi import status
 
@@ -64,6 +65,54 @@ class TestUserRoutes:
         data = response2.json()
         assert "El email ya está registrado" in data["detail"]
     
+    def test_register_users_bulk_reports_per_item_results(self, client: TestClient, db_session, created_user):
+        """Test alta masiva: crea los válidos y reporta error por usuario en el resto"""
+        from app.core.auth import create_access_token
+        from app.models.role import Role
+        admin_role = Role(name="Admin")
+        role = Role(name="Cliente")
+        db_session.add_all([admin_role, role])
+        db_session.commit()
+        created_user.role_id = admin_role.id
+        db_session.commit()
+        headers = {"Authorization": f"Bearer {create_access_token(data={'sub': created_user.email})}"}
+
+        users = [
+            {"name": "Bulk Uno", "email": "bulk1@example.com", "password": "password123", "role_id": role.id},
+            {"name": "Existente", "email": "test@example.com", "password": "password123", "role_id": role.id},
+            {"name": "Bulk Dos", "email": "bulk2@example.com", "password": "password123", "role_id": role.id},
+            {"name": "Repetido", "email": "bulk1@example.com", "password": "password123", "role_id": role.id},
+            {"name": "Sin Rol", "email": "bulk3@example.com", "password": "password123", "role_id": 999},
+        ]
+        response = client.post("/api/v1/users/register/bulk", json={"users": users}, headers=headers)
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert (data["total"], data["created"], data["failed"]) == (5, 2, 3)
+        assert [r["success"] for r in data["results"]] == [True, False, True, False, False]
+        assert data["results"][0]["user"]["id"] is not None
+        assert data["results"][1]["error"] == "El email ya está registrado"
+        assert data["results"][3]["error"] == "Email duplicado en la solicitud"
+        assert "Rol inválido" in data["results"][4]["error"]
+
+        login = client.post("/api/v1/users/generate-token", json={
+            "email": "bulk2@example.com",
+            "password": "password123"
+        })
+        assert login.status_code == status.HTTP_200_OK
+
+    def test_register_users_bulk_requires_admin(self, client: TestClient, created_user):
+        """Test que el alta masiva no es pública: requiere token de un Admin"""
+        from app.core.auth import create_access_token
+        users = [{"name": "Bulk", "email": "bulk@example.com", "password": "password123"}]
+
+        anonymous = client.post("/api/v1/users/register/bulk", json={"users": users})
+        assert anonymous.status_code == status.HTTP_401_UNAUTHORIZED
+
+        headers = {"Authorization": f"Bearer {create_access_token(data={'sub': created_user.email})}"}
+        not_admin = client.post("/api/v1/users/register/bulk", json={"users": users}, headers=headers)
+        assert not_admin.status_code == status.HTTP_403_FORBIDDEN
+    
     def test_register_user_invalid_email(self, client: TestClient):
         """Test registro con email inválido"""
         user_data = {
@@ -204,6 +253,19 @@ class TestUserRoutes:
         assert data["email"] == "current@example.com"
         assert data["is_active"] is True
     
+    def test_get_current_user_info_after_deactivation(self, client: TestClient, db_session, created_user):
+        """Test que /me deja de servir el perfil cacheado cuando el usuario se desactiva"""
+        from app.core.auth import create_access_token
+        headers = {"Authorization": f"Bearer {create_access_token(data={'sub': created_user.email})}"}
+
+        assert client.get("/api/v1/users/me", headers=headers).status_code == status.HTTP_200_OK
+
+        created_user.is_active = False
+        db_session.commit()
+
+        response = client.get("/api/v1/users/me", headers=headers)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+    
     def test_get_current_user_info_unauthorized(self, client: TestClient):
         """Test obtener información sin token"""
         response = client.get("/api/v1/users/me")
@@ -276,6 +338,89 @@ class TestUserRoutes:
         data = response.json()
         assert "Usuario no encontrado" in data["detail"]
     
+    def test_refresh_token_rotation(self, client: TestClient, created_user):
+        """Test que /refresh renueva la sesión sin contraseña y rota el refresh token"""
+        login = client.post("/api/v1/users/generate-token", json={
+            "email": "test@example.com",
+            "password": "testpassword123"
+        }).json()
+        assert login["refresh_token"]
+
+        with patch("app.services.user_service.verify_password") as mock_verify, \
+                patch("app.services.user_service.verify_password_async") as mock_verify_async:
+            response = client.post("/api/v1/users/refresh", json={"refresh_token": login["refresh_token"]})
+        assert response.status_code == status.HTTP_200_OK
+        mock_verify.assert_not_called()
+        mock_verify_async.assert_not_called()
+
+        refreshed = response.json()
+        assert refreshed["refresh_token"] != login["refresh_token"]
+        headers = {"Authorization": f"Bearer {refreshed['access_token']}"}
+        assert client.get("/api/v1/users/me", headers=headers).json()["email"] == "test@example.com"
+
+        # Reutilizar un refresh token ya rotado revoca también el vigente
+        reused = client.post("/api/v1/users/refresh", json={"refresh_token": login["refresh_token"]})
+        assert reused.status_code == status.HTTP_401_UNAUTHORIZED
+        revoked = client.post("/api/v1/users/refresh", json={"refresh_token": refreshed["refresh_token"]})
+        assert revoked.status_code == status.HTTP_401_UNAUTHORIZED
+    
+    def test_refresh_token_invalid_or_expired(self, client: TestClient, db_session, created_user):
+        """Test que /refresh rechaza tokens desconocidos o expirados"""
+        from datetime import datetime, timedelta, timezone
+        from app.models.refresh_token import RefreshToken
+
+        unknown = client.post("/api/v1/users/refresh", json={"refresh_token": "no-existe"})
+        assert unknown.status_code == status.HTTP_401_UNAUTHORIZED
+
+        login = client.post("/api/v1/users/generate-token", json={
+            "email": "test@example.com",
+            "password": "testpassword123"
+        }).json()
+        db_session.query(RefreshToken).update(
+            {RefreshToken.expires_at: datetime.now(timezone.utc) - timedelta(minutes=1)}
+        )
+        db_session.commit()
+
+        expired = client.post("/api/v1/users/refresh", json={"refresh_token": login["refresh_token"]})
+        assert expired.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_expired_refresh_tokens_are_purged(self, client: TestClient, db_session, created_user):
+        """Test que los refresh tokens vencidos se eliminan: en la rotación y en la purga periódica"""
+        from datetime import datetime, timedelta, timezone
+        from app.models.refresh_token import RefreshToken
+        from app.services.user_service import UserService
+
+        credentials = {"email": "test@example.com", "password": "testpassword123"}
+        old = client.post("/api/v1/users/generate-token", json=credentials).json()
+        current = client.post("/api/v1/users/generate-token", json=credentials).json()
+        old_hash = UserService._hash_refresh_token(old["refresh_token"])
+        db_session.query(RefreshToken).filter(RefreshToken.token_hash == old_hash).update(
+            {RefreshToken.expires_at: datetime.now(timezone.utc) - timedelta(minutes=1)}
+        )
+        db_session.commit()
+
+        # Rotar un token vigente elimina los vencidos del mismo usuario
+        response = client.post("/api/v1/users/refresh", json={"refresh_token": current["refresh_token"]})
+        assert response.status_code == status.HTTP_200_OK
+        db_session.expire_all()
+        assert db_session.query(RefreshToken).filter(RefreshToken.token_hash == old_hash).count() == 0
+
+        # La purga periódica elimina el resto de vencidos (también los revocados)
+        db_session.query(RefreshToken).update(
+            {RefreshToken.expires_at: datetime.now(timezone.utc) - timedelta(minutes=1)}
+        )
+        db_session.commit()
+        assert UserService(db_session).purge_expired_refresh_tokens() == 2
+        assert db_session.query(RefreshToken).count() == 0
+    
+    def test_jwks_endpoint_is_public(self, client: TestClient):
+        """Test del endpoint JWKS (no requiere token)"""
+        response = client.get("/.well-known/jwks.json")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert "keys" in response.json()
+        assert "max-age" in response.headers["cache-control"]
+
     def test_get_user_by_id_unauthorized(self, client: TestClient, created_user):
         """Test obtener usuario por ID sin autenticación"""
         response = client.get(f"/api/v1/users/{created_user.id}")
@@ -67,6 +67,102 @@ class TestPasswordHashing:
         assert verify_password(password, hashed) is True
 
 
+class TestPasswordHasher:
+    """Tests para el pool de procesos de bcrypt"""
+
+    def test_hash_and_verify_in_process_pool(self):
+        """Test que hash y verificación funcionan ejecutados en otro proceso"""
+        import asyncio
+        from app.core.password_hasher import PasswordHasher
+
+        hasher = PasswordHasher(workers=1, max_concurrency=1)
+
+        async def run():
+            hashed = await hasher.hash("testpassword123")
+            return hashed, await hasher.verify("testpassword123", hashed), await hasher.verify("wrong", hashed)
+
+        try:
+            hashed, ok, wrong = asyncio.run(run())
+        finally:
+            hasher.shutdown()
+
+        assert verify_password("testpassword123", hashed) is True
+        assert ok is True
+        assert wrong is False
+        assert hasher.stats()["completed"] == 3
+
+    def test_concurrency_cap_queues_and_sheds_excess(self):
+        """Test que el límite de concurrencia encola y rechaza con 503 al llenarse la cola"""
+        import asyncio
+        import time
+        from fastapi import HTTPException
+        from app.core.password_hasher import PasswordHasher
+
+        hasher = PasswordHasher(workers=0, max_concurrency=1, max_queue=1)
+
+        def slow_verify(plain, hashed):
+            time.sleep(0.1)
+            return True
+
+        async def run():
+            return await asyncio.gather(
+                *[hasher.verify("p", "h") for _ in range(3)], return_exceptions=True
+            )
+
+        with patch("app.core.password_hasher.verify_password", slow_verify):
+            results = asyncio.run(run())
+
+        rejected = [r for r in results if isinstance(r, HTTPException)]
+        assert len(rejected) == 1 and rejected[0].status_code == 503
+        assert results.count(True) == 2
+        stats = hasher.stats()
+        assert stats["max_queued"] == 1
+        assert stats["rejected"] == 1
+        assert stats["in_flight"] == 0 and stats["queued"] == 0
+
+    def test_hash_many_respects_concurrency_and_leaves_room_for_logins(self):
+        """Test que un lote masivo ocupa un turno por hash y no bloquea los logins concurrentes"""
+        import asyncio
+        import threading
+        import time
+        from app.core.password_hasher import PasswordHasher
+
+        hasher = PasswordHasher(workers=0, max_concurrency=2, max_queue=10)
+        running = 0
+        peak = 0
+        lock = threading.Lock()
+
+        def slow_hash(password):
+            nonlocal running, peak
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            time.sleep(0.02)
+            with lock:
+                running -= 1
+            return f"hash:{password}"
+
+        async def run():
+            bulk = asyncio.create_task(hasher.hash_many([str(i) for i in range(12)]))
+            await asyncio.sleep(0.01)
+            login = asyncio.create_task(hasher.verify("p", "h"))
+            ok = await login
+            # El login termina antes que el lote: no espera detrás de todos sus hashes
+            assert not bulk.done()
+            return await bulk, ok
+
+        with patch("app.core.password_hasher.get_password_hash", slow_hash), \
+                patch("app.core.password_hasher.verify_password", lambda plain, hashed: True):
+            hashes, ok = asyncio.run(run())
+
+        assert hashes == [f"hash:{i}" for i in range(12)]
+        assert ok is True
+        assert peak <= 2
+        stats = hasher.stats()
+        assert stats["completed"] == 13
+        assert stats["max_queued"] <= 10 and stats["rejected"] == 0
+
+
 class TestJWTTokens:
     """Tests para funciones de tokens JWT"""
     
@@ -175,3 +271,63 @@ class TestJWTTokens:
         """Test verificar token JWT vacío"""
         result = verify_token("")
         assert result is None
+
+
+class TestAsymmetricTokens:
+    """Tests para firma RS256 y publicación JWKS"""
+
+    @patch('app.core.auth.settings')
+    def test_rs256_token_signed_with_active_kid(self, mock_settings):
+        """Test que el token RS256 lleva el kid activo y valida con la clave pública"""
+        from app.core.keys import KeyStore
+
+        store = KeyStore("RS256", allow_ephemeral=True)
+        mock_settings.ALGORITHM = "RS256"
+        mock_settings.ACCESS_TOKEN_EXPIRE_MINUTES = 30
+
+        with patch('app.core.auth.get_key_store', return_value=store):
+            token = create_access_token({"sub": "test@example.com"})
+            assert jwt.get_unverified_header(token)["kid"] == store.active_kid
+            assert verify_token(token) == "test@example.com"
+
+        payload = jwt.decode(token, store.public_key(store.active_kid), algorithms=["RS256"])
+        assert payload["sub"] == "test@example.com"
+
+    @patch('app.core.auth.settings')
+    def test_rs256_token_with_unknown_kid_is_rejected(self, mock_settings):
+        """Test que un token firmado con una clave no publicada no es válido"""
+        from app.core.keys import KeyStore
+
+        mock_settings.ALGORITHM = "RS256"
+        mock_settings.ACCESS_TOKEN_EXPIRE_MINUTES = 30
+
+        with patch('app.core.auth.get_key_store', return_value=KeyStore("RS256", allow_ephemeral=True)):
+            token = create_access_token({"sub": "test@example.com"})
+        with patch('app.core.auth.get_key_store', return_value=KeyStore("RS256", allow_ephemeral=True)):
+            assert verify_token(token) is None
+
+    def test_key_store_rotation_keeps_previous_keys(self, tmp_path):
+        """Test que el JWKS publica todas las claves y firma con la activa"""
+        from app.core.keys import KeyStore, _generate_private_pem
+
+        (tmp_path / "2024-01.pem").write_text(_generate_private_pem("RS256"))
+        (tmp_path / "2024-02.pem").write_text(_generate_private_pem("RS256"))
+
+        store = KeyStore("RS256", str(tmp_path))
+        assert store.signing_key()[0] == "2024-02"
+        assert {k["kid"] for k in store.jwks()["keys"]} == {"2024-01", "2024-02"}
+        assert all("d" not in k for k in store.jwks()["keys"])
+
+        pinned = KeyStore("RS256", str(tmp_path), active_kid="2024-01")
+        assert pinned.signing_key()[0] == "2024-01"
+
+    def test_key_store_without_keys_fails_unless_ephemeral_allowed(self, tmp_path):
+        """Test que RS256 sin PEMs no genera una clave efímera salvo que se permita"""
+        from app.core.keys import KeyStore
+
+        for keys_dir in ("", str(tmp_path / "missing"), str(tmp_path)):
+            with pytest.raises(RuntimeError):
+                KeyStore("RS256", keys_dir)
+
+        store = KeyStore("ES256", str(tmp_path), allow_ephemeral=True)
+        assert store.active_kid.startswith("ephemeral-")
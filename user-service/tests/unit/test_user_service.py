@@ -315,3 +315,43 @@ class TestUserServiceIntegration:
             user_service.create_user(user_data2)
         
         assert exc_info.value.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_user_profile_cache_serves_hits_without_db(self, db_session, created_user):
+        """Test que /me se resuelve desde la caché de perfiles tras la primera consulta"""
+        user_service = UserService(db_session)
+
+        profile = user_service.get_user_profile_by_email(created_user.email)
+        assert profile.id == created_user.id
+
+        with patch.object(user_service, 'get_user_by_email', side_effect=AssertionError("DB consultada")):
+            cached = user_service.get_user_profile_by_email(created_user.email)
+        assert cached == profile
+
+    def test_user_profile_cache_invalidated_on_deactivation(self, db_session, created_user):
+        """Test que desactivar un usuario invalida su perfil cacheado"""
+        user_service = UserService(db_session)
+        assert user_service.get_user_profile_by_email(created_user.email).is_active is True
+
+        created_user.is_active = False
+        db_session.commit()
+
+        assert user_service.get_user_profile_by_email(created_user.email).is_active is False
+
+    def test_user_profile_cache_invalidated_on_commit_not_flush(self, db_session, created_user):
+        """Test que la invalidación ocurre al confirmar la transacción, no en el flush ni tras un rollback"""
+        from app.core.user_cache import user_cache
+
+        user_service = UserService(db_session)
+        user_service.get_user_profile_by_email(created_user.email)
+
+        created_user.name = "Nombre sin confirmar"
+        db_session.flush()
+        # Hasta el commit la fila confirmada sigue siendo la anterior
+        assert user_cache.get(created_user.email) is not None
+
+        db_session.rollback()
+        assert user_cache.get(created_user.email) is not None
+
+        created_user.is_active = False
+        db_session.commit()
+        assert user_cache.get(created_user.email) is None